@@ -1,47 +1,21 @@
-from file_writer import BinanceWebSocketClient
+import pandas as pd
 
+from .cleaning import clean_ohlcv
+from .indicators import DEFAULT_EMA_PERIODS, EMAEngine, add_indicators
+from .masking import DataMasker
+from .observability import get_logger
 
-symbols_to_track = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
-
-# Initialize WebSocket client
-binance_ws = BinanceWebSocketClient(symbols=symbols_to_track, interval="1m")
-
-# Start the stream
-binance_ws.start_stream()
+logger = get_logger(__name__)
 
 
 def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
     """Perform data cleaning steps."""
-    df.fillna(method="ffill", inplace=True)
-    df.dropna(inplace=True)
-    df.drop_duplicates(subset=["symbol", "timestamp"], keep="last", inplace=True)
-
-    numeric_cols = [
-        "open",
-        "high",
-        "low",
-        "close",
-        "volume",
-        "taker_buy_base",
-        "taker_buy_quote",
-    ]
-    df[numeric_cols] = df[numeric_cols].astype(float)
-    df = df[
-        (df["open"] > 0)
-        & (df["high"] > 0)
-        & (df["low"] > 0)
-        & (df["close"] > 0)
-        & (df["volume"] > 0)
-    ]
-    return df
+    return clean_ohlcv(df)[0]
 
 
 def anonymize_data(self, df: pd.DataFrame) -> pd.DataFrame:
     """Mask volume data to anonymize trade sizes."""
-    df["volume"] = df["volume"].apply(lambda x: round(x, 2))  # Mask small variations
-    df["taker_buy_base"] = df["taker_buy_base"].apply(lambda x: round(x, 2))
-    df["taker_buy_quote"] = df["taker_buy_quote"].apply(lambda x: round(x, 2))
-    return df
+    return DataMasker().apply(df)  # Rounds volumes to 2 decimals
 
 
 def save_to_parquet(self, df: pd.DataFrame, filename: str):
@@ -54,50 +28,58 @@ class DataTransformation:
     """Handles data cleaning, EMA addition, and anonymization tasks."""
 
     @staticmethod
-    def add_ema(df: pd.DataFrame, periods=[20, 50, 100, 200]) -> pd.DataFrame:
+    def add_ema(
+        df: pd.DataFrame, periods=DEFAULT_EMA_PERIODS, engine: EMAEngine = None
+    ) -> pd.DataFrame:
         """
         Add Exponential Moving Averages (EMAs) to the DataFrame.
 
+        Pass the same engine for every appended batch to continue the EMAs from
+        its state instead of recomputing them over the whole history.
+
         :param df: DataFrame with price data
         :param periods: List of periods for EMAs
+        :param engine: Optional EMAEngine carrying state from earlier batches
         :return: DataFrame with added EMA columns
         """
-        for period in periods:
-            df[f"EMA_{period}"] = df["close"].ewm(span=period, adjust=False).mean()
-        return df
+        engine = engine or EMAEngine(periods)
+        return engine.apply(df)
 
     @staticmethod
-    def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-        """Perform data cleaning steps."""
-        df.fillna(method="ffill", inplace=True)
-        df.dropna(inplace=True)
-        df.drop_duplicates(subset=["symbol", "timestamp"], keep="last", inplace=True)
-
-        numeric_cols = [
-            "open",
-            "high",
-            "low",
-            "close",
-            "volume",
-            "taker_buy_base",
-            "taker_buy_quote",
-        ]
-        df[numeric_cols] = df[numeric_cols].astype(float)
-        df = df[
-            (df["open"] > 0)
-            & (df["high"] > 0)
-            & (df["low"] > 0)
-            & (df["close"] > 0)
-            & (df["volume"] > 0)
-        ]
-        return df
+    def add_indicators(df: pd.DataFrame, processes: int = None) -> pd.DataFrame:
+        """
+        Add per-symbol EMA, SMA, VWAP, ATR and RSI columns.
+
+        :param df: DataFrame with price data for one or more symbols
+        :param processes: Optional number of worker processes for wide symbol sets
+        :return: DataFrame sorted by symbol and timestamp with indicator columns
+        """
+        return add_indicators(df, processes=processes)
 
     @staticmethod
-    def anonymize_data(df: pd.DataFrame) -> pd.DataFrame:
-        """Mask volume data to anonymize trade sizes."""
-        df["volume"] = df["volume"].apply(
-            lambda x: round(x, 2)
-        )  # Mask small variations
-        df["taker_buy_base"] = df["taker_buy_base"].apply(lambda x: round(x, 2))
-        df["taker_buy_quote"] = df["taker_buy_quote"].apply(lambda x: round(x, 2))
-        return df
+    def clean_data(df: pd.DataFrame, with_report: bool = False):
+        """
+        Perform data cleaning steps.
+
+        Coerces prices to float, forward-fills per symbol, drops duplicate
+        (symbol, timestamp) rows and rows failing the positivity or
+        low <= open/close <= high checks, in a single pass.
+
+        :param df: DataFrame with OHLCV data
+        :param with_report: Also return a CleaningReport of dropped rows per rule
+        :return: Cleaned DataFrame, or (DataFrame, CleaningReport) with with_report
+        """
+        cleaned, report = clean_ohlcv(df)
+        return (cleaned, report) if with_report else cleaned
+
+    @staticmethod
+    def anonymize_data(df: pd.DataFrame, masker: DataMasker = None) -> pd.DataFrame:
+        """
+        Mask volume data to anonymize trade sizes.
+
+        :param df: DataFrame or pyarrow Table to mask
+        :param masker: Optional DataMasker with custom rules; defaults to rounding
+            volume, taker_buy_base and taker_buy_quote to 2 decimals
+        :return: Masked data
+        """
+        return (masker or DataMasker()).apply(df)
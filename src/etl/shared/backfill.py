@@ -0,0 +1,166 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from .klines import KlineColumns, concat_klines, decode_klines
+from .observability import counter, get_logger, histogram
+from .response_cache import ResponseCache, cache_key
+from .rest_client import KLINES_PATH, BinanceRestClient, get_client
+
+logger = get_logger(__name__)
+
+DECODE_SECONDS = histogram("backfill_decode_seconds", "Time to decode one klines response")
+CACHED_WINDOWS = counter("backfill_cached_windows_total", "Kline windows served from the cache")
+
+MAX_KLINES_PER_REQUEST = 1000  # Hard cap enforced by Binance on /api/v3/klines
+
+INTERVAL_MS = {
+    "1s": 1000,
+    "1m": 60 * 1000,
+    "3m": 3 * 60 * 1000,
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "30m": 30 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "2h": 2 * 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "6h": 6 * 60 * 60 * 1000,
+    "8h": 8 * 60 * 60 * 1000,
+    "12h": 12 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+    "3d": 3 * 24 * 60 * 60 * 1000,
+    "1w": 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def interval_to_ms(interval: str) -> int:
+    """
+    Convert a Binance kline interval (e.g. "1m", "1h") to milliseconds.
+
+    :param interval: Kline interval string.
+    :return: Interval length in milliseconds.
+    """
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Unsupported kline interval: {interval}")
+
+
+def split_windows(
+    start_time: int, end_time: int, interval: str, limit: int = MAX_KLINES_PER_REQUEST
+) -> List[Tuple[int, int]]:
+    """
+    Split [start_time, end_time] into windows holding at most `limit` candles each.
+
+    Window boundaries sit on a fixed grid (multiples of `limit` candles since
+    the epoch), so every run asks for the same windows and immutable ones can
+    be served from the response cache; only the first and last may be partial.
+
+    :param start_time: Start of the range in ms (inclusive).
+    :param end_time: End of the range in ms (inclusive).
+    :param interval: Kline interval string.
+    :param limit: Maximum number of candles per window.
+    :return: Ordered list of (window_start, window_end) tuples in ms.
+    """
+    step = interval_to_ms(interval) * limit
+    windows = []
+    window_start = start_time
+    while window_start <= end_time:
+        window_end = min((window_start // step + 1) * step - 1, end_time)
+        windows.append((window_start, window_end))
+        window_start = window_end + 1
+    return windows
+
+
+class KlineBackfill:
+    """Fetches long kline ranges as concurrent 1000-candle windows over the shared REST client."""
+
+    def __init__(
+        self,
+        interval: str = "1h",
+        max_workers: int = 8,
+        client: Optional[BinanceRestClient] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        """
+        :param interval: Timeframe for candles (e.g., "1m", "1h", "1d").
+        :param max_workers: Number of windows fetched concurrently.
+        :param client: REST client whose pool and weight budget are used; the
+            process-wide client by default.
+        :param cache: Optional on-disk cache for windows of closed candles.
+        """
+        self.interval = interval
+        self.max_workers = max_workers
+        self.client = client or get_client()
+        self.cache = cache
+
+    def _fetch_window(self, symbol: str, start_time: int, end_time: int) -> KlineColumns:
+        """Fetch and decode a single window of at most 1000 candles."""
+        params = {
+            "symbol": symbol,
+            "interval": self.interval,
+            "startTime": start_time,
+            "endTime": end_time,
+            "limit": MAX_KLINES_PER_REQUEST,
+        }
+        # Every candle of the window has closed once its end is an interval in the past
+        now = int(time.time() * 1000)
+        immutable = self.cache is not None and end_time < now - interval_to_ms(self.interval)
+        if immutable:
+            key = cache_key(KLINES_PATH, params)
+            body = self.cache.get(key)
+            if body is not None:
+                CACHED_WINDOWS.inc()
+                with DECODE_SECONDS.time():
+                    return decode_klines(body)
+
+        body = self.client.get(KLINES_PATH, params).content
+        if immutable:
+            self.cache.put(key, body)
+        with DECODE_SECONDS.time():
+            return decode_klines(body)
+
+    def fetch(
+        self, symbols: List[str], start_time: int, end_time: int
+    ) -> Dict[str, KlineColumns]:
+        """
+        Fetch every candle in [start_time, end_time] for each symbol.
+
+        Windows of all symbols are fetched concurrently and stitched back together
+        in time order. A symbol with any failed window is left out of the result
+        rather than returned with a silent gap.
+
+        :param symbols: List of trading pairs (e.g., ["BTCUSDT", "ETHUSDT"]).
+        :param start_time: Start of the range in ms.
+        :param end_time: End of the range in ms.
+        :return: Mapping of symbol to its decoded, time ordered kline columns.
+        """
+        windows = split_windows(start_time, end_time, self.interval)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                symbol: [
+                    executor.submit(self._fetch_window, symbol, start, end)
+                    for start, end in windows
+                ]
+                for symbol in symbols
+            }
+
+            results = {}
+            for symbol, symbol_futures in futures.items():
+                try:
+                    batches = [future.result() for future in symbol_futures]
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Error fetching data for {symbol}: {e}")
+                    for future in symbol_futures:
+                        future.cancel()
+                    continue
+                results[symbol] = concat_klines(batches)
+                logger.info(
+                    f"Fetched {len(results[symbol]['timestamp'])} candles for {symbol} "
+                    f"in {len(windows)} windows"
+                )
+
+        return results
@@ -0,0 +1,232 @@
+import re
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .ohlcv import FLOAT_FIELDS, OHLCVBatch
+from .trades import TradeColumns
+
+BAR_KINDS = ("time", "volume", "dollar", "tick")
+
+_UNIT_MS = {
+    "ms": 1,
+    "s": 1000,
+    "m": 60 * 1000,
+    "h": 60 * 60 * 1000,
+    "d": 24 * 60 * 60 * 1000,
+    "w": 7 * 24 * 60 * 60 * 1000,
+}
+_INTERVAL_PATTERN = re.compile(r"^(\d+)(ms|s|m|h|d|w)$")
+
+
+def bar_interval_ms(interval: Union[str, int]) -> int:
+    """
+    Convert an arbitrary bar interval such as "5s", "250ms" or "90m" to milliseconds.
+
+    :param interval: Interval string, or a number of milliseconds.
+    :return: Interval length in milliseconds.
+    """
+    if isinstance(interval, (int, np.integer)):
+        return int(interval)
+    match = _INTERVAL_PATTERN.match(interval)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Unsupported bar interval: {interval}")
+    return int(match.group(1)) * _UNIT_MS[match.group(2)]
+
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    columns = {name: np.empty(0) for name in FLOAT_FIELDS}
+    columns["timestamp"] = np.empty(0, dtype=np.int64)
+    columns["trades"] = np.empty(0, dtype=np.int64)
+    return columns
+
+
+def aggregate_bars(
+    bar_ids: np.ndarray,
+    timestamp: np.ndarray,
+    price: np.ndarray,
+    qty: np.ndarray,
+    is_buyer_maker: Optional[np.ndarray] = None,
+    open_times: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Reduce time-ordered trades to one OHLCV row per run of equal bar ids.
+
+    :param bar_ids: Non-decreasing bar id per trade.
+    :param timestamp: Trade times in epoch ms.
+    :param price: Trade prices.
+    :param qty: Trade quantities (base asset).
+    :param is_buyer_maker: Optional maker side flag; the taker buy columns are
+        NaN without it.
+    :param open_times: Optional bar open time per trade (time bars); the first
+        trade time of each bar is used otherwise.
+    :return: Columns in the OHLCVData layout, timestamps in epoch ms.
+    """
+    if not len(bar_ids):
+        return _empty_columns()
+    starts = np.flatnonzero(np.r_[True, bar_ids[1:] != bar_ids[:-1]])
+    ends = np.r_[starts[1:], len(bar_ids)]
+
+    columns = {
+        "timestamp": (open_times if open_times is not None else timestamp)[starts],
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends - 1],
+        "volume": np.add.reduceat(qty, starts),
+        "trades": ends - starts,
+    }
+    if is_buyer_maker is None:
+        columns["taker_buy_base"] = np.full(len(starts), np.nan)
+        columns["taker_buy_quote"] = np.full(len(starts), np.nan)
+    else:
+        taker_buy = np.where(is_buyer_maker, 0.0, qty)
+        columns["taker_buy_base"] = np.add.reduceat(taker_buy, starts)
+        columns["taker_buy_quote"] = np.add.reduceat(taker_buy * price, starts)
+    return columns
+
+
+class BarBuilder:
+    """
+    Builds bars of one symbol from a stream of time-ordered trade batches.
+
+    Kinds:
+      "time"   - fixed intervals aligned to the epoch, e.g. size="5s"
+      "volume" - a new bar every `size` units of base volume
+      "dollar" - a new bar every `size` units of quote volume (price * qty)
+      "tick"   - a new bar every `size` trades
+
+    Thresholds are laid on the running total since the first trade, so the
+    trade that crosses one stays in the bar it started in. The trades of the
+    last, still open bar are carried into the next batch; `flush` emits it.
+    """
+
+    def __init__(
+        self, kind: str = "time", size: Union[str, float] = "1m", symbol: str = ""
+    ):
+        """
+        :param kind: One of BAR_KINDS.
+        :param size: Interval for time bars; volume, quote volume or trade count
+            per bar otherwise.
+        :param symbol: Symbol written to the output bars.
+        """
+        if kind not in BAR_KINDS:
+            raise ValueError(f"Unknown bar kind {kind!r}, expected one of {BAR_KINDS}")
+        self.kind = kind
+        self.size = bar_interval_ms(size) if kind == "time" else float(size)
+        if self.size <= 0:
+            raise ValueError("Bar size must be positive")
+        self.symbol = symbol
+        self._carry: Optional[TradeColumns] = None
+        self._offset = 0.0  # running total at the first carried trade
+
+    def _bar_ids(self, trades: TradeColumns):
+        """Bar id and bar open time per trade, plus the running total before each trade."""
+        if self.kind == "time":
+            ids = trades["timestamp"] // self.size
+            return ids, ids * self.size, None
+        if self.kind == "tick":
+            before = self._offset + np.arange(len(trades["timestamp"]), dtype=np.float64)
+        else:
+            measure = trades["qty"]
+            if self.kind == "dollar":
+                measure = measure * trades["price"]
+            before = self._offset + np.cumsum(measure) - measure
+        return np.floor(before / self.size).astype(np.int64), None, before
+
+    def _build(self, trades: TradeColumns, keep_last: bool) -> OHLCVBatch:
+        if not len(trades["timestamp"]):
+            return self._batch(_empty_columns())
+        ids, open_times, before = self._bar_ids(trades)
+        cut = len(ids)
+        if keep_last:
+            # The last bar may still grow; carry its trades into the next batch
+            cut = int(np.searchsorted(ids, ids[-1]))
+            self._carry = {name: values[cut:] for name, values in trades.items()}
+            self._offset = before[cut] if before is not None else 0.0
+        else:
+            self._carry = None
+            self._offset = 0.0
+        columns = aggregate_bars(
+            ids[:cut],
+            trades["timestamp"][:cut],
+            trades["price"][:cut],
+            trades["qty"][:cut],
+            trades["is_buyer_maker"][:cut] if "is_buyer_maker" in trades else None,
+            open_times[:cut] if open_times is not None else None,
+        )
+        return self._batch(columns)
+
+    def _batch(self, columns: Dict[str, np.ndarray]) -> OHLCVBatch:
+        codes = np.zeros(len(columns["timestamp"]), dtype=np.int32)
+        return OHLCVBatch(columns, codes, [self.symbol])
+
+    def _with_carry(self, trades: TradeColumns) -> TradeColumns:
+        trades = {
+            name: np.asarray(trades[name])
+            for name in ("timestamp", "price", "qty", "is_buyer_maker")
+            if name in trades
+        }
+        if self._carry is None:
+            return trades
+        return {name: np.concatenate([self._carry[name], trades[name]]) for name in trades}
+
+    def update(self, trades: TradeColumns) -> OHLCVBatch:
+        """
+        Add a batch of trades and return the bars it completed.
+
+        :param trades: Columns "timestamp" (epoch ms), "price", "qty" and
+            optionally "is_buyer_maker", e.g. the output of decode_trades.
+        :return: OHLCVBatch of completed bars.
+        """
+        return self._build(self._with_carry(trades), keep_last=True)
+
+    def flush(self) -> OHLCVBatch:
+        """Emit the open bar, if any, and reset the builder."""
+        if self._carry is None:
+            return self._batch(_empty_columns())
+        carry, self._carry = self._carry, None
+        return self._build(carry, keep_last=False)
+
+
+def _trade_columns(trades: pd.DataFrame) -> TradeColumns:
+    timestamps = trades["timestamp"]
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = timestamps.dt.as_unit("ms").array.asi8
+    columns = {
+        "timestamp": np.asarray(timestamps, dtype=np.int64),
+        "price": trades["price"].to_numpy(dtype=np.float64),
+        "qty": trades["qty"].to_numpy(dtype=np.float64),
+    }
+    if "is_buyer_maker" in trades:
+        columns["is_buyer_maker"] = trades["is_buyer_maker"].to_numpy(dtype=bool)
+    return columns
+
+
+def build_bars(
+    trades: Union[pd.DataFrame, pa.Table],
+    kind: str = "time",
+    size: Union[str, float] = "1m",
+) -> OHLCVBatch:
+    """
+    Aggregate stored trades (e.g. read back with read_ohlcv) into bars.
+
+    :param trades: Trades with "symbol", "timestamp", "price", "qty" and
+        optionally "is_buyer_maker".
+    :param kind: One of BAR_KINDS.
+    :param size: See BarBuilder.
+    :return: OHLCVBatch of every bar, grouped by symbol and ordered by time.
+    """
+    if isinstance(trades, pa.Table):
+        trades = trades.to_pandas()
+    batches = []
+    for symbol, group in trades.groupby("symbol", sort=False, observed=True):
+        group = group.sort_values("timestamp", kind="stable")
+        builder = BarBuilder(kind, size, str(symbol))
+        batches.append(builder.update(_trade_columns(group)))
+        batches.append(builder.flush())
+    if not batches:
+        return BarBuilder(kind, size)._batch(_empty_columns())
+    return OHLCVBatch.concat(batches)
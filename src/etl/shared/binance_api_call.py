@@ -143,27 +143,41 @@
 
 
 import asyncio
-import json
-import logging
 import datetime
 import requests
 import pandas as pd
-import websockets
 from typing import List, Optional
 from dataclasses import dataclass
 
-# Configure Logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
+from .candles import CandleStateTable
+from .json_codec import kline_values
+from .klines import decode_klines
+from .observability import get_logger, get_stream_logger
+from .ohlcv import OHLCVBatch
+from .rest_client import KLINES_PATH, get_client
+from .stream_manager import KlineGapFiller, StreamManager
 
-BINANCE_API_URL = "https://api.binance.com/api/v3/klines"
-STREAM_URL = "wss://stream.binance.com:9443/ws"
+logger = get_logger(__name__)
+stream_logger = get_stream_logger(__name__, noun="closed candles", key_noun="symbols")
+
+STREAM_INTERVAL = "1h"
 
 
 @dataclass
 class OHLCVData:
+    __slots__ = (
+        "timestamp",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "trades",
+        "taker_buy_base",
+        "taker_buy_quote",
+        "symbol",
+    )
+
     timestamp: datetime.datetime
     open: float
     high: float
@@ -177,12 +191,19 @@ class OHLCVData:
 
 
 class BinanceAPI:
-    def __init__(self, symbols: List[str], interval: str = "1d", days: int = 30):
+    def __init__(
+        self,
+        symbols: List[str],
+        interval: str = "1d",
+        days: int = 30,
+        candles: Optional[CandleStateTable] = None,
+    ):
         self.symbols = symbols
         self.interval = interval
         self.days = days
+        self.candles = candles or CandleStateTable()  # Emits closed candles only
 
-    def fetch_historical_data(self, symbol: str) -> Optional[List[OHLCVData]]:
+    def fetch_historical_data(self, symbol: str) -> Optional[OHLCVBatch]:
         """Fetch historical OHLCV data for a given symbol from Binance API."""
         try:
             end_time = int(datetime.datetime.utcnow().timestamp() * 1000)
@@ -196,71 +217,52 @@ class BinanceAPI:
                 "limit": 1000,
             }
 
-            response = requests.get(BINANCE_API_URL, params=params)
-            response.raise_for_status()
-
-            data = response.json()
-            ohlcv_list = [
-                OHLCVData(
-                    timestamp=pd.to_datetime(entry[0], unit="ms", utc=True),
-                    open=float(entry[1]),
-                    high=float(entry[2]),
-                    low=float(entry[3]),
-                    close=float(entry[4]),
-                    volume=float(entry[5]),
-                    trades=int(entry[8]),
-                    taker_buy_base=float(entry[9]),
-                    taker_buy_quote=float(entry[10]),
-                    symbol=symbol,
-                )
-                for entry in data
-            ]
-
-            return ohlcv_list
+            response = get_client().get(KLINES_PATH, params)
+
+            return OHLCVBatch.from_klines(decode_klines(response.content), symbol)
 
         except requests.RequestException as e:
             logger.error(f"API request failed for {symbol}: {e}")
             return None
 
-    async def on_message(self, symbol: str, message: str):
-        """Handle the incoming WebSocket message."""
-        data = json.loads(message)
-        kline = data.get("k", {})
+    async def on_message(self, stream: str, data: dict):
+        """Handle one kline event routed from the combined stream."""
+        kline = data.get("k")
+        if not kline or self.candles.update(kline) is None:
+            return
+        open_time, open_, high, low, close, volume, trades, taker_base, taker_quote = (
+            kline_values(kline)
+        )
         ohlcv_data = OHLCVData(
-            timestamp=pd.to_datetime(kline.get("t"), unit="ms", utc=True),
-            open=float(kline.get("o")),
-            high=float(kline.get("h")),
-            low=float(kline.get("l")),
-            close=float(kline.get("c")),
-            volume=float(kline.get("v")),
-            trades=int(kline.get("n")),
-            taker_buy_base=float(kline.get("V")),
-            taker_buy_quote=float(kline.get("Q")),
+            timestamp=pd.to_datetime(open_time, unit="ms", utc=True),
+            open=open_,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume,
+            trades=trades,
+            taker_buy_base=taker_base,
+            taker_buy_quote=taker_quote,
             symbol=data.get("s"),
         )
-        print(ohlcv_data)  # This can be replaced with database storage
-
-    async def connect_websocket(self, symbol: str):
-        """Connects to Binance WebSocket for a given symbol."""
-        uri = f"{STREAM_URL}/{symbol.lower()}@kline_1h"
-        async with websockets.connect(uri) as websocket:
-            logger.info(f"Connected to {uri}")
-            while True:
-                try:
-                    message = await websocket.recv()
-                    await self.on_message(symbol, message)
-                except websockets.exceptions.ConnectionClosed:
-                    logger.warning(f"WebSocket closed for {symbol}, reconnecting...")
-                    await asyncio.sleep(5)  # Wait before retrying
-                    return await self.connect_websocket(symbol)
-
-    async def start_stream(self):
-        """Start real-time data stream from Binance WebSocket for all symbols."""
-        tasks = []
-        for symbol in self.symbols:
-            tasks.append(self.connect_websocket(symbol))
+        # This can be replaced with database storage
+        stream_logger.log(ohlcv_data.symbol, "%s", ohlcv_data)
 
-        await asyncio.gather(*tasks)
+    async def start_stream(self, streams_per_connection: int = 200):
+        """Start real-time data stream from Binance WebSocket for all symbols."""
+        streams = [
+            f"{symbol.lower()}@kline_{STREAM_INTERVAL}" for symbol in self.symbols
+        ]
+        manager = StreamManager(
+            streams,
+            self.on_message,
+            streams_per_connection=streams_per_connection,
+            gap_filler=KlineGapFiller(self.candles),
+        )
+        try:
+            await manager.run()
+        finally:
+            stream_logger.flush()
 
 
 if __name__ == "__main__":
@@ -270,7 +272,7 @@ if __name__ == "__main__":
     for symbol in binance_api.symbols:
         historical_data = binance_api.fetch_historical_data(symbol)
         if historical_data is not None:
-            print(historical_data[:5])  # Display sample data
+            print(historical_data[:5].to_pandas())  # Display sample data
 
     # Start WebSocket stream
     asyncio.run(binance_api.start_stream())
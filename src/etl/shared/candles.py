@@ -0,0 +1,59 @@
+import time
+from typing import Dict, Optional, Tuple
+
+
+class CandleStateTable:
+    """
+    Keeps the latest update of every open candle, keyed by (symbol, interval, open_time).
+
+    Binance pushes a kline update many times per candle. By default a candle is
+    emitted exactly once, when the update with the is-closed flag ("x") arrives.
+    With `emit_partials` enabled, throttled snapshots of open candles are emitted
+    as well, at most once per `partial_interval` seconds per candle. Several
+    intervals of one symbol (e.g. btcusdt@kline_1m and @kline_1h) can share a
+    table: each (symbol, interval) pair has its own state.
+    """
+
+    def __init__(self, emit_partials: bool = False, partial_interval: float = 1.0):
+        """
+        :param emit_partials: Also emit snapshots of candles that are still open.
+        :param partial_interval: Minimum seconds between snapshots of one candle.
+        """
+        self.emit_partials = emit_partials
+        self.partial_interval = partial_interval
+        # (symbol, interval) -> open_time -> kline
+        self.open_candles: Dict[Tuple[str, str], Dict[int, dict]] = {}
+        # (symbol, interval) -> open time of the last closed candle
+        self.last_closed: Dict[Tuple[str, str], int] = {}
+        self._last_emitted: Dict[Tuple[str, str, int], float] = {}
+
+    def update(self, kline: dict) -> Optional[dict]:
+        """
+        Upsert one kline update.
+
+        :param kline: The "k" object of a Binance kline event.
+        :return: The kline to emit downstream, or None if it is absorbed.
+        """
+        series = (kline["s"], kline.get("i"))
+        open_time = kline["t"]
+        key = series + (open_time,)
+
+        if open_time <= self.last_closed.get(series, -1):
+            return None  # Late or replayed update of a candle already emitted
+
+        candles = self.open_candles.setdefault(series, {})
+        if kline.get("x"):
+            # Also drops older candles whose close update was never received
+            for stale in [t for t in candles if t <= open_time]:
+                del candles[stale]
+                self._last_emitted.pop(series + (stale,), None)
+            self.last_closed[series] = open_time
+            return kline
+
+        candles[open_time] = kline
+        if self.emit_partials:
+            now = time.monotonic()
+            if now - self._last_emitted.get(key, float("-inf")) >= self.partial_interval:
+                self._last_emitted[key] = now
+                return kline
+        return None
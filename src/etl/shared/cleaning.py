@@ -0,0 +1,126 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .observability import counter
+
+NUMERIC_COLUMNS = [
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "taker_buy_base",
+    "taker_buy_quote",
+]
+POSITIVE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Rules in the order they are applied; a dropped row is counted under the first
+# rule it fails.
+CLEANING_RULES = ["missing", "duplicate", "non_positive", "ohlc_inconsistent"]
+
+ROWS_CLEANED = counter("clean_rows_total", "Rows passed through clean_ohlcv")
+DROPPED_HELP = "Rows dropped by clean_ohlcv, by the first rule they failed"
+
+
+@dataclass
+class CleaningReport:
+    """Row counts of one clean_ohlcv run."""
+
+    rows_in: int = 0
+    rows_out: int = 0
+    dropped: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(CLEANING_RULES, 0))
+
+    def __str__(self):
+        dropped = ", ".join(f"{rule}={count}" for rule, count in self.dropped.items())
+        return f"kept {self.rows_out}/{self.rows_in} rows (dropped: {dropped})"
+
+
+def _forward_fill(values: np.ndarray, starts_mask: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs without crossing the segment starts marked in `starts_mask`."""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    source = np.where(~missing | starts_mask, np.arange(len(values)), 0)
+    np.maximum.accumulate(source, out=source)
+    return values[source]
+
+
+def clean_ohlcv(
+    df: pd.DataFrame, numeric_cols: List[str] = NUMERIC_COLUMNS
+) -> Tuple[pd.DataFrame, CleaningReport]:
+    """
+    Clean OHLCV rows in one pass over columnar data.
+
+    Numeric columns are coerced to float64 (unparsable values become NaN), then
+    forward-filled within each symbol. Rows are dropped when they still miss a
+    value, duplicate an earlier (symbol, timestamp) (the last one is kept), have
+    a non-positive price or volume, or violate low <= open/close <= high. Only
+    the output frame is allocated; the input is left untouched.
+
+    :param df: DataFrame with "symbol", "timestamp" and OHLCV columns
+    :param numeric_cols: Columns coerced to float64 and forward-filled
+    :return: Cleaned DataFrame, grouped by symbol (in order of first appearance)
+        and sorted by timestamp with the original index labels kept, and a
+        CleaningReport with the dropped row counts per rule
+    """
+    report = CleaningReport(rows_in=len(df))
+    numeric_cols = [name for name in numeric_cols if name in df]
+
+    codes, _ = pd.factorize(df["symbol"])  # missing symbols get -1
+    timestamps = pd.to_datetime(df["timestamp"])
+    missing_time = timestamps.isna().to_numpy()
+    timestamps = timestamps.array.asi8  # int64 view, works for tz-aware columns too
+    order = np.lexsort((timestamps, codes))  # stable
+    codes = codes[order]
+    timestamps = timestamps[order]
+    starts_mask = np.r_[True, codes[1:] != codes[:-1]] if len(codes) else np.empty(0, bool)
+
+    columns = {}
+    missing = (codes < 0) | missing_time[order]
+    for name in numeric_cols:
+        values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+        values = _forward_fill(values[order], starts_mask)
+        missing |= np.isnan(values)
+        columns[name] = values
+    keep = ~missing
+    report.dropped["missing"] = int(missing.sum())
+
+    # After sorting, a kept row is a duplicate if the next kept row has the same key
+    kept = np.flatnonzero(keep)
+    duplicate = (codes[kept[:-1]] == codes[kept[1:]]) & (
+        timestamps[kept[:-1]] == timestamps[kept[1:]]
+    )
+    keep[kept[:-1][duplicate]] = False
+    report.dropped["duplicate"] = int(duplicate.sum())
+
+    positive = np.ones(len(keep), dtype=bool)
+    for name in POSITIVE_COLUMNS:
+        if name in columns:
+            positive &= columns[name] > 0
+    report.dropped["non_positive"] = int((keep & ~positive).sum())
+    keep &= positive
+
+    if all(name in columns for name in ("open", "high", "low", "close")):
+        body_low = np.minimum(columns["open"], columns["close"])
+        body_high = np.maximum(columns["open"], columns["close"])
+        consistent = (columns["low"] <= body_low) & (body_high <= columns["high"])
+        report.dropped["ohlc_inconsistent"] = int((keep & ~consistent).sum())
+        keep &= consistent
+
+    rows = order[keep]
+    cleaned = pd.DataFrame(
+        {
+            name: columns[name][keep] if name in columns else df[name].array[rows]
+            for name in df.columns
+        },
+        index=df.index[rows],
+    )
+    report.rows_out = len(cleaned)
+    ROWS_CLEANED.inc(report.rows_in)
+    for rule, count in report.dropped.items():
+        if count:
+            counter("clean_rows_dropped_total", DROPPED_HELP, rule=rule).inc(count)
+    return cleaned, report
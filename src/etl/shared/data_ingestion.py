@@ -1,85 +1,75 @@
-from typing import List
+from typing import List, Optional
 import pandas as pd
-import requests
 from datetime import datetime, timezone
-from src.etl.shared.observability import get_logger
+from .backfill import KlineBackfill
+from .klines import klines_to_frame
+from .observability import get_logger
+from .response_cache import get_cache
+from .rest_client import BinanceRestClient
 
 logger = get_logger(__name__)
 
-BINANCE_API_URL = "https://api.binance.com/api/v3/klines"
 TRADE_API_URL = "https://api.binance.com/api/v3/trades"
 
 
 def fetch_historical_ohlcv(
-    symbols: List[str], interval: str = "1h", days: int = 30
+    symbols: List[str],
+    interval: str = "1h",
+    days: int = 30,
+    max_workers: int = 8,
+    client: Optional[BinanceRestClient] = None,
+    use_cache: bool = True,
 ) -> pd.DataFrame:
     """
-    This method fetch historical OHLCV (Open, High, Low, Close, Volume) data for multiple symbols from Binance API.
+    This method fetch historical OHLCV (Open, High, Low, Close, Volume) data for multiple
+    symbols from Binance API.
+
+    The range is split into 1000-candle windows which are fetched concurrently, so
+    long ranges are no longer truncated to the first page.
 
     :param symbols: List of trading pairs (e.g., ["BTCUSDT", "ETHUSDT"]).
     :param interval: Timeframe for candles (e.g., "1m", "1h", "1d").
     :param days: Number of days of historical data to fetch.
+    :param max_workers: Number of windows fetched concurrently.
+    :param client: REST client to fetch through; the shared client by default.
+    :param use_cache: Serve windows of closed candles from the on-disk response
+        cache, fetching only the ones not seen before and the still open one.
     :return: Pandas DataFrame containing OHLCV data for all symbols.
     """
-    end_time = int(datetime.now(timezone.utc) * 1000)  # Current time in ms
+    end_time = int(datetime.now(timezone.utc).timestamp() * 1000)  # Current time in ms
     start_time = end_time - (days * 24 * 60 * 60 * 1000)  # Days before
 
+    backfill = KlineBackfill(
+        interval,
+        max_workers=max_workers,
+        client=client,
+        cache=get_cache() if use_cache else None,
+    )
+    klines_by_symbol = backfill.fetch(symbols, start_time, end_time)
+
     all_data = []
 
     for symbol in symbols:
-        params = {
-            "symbol": symbol,
-            "interval": interval,
-            "startTime": start_time,
-            "endTime": end_time,
-            "limit": 10000,  # Max records per request
-        }
-
-        try:
-            response = requests.get(BINANCE_API_URL, params=params)
-            response.raise_for_status()
-
-            data = response.json()
-            if not data:
-                logger.warning(f"No data returned for {symbol}")
-                continue
-
-            # Convert to DataFrame
-            df = pd.DataFrame(
-                data,
-                columns=[
-                    "timestamp",
-                    "open",
-                    "high",
-                    "low",
-                    "close",
-                    "volume",
-                    "close_time",
-                    "quote_asset_volume",
-                    "trades",
-                    "taker_buy_base",
-                    "taker_buy_quote",
-                    "ignore",
-                ],
-            )
+        if symbol not in klines_by_symbol:
+            continue  # Fetch failed, already logged by the backfill
 
-            # Convert timestamp to readable datetime
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-
-            # retaining only relevant columns
-            df = df[["timestamp", "open", "high", "low", "close", "volume", "trades"]]
-            df["symbol"] = symbol  # Add symbol(digital currency) for identification
+        data = klines_by_symbol[symbol]
+        if not len(data["timestamp"]):
+            logger.warning(f"No data returned for {symbol}")
+            continue
 
-            all_data.append(df)
-            logger.info(f"Successful data fetch for {symbol}")
+        # Build the frame from the typed columns, retaining only relevant ones
+        df = klines_to_frame(
+            data,
+            symbol,  # Add symbol(digital currency) for identification
+            keep=["timestamp", "open", "high", "low", "close", "volume", "trades"],
+        )
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching data for {symbol}: {e}")
-            continue
+        all_data.append(df)
+        logger.info(f"Successful data fetch for {symbol}")
 
     # Concatenate all symbols' data into a single DataFrame
     if all_data:
         return pd.concat(all_data, ignore_index=True)
     else:
         return pd.DataFrame()  # Return empty DataFrame if no data was fetched
-
@@ -0,0 +1,394 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from .file_writer import FileWriteDataReturnValue
+from .observability import get_logger
+from .ohlcv import OHLCVBatch
+
+logger = get_logger(__name__)
+
+# Hive partition keys, outermost first; their values live in the directory names
+# (symbol=BTCUSDT/interval=1h/date=2024-01-31), not in the files.
+PARTITION_SCHEMA = pa.schema(
+    [("symbol", pa.string()), ("interval", pa.string()), ("date", pa.string())]
+)
+DEFAULT_ROW_GROUP_SIZE = 1_000_000
+TIME_TYPE = pa.timestamp("ms", tz="UTC")  # Time column type of every file, as in OHLCVBatch
+
+DatasetInput = Union[pd.DataFrame, pa.Table, pa.RecordBatch, OHLCVBatch]
+TimeBound = Union[str, int, datetime, pd.Timestamp, None]  # ints are epoch ms
+
+
+def _file_name(prefix: str) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return f"{prefix}-{stamp}-{uuid.uuid4().hex[:12]}.parquet"
+
+
+def _write_atomic(table: pa.Table, path: str, **kwargs):
+    """Write to a hidden temporary file first so readers never see a partial file."""
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table, tmp_path, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def _to_table(data: DatasetInput) -> pa.Table:
+    if isinstance(data, OHLCVBatch):
+        return data.to_arrow()
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data])
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False)
+    return data
+
+
+def _normalize_time(table: pa.Table, time_column: str) -> pa.Table:
+    """Store timestamp columns as TIME_TYPE, whatever unit and zone the writer used."""
+    index = table.schema.get_field_index(time_column)
+    if index < 0 or not pa.types.is_timestamp(table.schema.field(index).type):
+        return table
+    column = table.column(index)
+    if column.type != TIME_TYPE:
+        column = column.cast(TIME_TYPE, safe=False)  # Candles have ms precision
+    return table.set_column(index, pa.field(time_column, TIME_TYPE), column)
+
+
+def partition_files(directory: str) -> List[str]:
+    """Visible Parquet files of one partition directory, oldest name first."""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(".parquet") and not name.startswith((".", "_"))
+    )
+
+
+class PartitionedDatasetWriter:
+    """
+    Appends OHLCV rows to a Hive-partitioned Parquet dataset.
+
+    Every write adds new files, one per (symbol, date) partition touched, and
+    never rewrites existing ones; rows inside a file are sorted by time.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        interval: Optional[str] = None,
+        time_column: str = "timestamp",
+        schema: Optional[pa.Schema] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        compression: str = "snappy",
+    ):
+        """
+        :param root: Dataset root directory.
+        :param interval: Candle interval partition (e.g. "1h"); None leaves the
+            level out, e.g. for trades.
+        :param time_column: Column the date partition is derived from, either a
+            timestamp or epoch milliseconds.
+        :param schema: Optional schema every written table is cast to, so files
+            appended over time stay compatible.
+        :param row_group_size: Maximum rows per row group.
+        :param compression: Parquet compression codec.
+        """
+        self.root = root
+        self.interval = interval
+        self.time_column = time_column
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.compression = compression
+        os.makedirs(root, exist_ok=True)
+
+    def partition_dir(self, symbol: str, date: str) -> str:
+        parts = [f"symbol={symbol}"]
+        if self.interval is not None:
+            parts.append(f"interval={self.interval}")
+        parts.append(f"date={date}")
+        return os.path.join(self.root, *parts)
+
+    def write(self, data: DatasetInput) -> FileWriteDataReturnValue:
+        """
+        Append rows to the dataset.
+
+        :param data: DataFrame, Arrow table/record batch or OHLCVBatch with a
+            "symbol" column and the time column.
+        :return: FileWriteDataReturnValue listing the files created.
+        """
+        table = _to_table(data)
+        if table.num_rows == 0:
+            return FileWriteDataReturnValue(paths=[], rows_written=0)
+
+        symbols = table.column("symbol").combine_chunks()
+        if not pa.types.is_dictionary(symbols.type):
+            symbols = symbols.dictionary_encode()
+        codes = symbols.indices.to_numpy(zero_copy_only=False).astype(np.int64)
+        times = table.column(self.time_column).to_numpy().astype("datetime64[ms]")
+        days = times.astype("datetime64[D]").astype(np.int64)
+
+        # Group rows by (symbol, day) and order each group by time
+        order = np.lexsort((times.astype(np.int64), days, codes))
+        keys = codes[order] * (days.max() - days.min() + 1) + (days[order] - days.min())
+        bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+
+        table = _normalize_time(table.drop_columns(["symbol"]), self.time_column)
+        if self.schema is not None:
+            table = table.select(self.schema.names).cast(self.schema)
+
+        paths = []
+        dictionary = symbols.dictionary.to_pylist()
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            first = order[start]
+            symbol = dictionary[codes[first]]
+            date = str(np.datetime64(int(days[first]), "D"))
+            directory = self.partition_dir(symbol, date)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, _file_name("part"))
+            _write_atomic(
+                table.take(order[start:end]),
+                path,
+                row_group_size=self.row_group_size,
+                compression=self.compression,
+            )
+            paths.append(path)
+
+        logger.info(f"Appended {table.num_rows} rows in {len(paths)} files under {self.root}")
+        return FileWriteDataReturnValue(paths=paths, rows_written=table.num_rows)
+
+
+def compact_partition(
+    directory: str,
+    time_column: str = "timestamp",
+    target_rows: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = "snappy",
+) -> FileWriteDataReturnValue:
+    """
+    Merge the small files of one partition into files of up to `target_rows`
+    rows, each written as a single row group sorted by time.
+
+    Files written with other column orders, extra columns or other time units
+    (e.g. pandas nanoseconds next to OHLCVBatch milliseconds) are merged by
+    column name into one schema. Only files present when the call starts are
+    touched, so concurrent appends are safe. The merged files are renamed into
+    place before the originals are removed: a reader may briefly see rows
+    twice, but never misses any.
+
+    :param directory: Partition directory.
+    :param time_column: Column the merged rows are sorted by.
+    :param target_rows: Row group (and file) size of the merged files.
+    :param compression: Parquet compression codec.
+    :return: FileWriteDataReturnValue listing the files created.
+    """
+    small = [
+        path
+        for path in partition_files(directory)
+        if pq.ParquetFile(path).metadata.num_rows < target_rows
+    ]
+    if len(small) < 2:
+        return FileWriteDataReturnValue(paths=[], rows_written=0)
+
+    table = pa.concat_tables(
+        [
+            _normalize_time(pq.read_table(path).replace_schema_metadata(None), time_column)
+            for path in small
+        ],
+        promote_options="permissive",
+    ).sort_by(time_column)
+    paths = []
+    for offset in range(0, table.num_rows, target_rows):
+        path = os.path.join(directory, _file_name("compacted"))
+        _write_atomic(
+            table.slice(offset, target_rows),
+            path,
+            row_group_size=target_rows,
+            compression=compression,
+        )
+        paths.append(path)
+    for path in small:
+        os.remove(path)
+
+    logger.info(f"Compacted {len(small)} files into {len(paths)} in {directory}")
+    return FileWriteDataReturnValue(paths=paths, rows_written=table.num_rows)
+
+
+def compact_dataset(root: str, **kwargs) -> FileWriteDataReturnValue:
+    """Run compact_partition on every partition directory under `root`."""
+    paths = []
+    rows_written = 0
+    for directory, _, files in os.walk(root):
+        if any(name.endswith(".parquet") for name in files):
+            result = compact_partition(directory, **kwargs)
+            paths.extend(result.paths)
+            rows_written += result.rows_written
+    return FileWriteDataReturnValue(paths=paths, rows_written=rows_written)
+
+
+class DatasetCompactor:
+    """Periodically compacts a dataset on a background thread."""
+
+    def __init__(self, root: str, interval_seconds: float = 600.0, **kwargs):
+        """
+        :param root: Dataset root directory.
+        :param interval_seconds: Pause between compaction runs.
+        :param kwargs: Passed on to compact_partition.
+        """
+        self.root = root
+        self.interval_seconds = interval_seconds
+        self.kwargs = kwargs
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="dataset-compactor", daemon=True
+        )
+
+    def start(self):
+        """Start the background compaction thread."""
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                compact_dataset(self.root, **self.kwargs)
+            except Exception as e:
+                logger.error(f"Compaction of {self.root} failed: {e}")
+
+    def stop(self):
+        """Stop the thread; a run in progress is finished first."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def _to_utc(value: TimeBound) -> Optional[pd.Timestamp]:
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return pd.Timestamp(int(value), unit="ms", tz="UTC")
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+
+def open_dataset(root: str, memory_map: bool = True) -> pds.Dataset:
+    """Open a dataset written by PartitionedDatasetWriter (any partition levels)."""
+    partition_fields = set()
+    for directory, _, _ in os.walk(root):
+        partition_fields.update(
+            part.split("=", 1)[0] for part in directory.split(os.sep) if "=" in part
+        )
+    partitioning = pds.partitioning(
+        pa.schema([field for field in PARTITION_SCHEMA if field.name in partition_fields]),
+        flavor="hive",
+    )
+    return pds.dataset(
+        root,
+        format="parquet",
+        partitioning=partitioning,
+        filesystem=pafs.LocalFileSystem(use_mmap=memory_map),
+    )
+
+
+def read_ohlcv(
+    symbols: Optional[Sequence[str]] = None,
+    start: TimeBound = None,
+    end: TimeBound = None,
+    columns: Optional[List[str]] = None,
+    root: str = "data/ohlcv",
+    interval: Optional[str] = None,
+    time_column: str = "timestamp",
+    memory_map: bool = True,
+    as_table: bool = False,
+) -> Union[pd.DataFrame, pa.Table]:
+    """
+    Read a slice of the partitioned dataset, touching as little of it as possible.
+
+    Symbol, interval and date filters prune whole partition directories; the
+    time range is also pushed down to the row-group min/max statistics in the
+    Parquet footers, and only the requested columns are decoded.
+
+    :param symbols: Symbols to read; None reads all.
+    :param start: Inclusive lower time bound (timestamp, string or epoch ms).
+    :param end: Exclusive upper time bound.
+    :param columns: Columns to return; None returns all, partition keys included.
+    :param root: Dataset root directory.
+    :param interval: Candle interval partition to read, e.g. "1h".
+    :param time_column: Column the time bounds apply to.
+    :param memory_map: Memory-map local files instead of reading them into buffers.
+    :param as_table: Return a pyarrow Table instead of a DataFrame.
+    :return: The matching rows sorted by symbol and time.
+    """
+    dataset = open_dataset(root, memory_map)
+    names = set(dataset.schema.names)
+    start, end = _to_utc(start), _to_utc(end)
+
+    conditions = []
+    if symbols is not None:
+        conditions.append(pds.field("symbol").isin(list(symbols)))
+    if interval is not None and "interval" in names:
+        conditions.append(pds.field("interval") == interval)
+
+    time_type = dataset.schema.field(time_column).type
+    for bound, op in ((start, "ge"), (end, "lt")):
+        if bound is None:
+            continue
+        if "date" in names:
+            day = bound.strftime("%Y-%m-%d")
+            conditions.append(
+                pds.field("date") >= day if op == "ge" else pds.field("date") <= day
+            )
+        value = (
+            pa.scalar(bound.to_pydatetime(), type=time_type)
+            if pa.types.is_timestamp(time_type)
+            else int(bound.value // 1_000_000)
+        )
+        field = pds.field(time_column)
+        conditions.append(field >= value if op == "ge" else field < value)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    sort_keys = [
+        (name, "ascending") for name in ("symbol", time_column) if name in table.column_names
+    ]
+    if sort_keys:
+        table = table.sort_by(sort_keys)
+    logger.info(f"Read {table.num_rows} rows from {root}")
+    return table if as_table else table.to_pandas()
+
+
+def dataset_watermark(root: str, symbol: str, interval: str) -> Optional[int]:
+    """
+    Newest candle open time stored for (symbol, interval), read from the Parquet
+    footer statistics only, so no data pages are decoded.
+
+    :return: Epoch ms, or None if nothing is stored.
+    """
+    if not os.path.isdir(root):
+        return None
+    dataset = open_dataset(root)
+    if "symbol" not in dataset.schema.names:
+        return None  # Nothing written yet
+    expression = pds.field("symbol") == symbol
+    if "interval" in dataset.schema.names:
+        expression &= pds.field("interval") == interval
+
+    newest = None
+    for fragment in dataset.get_fragments(filter=expression):
+        metadata = fragment.metadata
+        index = metadata.schema.to_arrow_schema().get_field_index("timestamp")
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(index).statistics
+            if stats is not None and stats.has_min_max:
+                value = pd.Timestamp(stats.max)
+                value = value.tz_localize("UTC") if value.tzinfo is None else value
+                newest = value if newest is None else max(newest, value)
+    return None if newest is None else newest.value // 1_000_000
@@ -1,13 +1,26 @@
+import asyncio
 from datetime import datetime, timezone
-import json
-from typing import List
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
 
-import pandas as pd
-import websocket
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-from observability import get_logger
+from .candles import CandleStateTable
+from .json_codec import kline_values
+from .observability import counter, get_logger, get_stream_logger, histogram
+from .stream_manager import KlineGapFiller, StreamManager
 
 logger = get_logger(__name__)
+stream_logger = get_stream_logger(__name__, noun="closed candles", key_noun="symbols")
+
+FLUSH_SECONDS = histogram("sink_flush_seconds", "Time to write one micro-batch")
+ROWS_FLUSHED = counter("sink_rows_flushed_total", "Kline rows written by the sink")
+SINK_FULL = counter("sink_buffer_full_total", "Rows that waited for the sink buffer to drain")
 
 
 class FileWriteDataReturnValue:
@@ -21,93 +34,360 @@ class FileWriteDataReturnValue:
         return f"FileWriteDataReturnValue(paths={self.paths}, rows_written={self.rows_written})"
 
 
+KLINE_SCHEMA = pa.schema(
+    [
+        ("symbol", pa.dictionary(pa.int32(), pa.string())),
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64()),
+        ("trades", pa.int64()),
+        ("taker_buy_base", pa.float64()),
+        ("taker_buy_quote", pa.float64()),
+    ]
+)
+
+# Buffer dtypes for non-float columns; symbols are stored as dictionary codes
+BUFFER_DTYPES = {"symbol": np.int32, "timestamp": np.int64, "trades": np.int64}
+
+
+def kline_row(symbol: str, kline: dict) -> tuple:
+    """Typed row of one kline event, in the field order of KlineRingBuffer.append."""
+    return (symbol,) + kline_values(kline)
+
+
+class KlineRingBuffer:
+    """Preallocated columnar ring buffer of kline rows shared by a producer and a flusher."""
+
+    def __init__(self, capacity: int = 100_000):
+        """
+        :param capacity: Number of rows the buffer can hold before producers wait.
+        """
+        self.capacity = capacity
+        self.columns = {
+            field.name: np.empty(capacity, dtype=BUFFER_DTYPES.get(field.name, np.float64))
+            for field in KLINE_SCHEMA
+        }
+        self.symbols = []  # symbol code -> symbol
+        self._codes = {}  # symbol -> symbol code
+        self._head = 0  # total rows ever written
+        self._tail = 0  # total rows ever drained
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def append(
+        self,
+        symbol: str,
+        timestamp: int,
+        open_price: float,
+        high_price: float,
+        low_price: float,
+        close_price: float,
+        volume: float,
+        trades: int,
+        taker_buy_base: float,
+        taker_buy_quote: float,
+        timeout: Optional[float] = None,
+    ) -> int:
+        """
+        Append one kline row, waiting only if the flusher has fallen a full buffer behind.
+
+        :param timeout: Seconds to wait for a free slot; None waits for as long as
+            it takes, 0 does not wait at all.
+        :return: Number of rows currently buffered.
+        :raise queue.Full: If the buffer is still full after `timeout` seconds.
+        """
+        with self._lock:
+            full = self._head - self._tail >= self.capacity
+            if full and not self._not_full.wait_for(
+                lambda: self._head - self._tail < self.capacity, timeout
+            ):
+                raise queue.Full
+
+            code = self._codes.get(symbol)
+            if code is None:
+                code = self._codes[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+
+            slot = self._head % self.capacity
+            columns = self.columns
+            columns["symbol"][slot] = code
+            columns["timestamp"][slot] = timestamp
+            columns["open"][slot] = open_price
+            columns["high"][slot] = high_price
+            columns["low"][slot] = low_price
+            columns["close"][slot] = close_price
+            columns["volume"][slot] = volume
+            columns["trades"][slot] = trades
+            columns["taker_buy_base"][slot] = taker_buy_base
+            columns["taker_buy_quote"][slot] = taker_buy_quote
+            self._head += 1
+            return self._head - self._tail
+
+    def drain(self) -> Optional[pa.RecordBatch]:
+        """Copy every buffered row out as one Arrow record batch and free the slots."""
+        with self._lock:
+            if self._head == self._tail:
+                return None
+            slots = np.arange(self._tail, self._head) % self.capacity
+            arrays = {name: values[slots] for name, values in self.columns.items()}
+            symbols = list(self.symbols)
+            self._tail = self._head
+            self._not_full.notify_all()
+
+        return pa.RecordBatch.from_arrays(
+            [
+                pa.DictionaryArray.from_arrays(arrays["symbol"], pa.array(symbols))
+                if field.name == "symbol"
+                else pa.array(arrays[field.name], type=field.type)
+                for field in KLINE_SCHEMA
+            ],
+            schema=KLINE_SCHEMA,
+        )
+
+
+class RollingParquetWriter:
+    """Appends record batches to Parquet files, starting a new file by row count or age."""
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "klines",
+        max_rows_per_file: int = 1_000_000,
+        max_file_seconds: float = 3600.0,
+        schema: pa.Schema = KLINE_SCHEMA,
+    ):
+        """
+        :param directory: Directory the Parquet files are written to.
+        :param prefix: File name prefix.
+        :param max_rows_per_file: Roll to a new file after this many rows.
+        :param max_file_seconds: Roll to a new file after this many seconds.
+        :param schema: Schema of the incoming record batches.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_rows_per_file = max_rows_per_file
+        self.max_file_seconds = max_file_seconds
+        self.schema = schema
+        self.paths = []
+        self.rows_written = 0
+        self._writer = None
+        self._file_rows = 0
+        self._file_opened_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(
+            self.directory, f"{self.prefix}-{stamp}-{len(self.paths):05d}.parquet"
+        )
+        self._writer = pq.ParquetWriter(path, self.schema)
+        self._file_rows = 0
+        self._file_opened_at = time.monotonic()
+        self.paths.append(path)
+        logger.info(f"Opened {path}")
+
+    def _roll_due(self) -> bool:
+        return (
+            self._file_rows >= self.max_rows_per_file
+            or time.monotonic() - self._file_opened_at >= self.max_file_seconds
+        )
+
+    def write_batch(self, batch: pa.RecordBatch):
+        """Write one record batch as a row group of the current file."""
+        if self._writer is not None and self._roll_due():
+            self._writer.close()
+            self._writer = None
+        if self._writer is None:
+            self._open()
+        try:
+            self._writer.write_batch(batch)
+        except Exception:
+            self._abandon()  # A retry starts a new file rather than extend a broken one
+            raise
+        self._file_rows += batch.num_rows
+        self.rows_written += batch.num_rows
+
+    def _abandon(self):
+        try:
+            self._writer.close()
+        except Exception as e:
+            logger.error(f"Failed to close {self.paths[-1]}: {e}")
+        self._writer = None
+
+    def close(self) -> FileWriteDataReturnValue:
+        """Close the current file and report everything written."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return FileWriteDataReturnValue(paths=self.paths, rows_written=self.rows_written)
+
+
+class MicroBatchSink:
+    """Buffers kline rows off the websocket thread and flushes them in micro-batches."""
+
+    def __init__(
+        self,
+        writer: RollingParquetWriter,
+        max_batch_rows: int = 10_000,
+        max_batch_seconds: float = 1.0,
+        capacity: Optional[int] = None,
+    ):
+        """
+        :param writer: Destination for flushed record batches.
+        :param max_batch_rows: Flush once this many rows are buffered.
+        :param max_batch_seconds: Flush at least this often while rows are buffered.
+        :param capacity: Ring buffer size, defaults to four batches.
+        """
+        self.writer = writer
+        self.max_batch_rows = max_batch_rows
+        self.max_batch_seconds = max_batch_seconds
+        self.buffer = KlineRingBuffer(capacity or 4 * max_batch_rows)
+        self.pending: List[pa.RecordBatch] = []  # Drained, not yet written
+        self._flush_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="kline-sink-flusher", daemon=True
+        )
+
+    def start(self):
+        """Start the background flusher thread."""
+        self._thread.start()
+        return self
+
+    def put(self, *row, timeout: Optional[float] = None):
+        """
+        Buffer one kline row (see KlineRingBuffer.append for the field order).
+
+        :param timeout: Seconds to wait while the buffer is full; None waits for good.
+        :raise queue.Full: If the buffer is still full after `timeout` seconds.
+        """
+        if self.buffer.append(*row, timeout=timeout) >= self.max_batch_rows:
+            self._flush_requested.set()
+
+    async def put_async(self, *row):
+        """
+        put() for the event loop: while the buffer is full, the wait for the
+        flusher happens in a worker thread, so the loop keeps serving other streams.
+        """
+        try:
+            self.put(*row, timeout=0)
+            return
+        except queue.Full:
+            SINK_FULL.inc()
+        while True:
+            self._flush_requested.set()
+            try:
+                await asyncio.to_thread(self.put, *row, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def flush(self):
+        """
+        Write every buffered row to the writer.
+
+        A batch whose write fails stays pending and is written first by the next
+        flush, so a transient disk error delays candles instead of losing them.
+        """
+        batch = self.buffer.drain()
+        if batch is not None:
+            self.pending.append(batch)
+        while self.pending:
+            batch = self.pending[0]
+            with FLUSH_SECONDS.time():
+                self.writer.write_batch(batch)
+            self.pending.pop(0)
+            ROWS_FLUSHED.inc(batch.num_rows)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._flush_requested.wait(self.max_batch_seconds)
+            self._flush_requested.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                rows = sum(batch.num_rows for batch in self.pending)
+                logger.error(f"Failed to flush kline batch, {rows} rows kept for a retry: {e}")
+
+    def close(self) -> FileWriteDataReturnValue:
+        """Stop the flusher, drain what is left and close the writer."""
+        self._stopped.set()
+        self._flush_requested.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+        return self.writer.close()
+
+
 class BinanceWebSocketClient:
     """Class to handle Binance WebSocket connections for real-time OHLCV data streaming."""
 
-    def __init__(self, symbols: List[str], interval: str = "1m"):
+    def __init__(
+        self,
+        symbols: List[str],
+        interval: str = "1m",
+        sink: Optional[MicroBatchSink] = None,
+        candles: Optional[CandleStateTable] = None,
+        streams_per_connection: int = 200,
+    ):
         """
         Initialize the Binance WebSocket client.
 
         :param symbols: List of trading pairs to subscribe (e.g., ["btcusdt", "ethusdt"])
         :param interval: Time interval for kline data (e.g., "1m", "5m", "1h", etc.)
+        :param sink: Optional sink that buffers and persists received klines
+        :param candles: State table deciding which kline updates are emitted;
+            defaults to emitting closed candles only
+        :param streams_per_connection: Kline streams multiplexed over one connection
         """
         self.symbols = [f"{symbol.lower()}@kline_{interval}" for symbol in symbols]
-        self.ws = None
-
-    def on_message(self, ws, message):
-        """Handle incoming WebSocket messages."""
-        data = json.loads(message)
-        kline = data.get("k", {})
-
-        # Extract relevant fields from the kline data
-        timestamp = datetime.fromtimestamp(kline["t"] / 1000, timezone.utc)
-
-        open_price = float(kline["o"])
-        high_price = float(kline["h"])
-        low_price = float(kline["l"])
-        close_price = float(kline["c"])
-        volume = float(kline["v"])
-        trades = int(kline["n"])
-        symbol = data.get("s", "UNKNOWN")
-
-        # Create a DataFrame with the incoming data
-        df = pd.DataFrame(
-            [
-                [
-                    symbol,
-                    timestamp,
-                    open_price,
-                    high_price,
-                    low_price,
-                    close_price,
-                    volume,
-                    trades,
-                ]
-            ],
-            columns=[
-                "symbol",
-                "timestamp",
-                "open",
-                "high",
-                "low",
-                "close",
-                "volume",
-                "trades",
-            ],
+        self.sink = sink
+        self.candles = candles or CandleStateTable()
+        self.streams = StreamManager(
+            self.symbols,
+            self.on_message,
+            streams_per_connection=streams_per_connection,
+            gap_filler=KlineGapFiller(self.candles),
         )
 
-        # Log and process the data
-        logger.info(f"New data received for {symbol}: {df.iloc[0].to_dict()}")
-        print(df)
+    async def on_message(self, stream: str, data: dict):
+        """Handle one kline event routed from the combined stream."""
+        kline = data.get("k")
+        if not kline:
+            return  # Subscription acknowledgements carry no kline
 
-        # Further processing (e.g., save to file, database, etc.) can be added here
+        kline = self.candles.update(kline)
+        if kline is None:
+            return  # Partial update of a candle that is still open
 
-    def on_error(self, ws, error):
-        """Handle WebSocket errors."""
-        logger.error(f"WebSocket Error: {error}")
+        symbol = data.get("s", "UNKNOWN")
 
-    def on_close(self, ws, close_status_code, close_msg):
-        """Handle WebSocket closure."""
-        logger.info(f"WebSocket closed with code {close_status_code}: {close_msg}")
+        # Hand the typed row to the sink; persisting happens on its flusher thread
+        if self.sink is not None:
+            await self.sink.put_async(*kline_row(symbol, kline))
 
-    def on_open(self, ws):
-        """Send a subscription message when WebSocket opens."""
-        subscribe_message = {
-            "method": "SUBSCRIBE",
-            "params": self.symbols,  # Subscribe to multiple symbols dynamically
-            "id": 1,
-        }
-        ws.send(json.dumps(subscribe_message))
-        logger.info(f"Subscribed to {', '.join(self.symbols)}")
+        stream_logger.log(
+            symbol,
+            "Closed %s candle at %d: close=%s volume=%s",
+            symbol,
+            kline["t"],
+            kline["c"],
+            kline["v"],
+        )
 
     def start_stream(self):
         """Start the Binance WebSocket stream."""
-        url = "wss://stream.binance.com:9443/ws"
-        self.ws = websocket.WebSocketApp(
-            url,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-        )
-        self.ws.on_open = self.on_open
-        self.ws.run_forever()
+        if self.sink is not None:
+            self.sink.start()
+        try:
+            asyncio.run(self.streams.run())
+        finally:
+            stream_logger.flush()
+            if self.sink is not None:
+                logger.info(f"Stream stopped, {self.sink.close()}")
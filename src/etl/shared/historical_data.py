@@ -1,20 +1,22 @@
-import json
-import logging
+import asyncio
 import datetime
 import requests
 import pandas as pd
-import websocket
 from typing import List, Optional
 from dataclasses import dataclass
 
-# Configure Logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
+from .candles import CandleStateTable
+from .cleaning import clean_ohlcv
+from .dataset import PartitionedDatasetWriter
+from .klines import decode_klines, klines_to_frame
+from .masking import DataMasker
+from .observability import get_logger
+from .rest_client import KLINES_PATH, get_client
+from .stream_manager import KlineGapFiller, StreamManager
 
-BINANCE_API_URL = "https://api.binance.com/api/v3/klines"
-STREAM_URL = "wss://stream.binance.com:9443/ws"
+logger = get_logger(__name__)
+
+STREAM_INTERVAL = "1m"
 
 
 @dataclass
@@ -32,19 +34,30 @@ class OHLCVData:
 
 
 class BinanceETL:
-    def __init__(self, symbols: List[str], interval: str = "1d", days: int = 30):
+    def __init__(
+        self,
+        symbols: List[str],
+        interval: str = "1d",
+        days: int = 30,
+        candles: Optional[CandleStateTable] = None,
+    ):
         """
         Args:
             interval: define the granuality between data values
+            candles: state table deciding which streamed kline updates are
+                processed; defaults to closed candles only
         """
         self.symbols = symbols
         self.interval = interval
         self.days = days
+        self.candles = candles or CandleStateTable()
 
     def fetch_historical_data(self, symbol: str) -> Optional[pd.DataFrame]:
         """Fetch historical OHLCV data for a given symbol from Binance API."""
         try:
-            end_time = int(datetime.now(datetime.timezone.utc) * 1000)
+            end_time = int(
+                datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000
+            )
             start_time = end_time - (self.days * 24 * 60 * 60 * 1000)
 
             params = {
@@ -55,45 +68,46 @@ class BinanceETL:
                 "limit": 1000,
             }
 
-            response = requests.get(BINANCE_API_URL, params=params)
-            response.raise_for_status()
+            response = get_client().get(KLINES_PATH, params)
 
-            data = response.json()
-            df = pd.DataFrame(
-                data,
-                columns=[
+            df = klines_to_frame(
+                decode_klines(response.content),
+                symbol,
+                keep=[
                     "timestamp",
                     "open",
                     "high",
                     "low",
                     "close",
                     "volume",
-                    "close_time",
-                    "quote_asset_volume",
                     "trades",
                     "taker_buy_base",
                     "taker_buy_quote",
-                    "ignore",
                 ],
+                utc=True,
             )
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
-            df.drop(
-                columns=["close_time", "quote_asset_volume", "ignore"], inplace=True
-            )
-            df["symbol"] = symbol
 
-            return self.clean_data(df)
+            df, report = clean_ohlcv(df)
+            logger.info(f"Cleaned {symbol}: {report}")
+            return df
 
         except requests.RequestException as e:
             logger.error(f"API request failed for {symbol}: {e}")
             return None
 
-    def start_stream(self):
-        """Start real-time data stream from Binance WebSocket."""
+    def save_to_dataset(self, df: pd.DataFrame, root: str = "data/ohlcv"):
+        """Append OHLCV rows to the partitioned dataset (symbol/interval/date)."""
+        result = PartitionedDatasetWriter(root, self.interval).write(df)
+        logger.info(f"Saved {result.rows_written} rows to {len(result.paths)} files")
+        return result
 
-        def on_message(ws, message):
-            data = json.loads(message)
-            kline = data.get("k", {})
+    def start_stream(self, streams_per_connection: int = 200):
+        """Start real-time data stream from Binance WebSocket for all symbols."""
+
+        def on_message(stream, data):
+            kline = data.get("k")
+            if not kline or self.candles.update(kline) is None:
+                return
             df = pd.DataFrame(
                 [
                     [
@@ -122,28 +136,19 @@ class BinanceETL:
                     "symbol",
                 ],
             )
-            df = self.clean_data(df)
-            df = self.anonymize_data(df)
-
-        def on_error(ws, error):
-            logger.error(f"WebSocket Error: {error}")
-
-        def on_close(ws, close_status_code, close_msg):
-            logger.info("WebSocket Closed")
-
-        def on_open(ws):
-            msg = {"method": "SUBSCRIBE", "params": ["btcusdt@kline_1m"], "id": 1}
-            ws.send(json.dumps(msg))
-            logger.info("Subscribed to BTCUSDT stream.")
-
-        ws = websocket.WebSocketApp(
-            f"{STREAM_URL}/btcusdt@kline_1m",
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close,
+            df, _ = clean_ohlcv(df)
+            df = DataMasker().apply(df)
+
+        streams = [
+            f"{symbol.lower()}@kline_{STREAM_INTERVAL}" for symbol in self.symbols
+        ]
+        manager = StreamManager(
+            streams,
+            on_message,
+            streams_per_connection=streams_per_connection,
+            gap_filler=KlineGapFiller(self.candles),
         )
-        ws.on_open = on_open
-        ws.run_forever()
+        asyncio.run(manager.run())
 
 
 if __name__ == "__main__":
@@ -151,6 +156,6 @@ if __name__ == "__main__":
     for symbol in etl.symbols:
         df = etl.fetch_historical_data(symbol)
         if df is not None:
-            df = etl.anonymize_data(df)
-            etl.save_to_parquet(df, f"{symbol}_ohlcv.parquet")
+            df = DataMasker().apply(df)
+            etl.save_to_dataset(df)
     etl.start_stream()
@@ -0,0 +1,422 @@
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ohlcv import epoch_ms
+
+DEFAULT_EMA_PERIODS = [20, 50, 100, 200]
+DEFAULT_SMA_PERIODS = [20]
+DEFAULT_ATR_PERIOD = 14
+DEFAULT_RSI_PERIOD = 14
+
+
+def segment_starts(keys: np.ndarray) -> np.ndarray:
+    """
+    Start offsets of the runs of equal keys in a sorted array.
+
+    :param keys: Group keys (e.g. symbols), sorted so that each group is contiguous.
+    :return: int64 array with the first row of every segment.
+    """
+    if not len(keys):
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def segment_scale(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Largest finite magnitude of every segment, 1.0 for segments without one.
+
+    The segmented kernels divide each segment by its scale before their shared
+    cumulative sums, so a low-priced symbol never inherits the rounding error of
+    a high-priced one sorted before it.
+
+    :param values: Input series, segments contiguous.
+    :param starts: First row of every segment (see segment_starts).
+    :return: float64 array with one scale per segment.
+    """
+    if not len(values):
+        return np.ones(len(starts))
+    magnitude = np.abs(np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0))
+    scale = np.maximum.reduceat(magnitude, starts)
+    scale[scale == 0.0] = 1.0
+    return scale
+
+
+def segmented_ewm(
+    values: np.ndarray,
+    starts: np.ndarray,
+    alpha: float,
+    seeds: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Exponentially weighted mean, restarted at every segment, without a per-group loop.
+
+    Matches pandas `ewm(alpha=alpha, adjust=False, ignore_na=True).mean()` applied
+    to each segment: NaN rows carry the previous mean and leave the weights
+    untouched, and a segment is NaN until its first value. The recursion
+    y[k] = (1 - a) * y[k-1] + a * x[k] is evaluated in closed form with cumulative
+    sums over fixed-size blocks, so long histories of many symbols are handled by
+    a few NumPy passes. Blocks are sized so the rescaling factors stay far from
+    float64 overflow.
+
+    :param values: Input series, segments contiguous and each oldest first.
+    :param starts: First row of every segment (see segment_starts).
+    :param alpha: Smoothing factor, 2 / (span + 1) for an EMA, 1 / n for Wilder.
+    :param seeds: Optional value preceding each segment; NaN starts at its first value.
+    :return: Array of smoothed values, same length as `values`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    out = np.empty(n)
+    if not n:
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    # Row -> segment, first row of its segment and the value preceding the segment
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    segment_start = starts[segment]
+    # NaN rows are zero-filled and do not advance the decay, so one symbol's gaps
+    # never reach the cumulative sums of the symbols after it
+    observed = ~np.isnan(values)
+    count = np.cumsum(observed)
+    seen = count - np.r_[0, count][starts][segment]
+    # The recursion is linear: run it on unit-scale segments and scale back at the end
+    scale = segment_scale(values, starts)
+    values = np.where(observed, values / scale[segment], 0.0)
+    # Unseeded segments start at their first observation
+    observations = np.r_[np.flatnonzero(observed), n]
+    first = observations[np.searchsorted(observations, starts)]
+    initial = np.full(len(starts), np.nan)
+    has_value = first < np.r_[starts[1:], n]
+    initial[has_value] = values[first[has_value]]
+    unseeded = np.ones(len(starts), dtype=bool)
+    if seeds is not None:
+        unseeded = np.isnan(seeds)
+        initial[~unseeded] = seeds[~unseeded] / scale[~unseeded]
+
+    block = max(1, int(100 * math.log(10) / -math.log(decay)))  # decay**-block <= 1e100
+
+    for begin in range(0, n, block):
+        end = min(begin + block, n)
+        x = values[begin:end]
+        # Observations so far in this block: the decay exponent of every row
+        steps = count[begin:end] - (count[begin - 1] if begin else 0)
+        pw = decay**steps
+
+        # Local index where each row's run inside this block starts
+        run_start = np.maximum(segment_start[begin:end] - begin, 0)
+        prev = np.where(
+            segment_start[begin:end] >= begin,
+            initial[segment[begin:end]],
+            out[begin - 1] if begin else 0.0,
+        )
+
+        scaled = np.cumsum(x / pw)
+        before_run = np.where(run_start > 0, scaled[run_start - 1], 0.0)
+        steps_before_run = np.where(run_start > 0, steps[run_start - 1], 0)
+        out[begin:end] = decay ** (steps - steps_before_run) * prev + alpha * pw * (
+            scaled - before_run
+        )
+    out[(seen == 0) & unseeded[segment]] = np.nan
+    return out * scale[segment]
+
+
+def ema(values: np.ndarray, span: int, seed: Optional[float] = None) -> np.ndarray:
+    """
+    Exponential moving average matching pandas `ewm(span=span, adjust=False)`.
+
+    :param values: Input series, oldest first.
+    :param span: EMA span (period).
+    :param seed: EMA value preceding values[0]; when None the EMA starts at values[0].
+    :return: Array of EMA values, same length as `values`.
+    """
+    seeds = None if seed is None else np.array([seed], dtype=np.float64)
+    return segmented_ewm(values, np.zeros(1, dtype=np.int64), 2.0 / (span + 1), seeds)
+
+
+def segmented_sma(values: np.ndarray, starts: np.ndarray, period: int) -> np.ndarray:
+    """
+    Simple moving average per segment, NaN until a segment has `period` rows.
+
+    :param values: Input series, segments contiguous and each oldest first.
+    :param starts: First row of every segment (see segment_starts).
+    :param period: Window length.
+    :return: Array of SMA values, same length as `values`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    lengths = np.diff(np.r_[starts, n])
+    position = np.arange(n) - np.repeat(starts, lengths)
+    scale = np.repeat(segment_scale(values, starts), lengths)
+    # NaNs are zero-filled and counted, so they only blank the windows that contain them
+    missing = np.isnan(values)
+    csum = np.r_[0.0, np.cumsum(np.where(missing, 0.0, values / scale))]
+    gaps = np.r_[0, np.cumsum(missing)]
+    out = np.full(n, np.nan)
+    valid = np.flatnonzero(position >= period - 1)
+    valid = valid[gaps[valid + 1] == gaps[valid + 1 - period]]
+    out[valid] = (csum[valid + 1] - csum[valid + 1 - period]) / period * scale[valid]
+    return out
+
+
+def segmented_cumulative_ratio(
+    numerator: np.ndarray, denominator: np.ndarray, starts: np.ndarray
+) -> np.ndarray:
+    """
+    Running sum(numerator) / sum(denominator), restarted at every segment.
+
+    NaNs are skipped by the sums like pandas cumsum does; rows where either
+    input is NaN are NaN.
+    """
+    n = len(numerator)
+    lengths = np.diff(np.r_[starts, n])
+    # Sum unit-scale segments so no symbol inherits another's magnitude; the scales
+    # are restored in the ratio
+    num_scale = np.repeat(segment_scale(numerator, starts), lengths)
+    den_scale = np.repeat(segment_scale(denominator, starts), lengths)
+    missing = np.isnan(numerator) | np.isnan(denominator)
+    num = np.cumsum(np.where(np.isnan(numerator), 0.0, numerator / num_scale))
+    den = np.cumsum(np.where(np.isnan(denominator), 0.0, denominator / den_scale))
+    num_base = np.repeat(np.r_[0.0, num][starts], lengths)
+    den_base = np.repeat(np.r_[0.0, den][starts], lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (num - num_base) / (den - den_base) * (num_scale / den_scale)
+    ratio[missing] = np.nan
+    return ratio
+
+
+def _previous_in_segment(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """values shifted by one row, NaN at the first row of every segment."""
+    previous = np.empty(len(values))
+    previous[1:] = values[:-1]
+    previous[starts] = np.nan
+    return previous
+
+
+def _segment_indicators(
+    columns: Dict[str, np.ndarray],
+    starts: np.ndarray,
+    ema_periods: List[int],
+    sma_periods: List[int],
+    atr_period: Optional[int],
+    rsi_period: Optional[int],
+) -> Dict[str, np.ndarray]:
+    """Compute every indicator over contiguous symbol segments in one pass."""
+    close = columns["close"]
+    result = {}
+
+    for period in ema_periods:
+        result[f"EMA_{period}"] = segmented_ewm(close, starts, 2.0 / (period + 1))
+    for period in sma_periods:
+        result[f"SMA_{period}"] = segmented_sma(close, starts, period)
+
+    if "high" in columns and "low" in columns:
+        high, low = columns["high"], columns["low"]
+        if "volume" in columns:
+            volume = columns["volume"]
+            typical = (high + low + close) / 3.0
+            result["VWAP"] = segmented_cumulative_ratio(typical * volume, volume, starts)
+        if atr_period:
+            previous_close = _previous_in_segment(close, starts)
+            true_range = np.fmax(
+                high - low,
+                np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)),
+            )
+            result[f"ATR_{atr_period}"] = segmented_ewm(
+                true_range, starts, 1.0 / atr_period
+            )
+
+    if rsi_period:
+        change = np.nan_to_num(close - _previous_in_segment(close, starts))
+        gain = segmented_ewm(np.maximum(change, 0.0), starts, 1.0 / rsi_period)
+        loss = segmented_ewm(np.maximum(-change, 0.0), starts, 1.0 / rsi_period)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result[f"RSI_{rsi_period}"] = np.where(
+                loss == 0.0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss)
+            )
+    return result
+
+
+def add_indicators(
+    df: pd.DataFrame,
+    ema_periods: List[int] = DEFAULT_EMA_PERIODS,
+    sma_periods: List[int] = DEFAULT_SMA_PERIODS,
+    atr_period: Optional[int] = DEFAULT_ATR_PERIOD,
+    rsi_period: Optional[int] = DEFAULT_RSI_PERIOD,
+    processes: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Add EMA, SMA, VWAP, ATR and RSI columns computed per symbol.
+
+    The frame is sorted once by (symbol, timestamp); every indicator then runs
+    as a vectorized pass over the contiguous symbol segments, so values never
+    bleed from one symbol into the next. VWAP is cumulative over each symbol's
+    rows, ATR and RSI use Wilder smoothing. VWAP and ATR need high/low (and
+    volume) columns and are skipped without them.
+
+    :param df: DataFrame with "symbol", "timestamp" and "close" columns
+    :param ema_periods: List of periods for EMAs
+    :param sma_periods: List of periods for SMAs
+    :param atr_period: ATR period, or None to skip
+    :param rsi_period: RSI period, or None to skip
+    :param processes: Split symbols over this many worker processes
+    :return: Sorted DataFrame with the indicator columns added
+    """
+    df = df.sort_values(["symbol", "timestamp"], kind="stable", ignore_index=True)
+    starts = segment_starts(df["symbol"].to_numpy())
+    columns = {
+        name: df[name].to_numpy(dtype=np.float64)
+        for name in ("open", "high", "low", "close", "volume")
+        if name in df
+    }
+    params = (ema_periods, sma_periods, atr_period, rsi_period)
+
+    if processes and processes > 1 and len(starts) > 1:
+        # Cut on segment boundaries so every worker gets whole symbols
+        chunks = np.array_split(starts, min(processes, len(starts)))
+        bounds = [chunk[0] for chunk in chunks] + [len(df)]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            parts = list(
+                executor.map(
+                    _segment_indicators,
+                    [
+                        {k: v[lo:hi] for k, v in columns.items()}
+                        for lo, hi in zip(bounds[:-1], bounds[1:])
+                    ],
+                    [chunk - chunk[0] for chunk in chunks],
+                    *([param] * len(chunks) for param in params),
+                )
+            )
+        result = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    else:
+        result = _segment_indicators(columns, starts, *params)
+
+    for name, values in result.items():
+        df[name] = values
+    return df
+
+
+class EMAEngine:
+    """
+    Incremental EMAs that carry their state across batches and streamed candles.
+
+    The last EMA value is kept per (symbol, period), so a new candle costs O(1)
+    per period and an appended batch only costs its own length.
+    """
+
+    def __init__(self, periods: List[int] = DEFAULT_EMA_PERIODS):
+        """
+        :param periods: List of periods for EMAs
+        """
+        self.periods = list(periods)
+        self.state: Dict[Tuple[str, int], float] = {}  # (symbol, period) -> last EMA
+        self.last_timestamp: Dict[str, int] = {}  # symbol -> last applied candle (ms)
+
+    def update(
+        self, symbol: str, close: float, timestamp: Optional[int] = None
+    ) -> Dict[int, float]:
+        """
+        Advance the EMAs of `symbol` by one closed candle.
+
+        :param symbol: Trading pair of the candle.
+        :param close: Close price of the candle.
+        :param timestamp: Open time in ms; candles not newer than the last one are ignored.
+        :return: Mapping of period to the current EMA value.
+        """
+        if timestamp is not None:
+            if timestamp <= self.last_timestamp.get(symbol, -1):
+                return {p: self.state[(symbol, p)] for p in self.periods}
+            self.last_timestamp[symbol] = timestamp
+
+        values = {}
+        for period in self.periods:
+            key = (symbol, period)
+            prev = self.state.get(key)
+            if prev is None:
+                value = close
+            else:
+                alpha = 2.0 / (period + 1)
+                value = prev + alpha * (close - prev)
+            self.state[key] = values[period] = value
+        return values
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add EMA_<period> columns to a batch that continues the engine's state.
+
+        Rows must be in time order within each symbol. Symbols without state are
+        cold-started from their first close. With "symbol" and "timestamp"
+        columns, rows not newer than a symbol's last applied candle (as in
+        `update`) are skipped: they get NaN and leave the state untouched, so
+        re-applying an overlapping batch does not advance the EMAs twice.
+
+        :param df: DataFrame with "close" (and optionally "symbol"/"timestamp") columns;
+            integer timestamps are epoch ms
+        :return: The same DataFrame with EMA columns added
+        """
+        close = df["close"].to_numpy(dtype=np.float64)
+        times = None
+        if "symbol" in df:
+            codes, symbols = pd.factorize(df["symbol"])
+            order = np.argsort(codes, kind="stable")  # contiguous symbols, time order kept
+            if "timestamp" in df:
+                times = epoch_ms(df["timestamp"])
+                never = np.iinfo(np.int64).min
+                marks = np.array(
+                    [self.last_timestamp.get(symbol, never) for symbol in symbols], dtype=np.int64
+                )
+                order = order[times[order] > marks[codes[order]]]
+            sorted_codes = codes[order]
+            starts = segment_starts(sorted_codes)
+            segment_symbols = symbols[sorted_codes[starts]]
+        else:
+            order = np.arange(len(df))
+            starts = np.zeros(min(len(df), 1), dtype=np.int64)
+            segment_symbols = [None] * len(starts)
+        ends = np.r_[starts[1:], len(order)][: len(starts)] - 1
+
+        for period in self.periods:
+            seeds = np.array(
+                [self.state.get((symbol, period), np.nan) for symbol in segment_symbols]
+            )
+            result = np.full(len(df), np.nan)
+            result[order] = segmented_ewm(close[order], starts, 2.0 / (period + 1), seeds)
+            df[f"EMA_{period}"] = result
+            last_values = result[order[ends]].tolist()
+            for symbol, value in zip(segment_symbols, last_values):
+                self.state[(symbol, period)] = value
+
+        if times is not None:
+            for symbol, last in zip(segment_symbols, times[order[ends]].tolist()):
+                self.last_timestamp[symbol] = last
+        return df
+
+    def save(self, path: str):
+        """Persist the engine state as JSON."""
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "periods": self.periods,
+                    "state": [[s, p, v] for (s, p), v in self.state.items()],
+                    "last_timestamp": self.last_timestamp,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "EMAEngine":
+        """Restore an engine saved with `save`."""
+        with open(path) as f:
+            saved = json.load(f)
+        engine = cls(saved["periods"])
+        engine.state = {(s, p): v for s, p, v in saved["state"]}
+        engine.last_timestamp = saved["last_timestamp"]
+        return engine
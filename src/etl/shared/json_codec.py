@@ -0,0 +1,188 @@
+"""
+Pluggable JSON decoding for stream messages and REST payloads.
+
+The fastest installed backend is used: msgspec, then orjson, then the
+standard library. Set ETL_JSON_BACKEND (or call set_backend) to pin one.
+
+With msgspec, kline events and trade pages are decoded straight into typed
+structs: prices arrive as floats and times as ints, so no per-field string
+conversion is left for the handlers. The structs support `record["field"]`
+and `record.get("field")`, so code written against the parsed dicts works
+with either.
+"""
+
+import json
+import os
+from typing import Callable, Dict, List, Union
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional speedup
+    msgspec = None
+
+JsonInput = Union[bytes, bytearray, memoryview, str]
+
+BACKENDS: Dict[str, Callable[[JsonInput], object]] = {"json": json.loads}
+if orjson is not None:
+    BACKENDS["orjson"] = orjson.loads
+if msgspec is not None:
+    BACKENDS["msgspec"] = msgspec.json.decode
+
+if msgspec is not None:
+
+    class _Record(msgspec.Struct):
+        """Struct readable like the dict it replaces."""
+
+        def __getitem__(self, name: str):
+            return getattr(self, name)
+
+        def get(self, name: str, default=None):
+            return getattr(self, name, default)
+
+    class Kline(_Record):
+        t: int
+        T: int
+        s: str
+        i: str
+        o: float
+        c: float
+        h: float
+        l: float  # noqa: E741 - Binance field name
+        v: float
+        n: int
+        x: bool
+        q: float
+        V: float
+        Q: float
+
+    class KlineEvent(_Record):
+        e: str
+        E: int
+        s: str
+        k: Kline
+
+    class KlineMessage(_Record):
+        stream: str
+        data: KlineEvent
+
+    class AggTrade(_Record):
+        a: int
+        p: float
+        q: float
+        f: int
+        l: int  # noqa: E741 - Binance field name
+        T: int
+        m: bool
+
+    class Trade(_Record):
+        id: int
+        price: float
+        qty: float
+        quoteQty: float
+        time: int
+        isBuyerMaker: bool
+
+    # strict=False lets the decoder parse Binance's quoted numbers into floats
+    _KLINE_MESSAGE = msgspec.json.Decoder(KlineMessage, strict=False)
+    _TRADE_PAGES = {
+        "aggTrades": msgspec.json.Decoder(List[AggTrade], strict=False),
+        "trades": msgspec.json.Decoder(List[Trade], strict=False),
+        "historicalTrades": msgspec.json.Decoder(List[Trade], strict=False),
+    }
+
+_backend = next(name for name in ("msgspec", "orjson", "json") if name in BACKENDS)
+_loads = BACKENDS[_backend]
+
+
+def set_backend(name: str):
+    """
+    Select the backend used by every decode function.
+
+    :param name: One of BACKENDS, i.e. "json" and whichever of "orjson" and
+        "msgspec" are installed.
+    """
+    global _backend, _loads
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not available, choose from {list(BACKENDS)}")
+    _backend, _loads = name, BACKENDS[name]
+    logger.info(f"Decoding JSON with {name}")
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def loads(data: JsonInput):
+    """Parse a JSON document with the selected backend."""
+    return _loads(data)
+
+
+def decode_stream_message(message: JsonInput):
+    """
+    Parse one combined-stream message.
+
+    Kline messages become typed KlineMessage structs under the msgspec backend;
+    anything else (other stream kinds, subscription replies) is parsed as-is.
+
+    :param message: Raw websocket message.
+    :return: The envelope, readable as envelope.get("stream") / envelope.get("data").
+    """
+    if _backend == "msgspec":
+        try:
+            return _KLINE_MESSAGE.decode(message)
+        except msgspec.ValidationError:
+            pass
+    return _loads(message)
+
+
+def kline_values(kline) -> tuple:
+    """
+    Numeric fields of one kline, converted only when they arrived as strings.
+
+    :param kline: The "k" object of a kline event, a typed Kline or a parsed dict.
+    :return: (open_time, open, high, low, close, volume, trades, taker_buy_base,
+        taker_buy_quote) as ints and floats.
+    """
+    if isinstance(kline, dict):
+        return (
+            int(kline["t"]),
+            float(kline["o"]),
+            float(kline["h"]),
+            float(kline["l"]),
+            float(kline["c"]),
+            float(kline["v"]),
+            int(kline["n"]),
+            float(kline["V"]),
+            float(kline["Q"]),
+        )
+    return (kline.t, kline.o, kline.h, kline.l, kline.c, kline.v, kline.n, kline.V, kline.Q)
+
+
+def decode_trade_page(body: JsonInput, kind: str = "aggTrades") -> list:
+    """
+    Parse a trades, historicalTrades or aggTrades response into its rows.
+
+    :param body: Raw response body.
+    :param kind: Endpoint the body came from.
+    :return: List of rows, typed structs under the msgspec backend.
+    """
+    decoder = _TRADE_PAGES.get(kind) if _backend == "msgspec" else None
+    if decoder is not None:
+        return decoder.decode(body)
+    return _loads(body)
+
+
+if os.environ.get("ETL_JSON_BACKEND"):
+    try:
+        set_backend(os.environ["ETL_JSON_BACKEND"])
+    except ValueError as e:
+        logger.warning(f"Ignoring ETL_JSON_BACKEND: {e}; decoding JSON with {_backend}")
@@ -0,0 +1,160 @@
+import io
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+KLINE_COLUMNS = [
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "close_time",
+    "quote_asset_volume",
+    "trades",
+    "taker_buy_base",
+    "taker_buy_quote",
+    "ignore",
+]
+
+INT_COLUMNS = ["timestamp", "close_time", "trades"]
+FLOAT_COLUMNS = [
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "quote_asset_volume",
+    "taker_buy_base",
+    "taker_buy_quote",
+]
+
+# Every field of a kline row is numeric, quoted or not, so once whitespace and
+# quotes are removed and each "],[" becomes a newline the rows are plain CSV.
+_WHITESPACE = b" \t\r\n"
+
+KlineColumns = Dict[str, np.ndarray]
+
+
+def _parse_rows(payload: bytes) -> np.ndarray:
+    """Parse a compact (whitespace-free) non-empty klines array into a 2D float64 array."""
+    if not (payload.startswith(b"[[") and payload.endswith(b"]]")):
+        raise ValueError(f"Malformed klines payload: {payload[:100]!r}")
+    rows = payload[2:-2].replace(b"],[", b"\n").translate(None, b'"')
+    try:
+        return np.loadtxt(io.BytesIO(rows), delimiter=",", dtype=np.float64, ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"Malformed klines payload: ragged or non-numeric rows ({e})") from e
+
+
+def decode_klines(payload: Union[bytes, str, list]) -> KlineColumns:
+    """
+    Decode a Binance klines response into typed columns in a single pass.
+
+    Raw bytes are parsed straight into one float64 buffer without creating a
+    Python object per field. Timestamps and trade counts are then cast to int64,
+    which is exact since both stay well below 2**53.
+
+    :param payload: Raw response body (bytes/str) or an already parsed list of rows.
+    :return: Mapping of column name to NumPy array (the "ignore" field is dropped).
+    :raise ValueError: If the payload is not an array of equally long numeric
+        rows, e.g. an error body such as {"code":-1121,"msg":"Invalid symbol."}.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        payload = bytes(payload).translate(None, _WHITESPACE)
+        if payload == b"[]":
+            return empty_klines()
+        rows = _parse_rows(payload)
+    else:
+        if not isinstance(payload, list):
+            raise ValueError(f"Malformed klines payload: {str(payload)[:100]!r}")
+        if not payload:
+            return empty_klines()
+        try:
+            rows = np.asarray(payload, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Malformed klines payload: ragged or non-numeric rows ({e})") from e
+        if rows.ndim != 2:
+            raise ValueError("Malformed klines payload: rows are not arrays")
+
+    width = rows.shape[1]
+    matrix = rows.T.copy()  # one allocation, column-major
+    columns = {}
+    for i, name in enumerate(KLINE_COLUMNS[: min(width, len(KLINE_COLUMNS))]):
+        if name in INT_COLUMNS:
+            columns[name] = matrix[i].astype(np.int64)
+        elif name in FLOAT_COLUMNS:
+            columns[name] = matrix[i]
+    return columns
+
+
+def empty_klines() -> KlineColumns:
+    """Typed, zero-length kline columns."""
+    return {
+        name: np.empty(0, dtype=np.int64 if name in INT_COLUMNS else np.float64)
+        for name in KLINE_COLUMNS
+        if name != "ignore"
+    }
+
+
+def concat_klines(batches: List[KlineColumns]) -> KlineColumns:
+    """Concatenate decoded kline batches, preserving their order."""
+    batches = [batch for batch in batches if len(batch["timestamp"])]
+    if not batches:
+        return empty_klines()
+    if len(batches) == 1:
+        return batches[0]
+    return {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+
+
+def klines_to_frame(
+    columns: KlineColumns,
+    symbol: Optional[str] = None,
+    keep: Optional[List[str]] = None,
+    utc: bool = False,
+) -> pd.DataFrame:
+    """
+    Build a DataFrame from decoded kline columns.
+
+    :param columns: Output of decode_klines.
+    :param symbol: Optional symbol added as a "symbol" column.
+    :param keep: Columns to retain, in order; all decoded columns by default.
+    :param utc: Whether the timestamp column is timezone aware (UTC).
+    :return: DataFrame with a datetime "timestamp" column and typed values.
+    """
+    keep = keep or list(columns)
+    data = {name: columns[name] for name in keep}
+    if "timestamp" in data:
+        data["timestamp"] = pd.to_datetime(data["timestamp"], unit="ms", utc=utc)
+    df = pd.DataFrame(data, copy=False)
+    if symbol is not None:
+        df["symbol"] = symbol
+    return df
+
+
+def klines_to_table(columns: KlineColumns, symbol: Optional[str] = None) -> pa.Table:
+    """
+    Build a pyarrow Table from decoded kline columns without copying the buffers.
+
+    :param columns: Output of decode_klines.
+    :param symbol: Optional symbol added as a dictionary encoded "symbol" column.
+    :return: pyarrow Table with a millisecond "timestamp" column.
+    """
+    arrays = {}
+    for name, values in columns.items():
+        if name == "timestamp":
+            arrays[name] = pa.array(values.view("datetime64[ms]"))
+        else:
+            arrays[name] = pa.array(values)
+    if symbol is not None:
+        arrays["symbol"] = pa.DictionaryArray.from_arrays(
+            pa.array(np.zeros(len(columns["timestamp"]), dtype=np.int32)),
+            pa.array([symbol]),
+        )
+    return pa.table(arrays)
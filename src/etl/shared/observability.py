@@ -1,28 +1,552 @@
+import atexit
+import bisect
+import json
 import logging
 import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Sequence, Tuple
 
 LOG_DIR = "logs"
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
+LOG_QUEUE_SIZE = 100_000  # Records held for the writer thread before new ones are dropped
+
+# Upper bounds in seconds, from sub-millisecond decodes to slow REST retries
+# fmt: off
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# fmt: on
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: records are dropped once the queue is full."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+_log_lock = threading.Lock()
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _shared_handler() -> QueueHandler:
+    """
+    Handler shared by every logger.
+
+    Records are put on a bounded queue and written to LOG_FILE by a single
+    background thread, so logging on the hot path costs one queue put.
+    """
+    global _queue_handler, _listener
+    with _log_lock:
+        if _queue_handler is None:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            file_handler = logging.FileHandler(LOG_FILE, mode="a")
+            file_handler.setFormatter(
+                logging.Formatter(
+                    "%(name)s %(asctime)s %(levelname)s: %(message)s",
+                    datefmt="%Y-%m-%d %H:%M:%S",
+                )
+            )
+            log_queue = queue.Queue(LOG_QUEUE_SIZE)
+            _queue_handler = DroppingQueueHandler(log_queue)
+            _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(shutdown_logging)
+        return _queue_handler
+
+
+def shutdown_logging():
+    """Write out every queued record and stop the writer thread; registered to run at exit."""
+    global _queue_handler, _listener
+    with _log_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.handlers[0].close()
+        _listener = None
+        _queue_handler = None
 
 
 def get_logger(name=__name__):
-    """Returns a configured logger instance."""
+    """
+    Returns a configured logger instance.
 
-    # Check if the log directory exists
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
+    The logger writes to LOG_FILE through the shared non-blocking handler and
+    still propagates, so root handlers (logging.basicConfig, pytest's caplog)
+    see its records too. When a root handler should stay off the hot path, stop
+    propagation for the whole package instead:
 
+        logging.getLogger("src.etl.shared").propagate = False
+    """
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
     # Avoid adding multiple handlers if already configured
-    if not logger.hasHandlers():
-        handler = logging.FileHandler(LOG_FILE, mode="a")
-        formatter = logging.Formatter(
-            "%(name)s %(asctime)s %(levelname)s: %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    if not logger.handlers:
+        logger.addHandler(_shared_handler())
 
     return logger
+
+
+class StreamLogger:
+    """
+    Sampled, rate-limited logging for per-message hot paths.
+
+    Each message is counted under a key (usually the symbol). A line is only
+    formatted and emitted for every `every`-th message of a key, and at most
+    once per `interval` seconds per key; the rest are just counted. Every
+    `summary_interval` seconds one aggregate line reports how many messages
+    arrived for how many keys. Arguments are formatted lazily, so a
+    suppressed message costs a dictionary update.
+    """
+
+    SETTINGS = ("every", "interval", "summary_interval", "level", "noun", "key_noun")
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        every: int = 1,
+        interval: float = 60.0,
+        summary_interval: float = 10.0,
+        level: int = logging.INFO,
+        noun: str = "messages",
+        key_noun: str = "keys",
+    ):
+        """
+        :param logger: Logger the lines are written to.
+        :param every: Consider only every n-th message of a key for logging.
+        :param interval: Minimum seconds between two lines for the same key;
+            0 disables the rate limit.
+        :param summary_interval: Seconds between summary lines; 0 disables them.
+        :param level: Level of the per-message lines and summaries.
+        :param noun: What is counted, used in the summary line.
+        :param key_noun: What the keys are (e.g. "symbols"), used in the summary line.
+        """
+        self.logger = logger
+        self.configure(
+            every=every,
+            interval=interval,
+            summary_interval=summary_interval,
+            level=level,
+            noun=noun,
+            key_noun=key_noun,
+        )
+        self._counts: Dict[str, int] = {}
+        self._last_logged: Dict[str, float] = {}
+        self._window_start = time.monotonic()
+        self._window_messages = 0
+        self._window_logged = 0
+        self._window_keys = set()
+        self._lock = threading.Lock()
+
+    def configure(self, **settings):
+        """
+        Change settings of __init__; `every` is clamped to at least 1, the intervals to >= 0.
+
+        :raise TypeError: On a name that is not in SETTINGS.
+        """
+        for setting, value in settings.items():
+            if setting not in self.SETTINGS:
+                raise TypeError(f"Unknown stream logger setting {setting!r}")
+            if setting == "every":
+                value = max(int(value), 1)
+            elif setting in ("interval", "summary_interval"):
+                value = max(float(value), 0.0)
+            setattr(self, setting, value)
+
+    def log(self, key: str, msg: str, *args):
+        """Count one message under `key` and log `msg % args` if sampling allows it."""
+        now = time.monotonic()
+        with self._lock:
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+            self._window_messages += 1
+            self._window_keys.add(key)
+            emit = (
+                count % self.every == 0
+                and now - self._last_logged.get(key, float("-inf")) >= self.interval
+                and self.logger.isEnabledFor(self.level)
+            )
+            if emit:
+                self._last_logged[key] = now
+                self._window_logged += 1
+            summary = self.summary_interval and now - self._window_start >= self.summary_interval
+        if emit:
+            self.logger.log(self.level, msg, *args)
+        if summary:
+            self.flush()
+
+    def flush(self):
+        """Emit the summary of the current window now and start a new one."""
+        now = time.monotonic()
+        with self._lock:
+            messages, logged = self._window_messages, self._window_logged
+            keys, elapsed = len(self._window_keys), now - self._window_start
+            self._window_start = now
+            self._window_messages = self._window_logged = 0
+            self._window_keys = set()
+        if messages:
+            self.logger.log(
+                self.level,
+                "%d %s for %d %s in last %.0fs (%d logged individually)",
+                messages,
+                self.noun,
+                keys,
+                self.key_noun,
+                elapsed,
+                logged,
+            )
+
+
+_stream_settings: Dict[str, dict] = {}
+_stream_loggers: Dict[str, StreamLogger] = {}
+
+
+def configure_stream_logger(name: str, **settings):
+    """
+    Set the sampling of the stream logger `name` (see StreamLogger for the settings).
+
+    Applies to the logger if it already exists and to the one created later otherwise,
+    e.g. configure_stream_logger("src.etl.shared.file_writer", every=10, interval=0).
+
+    :raise TypeError: On an unknown setting.
+    """
+    unknown = set(settings) - set(StreamLogger.SETTINGS)
+    if unknown:
+        raise TypeError(f"Unknown stream logger settings {sorted(unknown)}")
+    _stream_settings.setdefault(name, {}).update(settings)
+    stream_logger = _stream_loggers.get(name)
+    if stream_logger is not None:
+        stream_logger.configure(**settings)
+
+
+def get_stream_logger(name=__name__, **defaults) -> StreamLogger:
+    """
+    Returns the StreamLogger of `name`, writing through get_logger(name).
+
+    :param defaults: Settings used unless configure_stream_logger overrides them.
+    """
+    if name not in _stream_loggers:
+        settings = {**defaults, **_stream_settings.get(name, {})}
+        _stream_loggers[name] = StreamLogger(get_logger(name), **settings)
+    return _stream_loggers[name]
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_text(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    """Monotonically increasing count, e.g. messages received."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, labels: LabelKey = ()):
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield self.name, self.labels, self.value
+
+
+class Gauge:
+    """Value that goes up and down, e.g. the request weight used in this minute."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, labels: LabelKey = ()):
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def samples(self):
+        yield self.name, self.labels, self.value
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: "Histogram"):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Histogram:
+    """Distribution of observed values (latencies in seconds) over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, labels: LabelKey = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        """Context manager observing the seconds spent in its block."""
+        return _Timer(self)
+
+    def samples(self):
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f"{self.name}_bucket", self.labels + (("le", le),), cumulative
+        yield f"{self.name}_sum", self.labels, total
+        yield f"{self.name}_count", self.labels, count
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of counters, gauges and histograms.
+
+    Metrics are created on first use and identified by name and labels, so
+    modules can declare the ones they update at import time:
+
+        MESSAGES = counter("stream_messages_total", "Messages received")
+        with histogram("stream_decode_seconds").time():
+            ...
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, LabelKey], object] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: Dict[str, str], **kwargs):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(name, key[1], **kwargs)
+                if help:
+                    self._help[name] = help
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(
+        self, name: str, help: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS, **labels
+    ) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: (m.name, m.labels))
+        lines = []
+        described = set()
+        for metric in metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                if metric.name in self._help:
+                    lines.append(f"# HELP {metric.name} {self._help[metric.name]}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Current value of every metric, keyed by name and labels."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        values = {}
+        for metric in metrics:
+            key = f"{metric.name}{_label_text(metric.labels)}"
+            if isinstance(metric, Histogram):
+                values[key] = {
+                    "count": metric.count,
+                    "sum": metric.sum,
+                    "buckets": dict(
+                        zip([repr(b) for b in metric.buckets] + ["+Inf"], metric.counts)
+                    ),
+                }
+            else:
+                values[key] = metric.value
+        return values
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+LOG_RECORDS_DROPPED = counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+
+
+class MetricsServer:
+    """Serves the registry at /metrics (Prometheus text) and /metrics.json on a local port."""
+
+    def __init__(
+        self, port: int = 9108, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY
+    ):
+        """
+        :param port: Port to listen on; 0 picks a free one (see `port` after start).
+        :param host: Interface to bind, local only by default.
+        :param registry: Registry to expose.
+        """
+        handler = self._handler(registry)
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="metrics-server", daemon=True
+        )
+
+    @staticmethod
+    def _handler(registry: MetricsRegistry):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = registry.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a log line each
+
+        return Handler
+
+    def start(self):
+        """Start serving on a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsSnapshotWriter:
+    """
+    Periodically writes a JSON snapshot of the registry to a file.
+
+    Besides the raw values, each snapshot carries the per-second rate of every
+    counter since the previous one (e.g. messages/sec).
+    """
+
+    def __init__(
+        self,
+        path: str = os.path.join(LOG_DIR, "metrics.json"),
+        interval_seconds: float = 10.0,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        """
+        :param path: File the snapshot is (atomically) replaced in.
+        :param interval_seconds: Pause between snapshots.
+        :param registry: Registry to snapshot.
+        """
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.registry = registry
+        self._previous: Tuple[float, dict] = (time.monotonic(), {})
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-snapshot", daemon=True
+        )
+
+    def start(self):
+        """Start the background snapshot thread."""
+        self._thread.start()
+        return self
+
+    def write(self):
+        """Write one snapshot now."""
+        now = time.monotonic()
+        values = self.registry.snapshot()
+        then, previous = self._previous
+        elapsed = max(now - then, 1e-9)
+        rates = {
+            key: (value - previous.get(key, 0)) / elapsed
+            for key, value in values.items()
+            if key.split("{")[0].endswith("_total")
+        }
+        self._previous = (now, values)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "metrics": values,
+                    "rates_per_second": rates,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                self.write()
+            except Exception as e:
+                get_logger(__name__).error(f"Failed to write metrics snapshot: {e}")
+
+    def stop(self):
+        """Stop the thread and write a final snapshot."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.write()
@@ -0,0 +1,210 @@
+from typing import Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .klines import KlineColumns
+
+FLOAT_FIELDS = (
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "taker_buy_base",
+    "taker_buy_quote",
+)
+INT_FIELDS = ("timestamp", "trades")  # timestamp is epoch milliseconds (UTC)
+FIELDS = ("timestamp",) + FLOAT_FIELDS[:5] + ("trades",) + FLOAT_FIELDS[5:] + ("symbol",)
+
+
+def epoch_ms(values) -> np.ndarray:
+    """
+    Timestamps as int64 epoch milliseconds (UTC).
+
+    :param values: Integers, read as epoch ms like the kline columns, or anything
+        pandas parses as datetimes (naive values are taken as UTC).
+    :return: int64 array of epoch milliseconds.
+    """
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.to_numpy(dtype=np.int64)
+    return pd.to_datetime(values, utc=True).dt.as_unit("ms").array.asi8
+
+
+class OHLCVRow:
+    """Read-only view of one row of an OHLCVBatch; nothing is copied until a field is read."""
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "OHLCVBatch", index: int):
+        self._batch = batch
+        self._index = index
+
+    def __getattr__(self, name):
+        batch = self._batch
+        if name == "symbol":
+            return batch.symbols[batch.symbol_codes[self._index]]
+        if name == "timestamp":
+            return pd.Timestamp(int(batch.columns["timestamp"][self._index]), unit="ms", tz="UTC")
+        try:
+            return batch.columns[name][self._index].item()
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in FIELDS)
+        return f"OHLCVRow({fields})"
+
+
+class OHLCVBatch:
+    """
+    Columnar OHLCV container: typed NumPy arrays instead of one object per candle.
+
+    Timestamps are int64 epoch milliseconds, prices and volumes float64, trade
+    counts int64 and symbols dictionary encoded (int32 codes into `symbols`).
+    Extra columns (e.g. EMA_20) can be attached with `with_column`. Conversions
+    to NumPy and Arrow share the buffers; pandas shares them for numeric columns.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        symbol_codes: np.ndarray,
+        symbols: Sequence[str],
+    ):
+        """
+        :param columns: timestamp, price/volume and trades arrays (plus any extras).
+        :param symbol_codes: int32 index into `symbols` for every row.
+        :param symbols: Distinct symbols.
+        """
+        self.columns = {
+            name: np.asarray(
+                values,
+                dtype=np.int64 if name in INT_FIELDS else np.float64,
+            )
+            for name, values in columns.items()
+        }
+        self.symbol_codes = np.asarray(symbol_codes, dtype=np.int32)
+        self.symbols = np.asarray(symbols, dtype=object)
+
+    @classmethod
+    def from_klines(cls, columns: KlineColumns, symbol: str) -> "OHLCVBatch":
+        """Wrap decoded kline columns of one symbol without copying them."""
+        return cls(
+            {name: columns[name] for name in INT_FIELDS + FLOAT_FIELDS},
+            np.zeros(len(columns["timestamp"]), dtype=np.int32),
+            [symbol],
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "OHLCVBatch":
+        """Build a batch from a DataFrame with the OHLCV columns; the batch owns its buffers."""
+        codes, symbols = pd.factorize(df["symbol"])
+        columns = {"timestamp": epoch_ms(df["timestamp"])}
+        for name in df.columns:
+            if name not in ("timestamp", "symbol") and pd.api.types.is_numeric_dtype(df[name]):
+                columns[name] = df[name].to_numpy(copy=True)  # frames may be read-only
+        return cls(columns, codes, list(symbols))
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> "OHLCVBatch":
+        """Build a batch from OHLCVData-like records."""
+        records = list(records)
+        return cls.from_frame(
+            pd.DataFrame({name: [getattr(r, name) for r in records] for name in FIELDS})
+        )
+
+    @classmethod
+    def concat(cls, batches: List["OHLCVBatch"]) -> "OHLCVBatch":
+        """Concatenate batches with the same columns, merging their symbol dictionaries."""
+        symbols = list(dict.fromkeys(s for batch in batches for s in batch.symbols))
+        lookup = {symbol: code for code, symbol in enumerate(symbols)}
+        codes = np.concatenate(
+            [
+                np.array([lookup[s] for s in batch.symbols], dtype=np.int32)[batch.symbol_codes]
+                for batch in batches
+            ]
+        )
+        columns = {
+            name: np.concatenate([batch.columns[name] for batch in batches])
+            for name in batches[0].columns
+        }
+        return cls(columns, codes, symbols)
+
+    def __len__(self):
+        return len(self.symbol_codes)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray]):
+        """An int gives a row view; a slice, mask or index array gives a sub-batch."""
+        if isinstance(key, (int, np.integer)):
+            index = int(key)
+            if not -len(self) <= index < len(self):
+                raise IndexError(f"Row {index} out of range for {len(self)} rows")
+            return OHLCVRow(self, index + len(self) if index < 0 else index)
+        return self.take(key)
+
+    def __iter__(self):
+        return (OHLCVRow(self, i) for i in range(len(self)))
+
+    def __repr__(self):
+        return f"OHLCVBatch(rows={len(self)}, symbols={list(self.symbols)})"
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column buffers."""
+        return sum(v.nbytes for v in self.columns.values()) + self.symbol_codes.nbytes
+
+    def take(self, key: Union[slice, np.ndarray]) -> "OHLCVBatch":
+        """Rows selected by a slice (view) or a boolean mask / index array (copy)."""
+        return OHLCVBatch(
+            {name: values[key] for name, values in self.columns.items()},
+            self.symbol_codes[key],
+            self.symbols,
+        )
+
+    def with_column(self, name: str, values: np.ndarray) -> "OHLCVBatch":
+        """Attach an extra float64 column, e.g. an indicator."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) != len(self):
+            raise ValueError(f"Column {name} has {len(values)} rows, batch has {len(self)}")
+        self.columns[name] = values
+        return self
+
+    def to_numpy(self, name: str) -> np.ndarray:
+        """The underlying array of one column (no copy)."""
+        return self.columns[name]
+
+    def symbol_array(self) -> pd.Categorical:
+        """Symbols as a pandas Categorical sharing the codes buffer."""
+        return pd.Categorical.from_codes(self.symbol_codes, categories=self.symbols)
+
+    def to_pandas(self) -> pd.DataFrame:
+        """DataFrame view; numeric columns share their buffers with the batch."""
+        data = {"timestamp": pd.to_datetime(self.columns["timestamp"], unit="ms", utc=True)}
+        data.update((name, v) for name, v in self.columns.items() if name != "timestamp")
+        data["symbol"] = self.symbol_array()
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self) -> pa.Table:
+        """pyarrow Table sharing every buffer with the batch."""
+        arrays = {
+            "timestamp": pa.array(
+                self.columns["timestamp"].view("datetime64[ms]"),
+                type=pa.timestamp("ms", tz="UTC"),
+            )
+        }
+        arrays.update(
+            (name, pa.array(v)) for name, v in self.columns.items() if name != "timestamp"
+        )
+        arrays["symbol"] = pa.DictionaryArray.from_arrays(
+            pa.array(self.symbol_codes), pa.array(list(self.symbols), type=pa.string())
+        )
+        return pa.table(arrays)
@@ -1,14 +1,45 @@
-import pyarrow.parquet as pq
-import pyarrow as pa
 import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
-from observability import get_logger
+from typing import List, Optional
+from .dataset import PartitionedDatasetWriter
+from .file_writer import FileWriteDataReturnValue
+from .json_codec import decode_trade_page
+from .klines import decode_klines, klines_to_frame
+from .observability import get_logger
+from .rest_client import KLINES_PATH, TRADES_PATH, get_client
+from .trades import decode_trades
+from .utils import write_parquet
 
 
 logger = get_logger(__name__)
 
-BINANCE_API_URL = "https://api.binance.com/api/v3/klines"
+OHLCV_COLUMNS = [
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "close_time",
+    "quote_asset_volume",
+    "trades",
+    "taker_buy_base",
+    "taker_buy_quote",
+]
+
+
+def _fetch_ohlcv(params: dict) -> Optional[pd.DataFrame]:
+    """Fetch one klines page and decode it straight into typed columns."""
+    try:
+        response = get_client().get(KLINES_PATH, params)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching Binance OHLCV: {e}")
+        return None
+
+    return klines_to_frame(decode_klines(response.content), params["symbol"], keep=OHLCV_COLUMNS)
 
 
 def fetch_historical_ohlcv(symbol="BTCUSDT", interval="1d", days=30):
@@ -24,54 +55,12 @@ def fetch_historical_ohlcv(symbol="BTCUSDT", interval="1d", days=30):
         "endTime": end_time,
         "limit": 1000,  # Max records per request
     }
+    return _fetch_ohlcv(params)
 
-    response = requests.get(BINANCE_API_URL, params=params)
 
-    if response.status_code != 200:
-        logger.error(f"Error fetching Binance OHLCV: {response.text}")
-        return None
-
-    data = response.json()
-
-    # Convert to DataFrame
-    df = pd.DataFrame(
-        data,
-        columns=[
-            "timestamp",
-            "open",
-            "high",
-            "low",
-            "close",
-            "volume",
-            "close_time",
-            "quote_asset_volume",
-            "trades",
-            "taker_buy_base",
-            "taker_buy_quote",
-            "ignore",
-        ],
-    )
-
-    # Convert timestamps
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df = df[
-        [
-            "timestamp",
-            "open",
-            "high",
-            "low",
-            "close",
-            "volume",
-            "close_time",
-            "quote_asset_volume",
-            "trades",
-            "taker_buy_base",
-            "taker_buy_quote",
-        ]
-    ]
-    df["symbol"] = symbol
-
-    return df
+def fetch_binance_ohlcv(symbol="BTCUSDT", interval="1d", limit=100):
+    """Fetch the latest `limit` candles for a given symbol."""
+    return _fetch_ohlcv({"symbol": symbol, "interval": interval, "limit": limit})
 
 
 def fetch_and_store_binance_data(
@@ -92,25 +81,24 @@ def fetch_and_store_binance_data(
     :return: FileWriteDataReturnValue object.
     """
     df = fetch_binance_ohlcv(symbol, interval, limit)
+    if df is None:
+        return FileWriteDataReturnValue(paths=[], rows_written=0)
     return write_parquet(df, destination_path, partition_cols)
 
 
 def fetch_historical_trades(symbol="BTCUSDT", limit=1000):
     """Fetch historical trades for a given symbol."""
 
-    TRADE_API_URL = "https://api.binance.com/api/v3/trades"
     params = {"symbol": symbol, "limit": limit}
 
-    response = requests.get(TRADE_API_URL, params=params)
-
-    if response.status_code != 200:
-        print(f"Error fetching Binance trades: {response.text}")
+    try:
+        response = get_client().get(TRADES_PATH, params)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching Binance trades: {e}")
         return None
 
-    trades = response.json()
-
-    df = pd.DataFrame(trades)
-    df["time"] = pd.to_datetime(df["time"], unit="ms")
+    df = pd.DataFrame(decode_trades(decode_trade_page(response.content, "trades"), "trades"))
+    df["time"] = pd.to_datetime(df["timestamp"], unit="ms")
     df["symbol"] = symbol
 
     return df[["time", "price", "qty", "symbol"]]
@@ -118,22 +106,13 @@ def fetch_historical_trades(symbol="BTCUSDT", limit=1000):
 
 def save_to_parquet(df, filename="binance_data.parquet"):
     """Save DataFrame to Parquet format."""
-    table = pa.Table.from_pandas(df)
-    pq.write_table(table, filename)
-    print(f"Data saved to {filename}")
-
-
-# Fetch BTC & ETH historical data
-btc_data = fetch_historical_ohlcv("BTCUSDT", "1d", 120)
-eth_data = fetch_historical_ohlcv("ETHUSDT", "1d", 120)
-
-# Merge both
-historical_df = pd.concat([btc_data, eth_data], ignore_index=True)
+    pq.write_table(pa.Table.from_pandas(df), filename)
+    logger.info(f"Data saved to {filename}")
+    return FileWriteDataReturnValue(paths=[filename], rows_written=len(df))
 
-# Fetch recent trades for BTC
-btc_trades = fetch_historical_trades("BTCUSDT")
-# Save OHLCV historical data
-save_to_parquet(historical_df, "binance_ohlcv.parquet")
 
-# Save trades
-save_to_parquet(btc_trades, "binance_trades.parquet")
+def save_to_dataset(df, root="data/ohlcv", interval=None, time_column="timestamp"):
+    """Append a DataFrame to the partitioned Parquet dataset under `root`."""
+    result = PartitionedDatasetWriter(root, interval, time_column=time_column).write(df)
+    logger.info(f"Data saved to {len(result.paths)} files under {root}")
+    return result
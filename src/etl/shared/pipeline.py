@@ -0,0 +1,429 @@
+"""
+Declarative pipeline runner.
+
+A YAML spec names sources, transforms and sinks; every transform and sink
+reads the output of the nodes listed in its `input`. The runner orders them
+into a DAG and runs each node as soon as its inputs are done, so independent
+branches (e.g. a daily sync and a trade backfill) run concurrently. All REST
+nodes share one BinanceRestClient, i.e. one connection pool and one
+request-weight budget, and one ResponseCache.
+
+    rest: {base_url: https://api.binance.com, pool_size: 16}
+    cache: {directory: data/cache/http}
+    max_workers: 8
+    sources:
+      majors: {type: klines, symbols: [BTCUSDT, ETHUSDT], interval: 1h, days: 30}
+    transforms:
+      majors_ema: {type: ema, input: majors, periods: [20, 50]}
+    sinks:
+      majors_csv: {type: csv, input: majors_ema, path: reports/majors.csv}
+
+Usage: python -m src.etl.shared.pipeline [config.yaml] [--only NODE ...]
+"""
+
+import argparse
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from .backfill import KlineBackfill
+from .dataset import PartitionedDatasetWriter
+from .observability import counter, get_logger, histogram
+from .ohlcv import OHLCVBatch
+from .processor import DataSaver, DataTransformation, ReportGenerator
+from .response_cache import ResponseCache
+from .rest_client import BinanceRestClient
+from .runtime import IngestionRuntime
+from .sync import DEFAULT_STATE_PATH, IncrementalSync, WatermarkStore
+from .trades import TradeBackfill
+
+logger = get_logger(__name__)
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+SECTIONS = ("sources", "transforms", "sinks")
+RESERVED_KEYS = ("type", "input", "enabled")
+
+NODE_SECONDS = histogram("pipeline_node_seconds", "Time to run one pipeline node")
+NODES_FAILED = counter("pipeline_nodes_failed_total", "Pipeline nodes that raised")
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+
+class PipelineContext:
+    """Resources shared by every node of one run."""
+
+    def __init__(self, client: BinanceRestClient, cache: Optional[ResponseCache] = None):
+        """
+        :param client: REST client (connection pool and weight budget) of all REST nodes.
+        :param cache: Optional on-disk cache of closed kline windows.
+        """
+        self.client = client
+        self.cache = cache
+        self.stop_event = threading.Event()
+        self._stores: Dict[str, WatermarkStore] = {}
+        self._lock = threading.Lock()
+
+    def watermark_store(self, path: str) -> WatermarkStore:
+        """One store per state file, so concurrent syncs do not overwrite each other's marks."""
+        with self._lock:
+            if path not in self._stores:
+                self._stores[path] = WatermarkStore(path)
+            return self._stores[path]
+
+
+def _to_ms(value) -> int:
+    """Epoch ms of a timestamp-like value (a date, "2024-01-01", ms since epoch)."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return int(timestamp.value // 1_000_000)
+
+
+def _time_range(params: dict, default_days: float = 1) -> tuple:
+    """[start, end] in ms from `start`/`end`, or `days`/`hours` back from `end` (or now)."""
+    end_time = _to_ms(params["end"]) if "end" in params else int(time.time() * 1000)
+    if "start" in params:
+        return _to_ms(params["start"]), end_time
+    if "days" in params or "hours" in params:
+        lookback = params.get("days", 0) * DAY_MS + params.get("hours", 0) * HOUR_MS
+    else:
+        lookback = default_days * DAY_MS
+    return int(end_time - lookback), end_time
+
+
+def _klines_source(context: PipelineContext, params: dict) -> OHLCVBatch:
+    """Candles closed in the range, as one batch of every symbol."""
+    start_time, end_time = _time_range(params, default_days=30)
+    now = int(time.time() * 1000)
+    fetched = KlineBackfill(
+        params.get("interval", "1h"),
+        max_workers=params.get("max_workers", 8),
+        client=context.client,
+        cache=context.cache,
+    ).fetch(params["symbols"], start_time, end_time)
+    batches = [
+        OHLCVBatch.from_klines(columns, symbol).take(columns["close_time"] < now)
+        for symbol, columns in fetched.items()
+    ]
+    if not batches:
+        raise RuntimeError(f"No klines fetched for {params['symbols']}")
+    return OHLCVBatch.concat(batches)
+
+
+def _sync_source(context: PipelineContext, params: dict):
+    """Incremental sync of closed candles into a dataset (see IncrementalSync)."""
+    interval = params.get("interval", "1h")
+    return IncrementalSync(
+        params.get("root", "data/ohlcv"),
+        interval,
+        context.watermark_store(params.get("state_path", DEFAULT_STATE_PATH)),
+        KlineBackfill(
+            interval,
+            max_workers=params.get("max_workers", 8),
+            client=context.client,
+            cache=context.cache,
+        ),
+        default_days=params.get("default_days", 30),
+    ).sync(params["symbols"])
+
+
+def _trades_source(context: PipelineContext, params: dict):
+    """Trade backfill of the range into a dataset (see TradeBackfill)."""
+    kind = params.get("kind", "aggTrades")
+    start_time, end_time = _time_range(params, default_days=1 / 24)
+    return TradeBackfill(
+        PartitionedDatasetWriter(params.get("root", f"data/trades/{kind}")),
+        kind=kind,
+        max_workers=params.get("max_workers", 4),
+        client=context.client,
+    ).backfill(params["symbols"], start_time, end_time)
+
+
+def _websocket_source(context: PipelineContext, params: dict):
+    """Live kline ingestion for `duration` seconds, or until the run is interrupted."""
+    options = {
+        name: value
+        for name, value in params.items()
+        if name not in RESERVED_KEYS + ("symbols", "interval", "duration")
+    }
+    runtime = IngestionRuntime(params["symbols"], params.get("interval", "1m"), **options)
+    runtime.start()
+    try:
+        context.stop_event.wait(params.get("duration"))
+    finally:
+        result = runtime.stop()
+    return result
+
+
+def _clean(context: PipelineContext, params: dict, batch: OHLCVBatch) -> OHLCVBatch:
+    return DataTransformation.clean_data(batch)
+
+
+def _ema(context: PipelineContext, params: dict, batch: OHLCVBatch) -> OHLCVBatch:
+    if "periods" in params:
+        return DataTransformation.add_ema(batch, periods=params["periods"])
+    return DataTransformation.add_ema(batch)
+
+
+def _anonymize(context: PipelineContext, params: dict, batch: OHLCVBatch) -> OHLCVBatch:
+    return DataTransformation.anonymize_data(batch)
+
+
+def _parquet_sink(context: PipelineContext, params: dict, batch: OHLCVBatch):
+    return DataSaver.save_to_dataset(
+        batch, params.get("root", "data/ohlcv"), params.get("interval", "1h")
+    )
+
+
+def _csv_sink(context: PipelineContext, params: dict, batch: OHLCVBatch):
+    path = params["path"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    ReportGenerator.generate_report(batch, path)
+    return path
+
+
+NODE_TYPES: Dict[str, Dict[str, Callable]] = {
+    "sources": {
+        "klines": _klines_source,
+        "sync": _sync_source,
+        "trades": _trades_source,
+        "websocket": _websocket_source,
+    },
+    "transforms": {"clean": _clean, "ema": _ema, "anonymize": _anonymize},
+    "sinks": {"parquet": _parquet_sink, "csv": _csv_sink},
+}
+# Sources that write their own dataset; their result cannot feed other nodes
+TERMINAL_TYPES = {"sync", "trades", "websocket"}
+# Transforms that modify the batch in place; they get a copy of a shared input
+IN_PLACE_TYPES = {"ema", "anonymize"}
+
+
+class PipelineNode:
+    """One source, transform or sink of the spec."""
+
+    def __init__(self, name: str, section: str, spec: dict):
+        if not isinstance(spec, dict) or "type" not in spec:
+            raise ValueError(f"Node {name!r} needs a mapping with a type")
+        self.name = name
+        self.section = section
+        self.type = spec["type"]
+        if self.type not in NODE_TYPES[section]:
+            raise ValueError(
+                f"Unknown {section[:-1]} type {self.type!r} of node {name!r}, "
+                f"expected one of {list(NODE_TYPES[section])}"
+            )
+        self.run = NODE_TYPES[section][self.type]
+        inputs = spec.get("input", [])
+        self.inputs: List[str] = [inputs] if isinstance(inputs, str) else list(inputs)
+        if section == "sources" and self.inputs:
+            raise ValueError(f"Source {name!r} cannot have an input")
+        if section != "sources" and len(self.inputs) != 1:
+            raise ValueError(f"Node {name!r} needs exactly one input")
+        self.params = {key: value for key, value in spec.items() if key not in RESERVED_KEYS}
+
+    def __repr__(self):
+        return f"PipelineNode({self.name!r}, {self.section}.{self.type})"
+
+
+class PipelineRunner:
+    """
+    Runs the nodes of a pipeline spec as a DAG on a thread pool.
+
+    A node is submitted once all its inputs are done; a node whose input
+    failed is skipped. Outputs are released once every consumer has run.
+    """
+
+    def __init__(self, spec: dict):
+        """
+        :param spec: Parsed pipeline spec, see the module docstring.
+        """
+        spec = spec or {}
+        self.max_workers = spec.get("max_workers", 8)
+        self.rest = spec.get("rest") or {}
+        self.cache = spec.get("cache")
+        self.nodes: Dict[str, PipelineNode] = {}
+        for section in SECTIONS:
+            for name, node_spec in (spec.get(section) or {}).items():
+                if name in self.nodes:
+                    raise ValueError(f"Duplicate node name {name!r}")
+                if isinstance(node_spec, dict) and not node_spec.get("enabled", True):
+                    continue
+                self.nodes[name] = PipelineNode(name, section, node_spec)
+        if not self.nodes:
+            raise ValueError("The pipeline spec has no enabled nodes")
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "PipelineRunner":
+        with open(path) as f:
+            return cls(yaml.safe_load(f))
+
+    def _topological_order(self) -> List[str]:
+        for node in self.nodes.values():
+            for name in node.inputs:
+                if name not in self.nodes:
+                    raise ValueError(f"Node {node.name!r} reads unknown or disabled node {name!r}")
+                if self.nodes[name].type in TERMINAL_TYPES:
+                    raise ValueError(
+                        f"Node {node.name!r} cannot read {name!r}: {self.nodes[name].type} "
+                        f"sources write their own dataset"
+                    )
+
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"The pipeline has a cycle through {name!r}")
+            visiting.add(name)
+            for upstream in self.nodes[name].inputs:
+                visit(upstream)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    def upstream(self, names: List[str]) -> List[str]:
+        """The given nodes and everything they read from, in run order."""
+        selected = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.nodes:
+                raise ValueError(f"Unknown node {name!r}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.nodes[name].inputs)
+        return [name for name in self.order if name in selected]
+
+    def _context(self) -> PipelineContext:
+        rest = dict(self.rest)
+        api_key_env = rest.pop("api_key_env", None)
+        if api_key_env:
+            rest["api_key"] = os.environ.get(api_key_env)
+        cache = ResponseCache(**self.cache) if self.cache else None
+        return PipelineContext(BinanceRestClient(**rest), cache)
+
+    def _run_node(self, context: PipelineContext, node: PipelineNode, args: list):
+        started = time.perf_counter()
+        with NODE_SECONDS.time():
+            result = node.run(context, node.params, *args)
+        logger.info(f"Node {node.name} finished in {time.perf_counter() - started:.2f}s: {result}")
+        return result
+
+    def run(self, only: Optional[List[str]] = None, context: Optional[PipelineContext] = None):
+        """
+        Run the pipeline (or the nodes in `only` and their inputs).
+
+        SIGINT and SIGTERM stop websocket sources gracefully when called from
+        the main thread; the other nodes run to completion.
+
+        :param only: Names of the nodes to run.
+        :param context: Shared resources; built from the spec's rest and cache sections otherwise.
+        :return: Mapping of node name to result for every node that produced no
+            downstream input (sinks and terminal sources), and lists of failed and
+            skipped node names under "failed" and "skipped".
+        """
+        names = self.upstream(only) if only else self.order
+        context = context or self._context()
+        consumers = {name: 0 for name in names}
+        for name in names:
+            for upstream in self.nodes[name].inputs:
+                consumers[upstream] += 1
+        remaining = dict(consumers)
+
+        outputs, results, failed, skipped = {}, {}, [], []
+        waiting = list(names)
+        running = {}
+
+        previous = {}
+        if threading.current_thread() is threading.main_thread():
+            previous = {
+                signum: signal.signal(signum, lambda *_: context.stop_event.set())
+                for signum in (signal.SIGINT, signal.SIGTERM)
+            }
+
+        def release(node: PipelineNode):
+            for upstream in node.inputs:
+                remaining[upstream] -= 1
+                if remaining[upstream] == 0:
+                    outputs.pop(upstream, None)
+
+        def submit_ready(executor: ThreadPoolExecutor):
+            for name in list(waiting):
+                node = self.nodes[name]
+                if any(upstream in failed or upstream in skipped for upstream in node.inputs):
+                    logger.warning(f"Skipping {name}: an input failed")
+                    skipped.append(name)
+                    waiting.remove(name)
+                    release(node)
+                elif all(upstream in outputs for upstream in node.inputs):
+                    args = []
+                    for upstream in node.inputs:
+                        batch = outputs[upstream]
+                        if node.type in IN_PLACE_TYPES and consumers[upstream] > 1:
+                            batch = batch.take(np.arange(len(batch)))
+                        args.append(batch)
+                    running[executor.submit(self._run_node, context, node, args)] = name
+                    waiting.remove(name)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                submit_ready(executor)
+                while running:
+                    finished, _ = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        node = self.nodes[name]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            NODES_FAILED.inc()
+                            logger.error(f"Node {name} failed: {e}")
+                            failed.append(name)
+                        else:
+                            if consumers[name]:
+                                outputs[name] = result
+                            else:
+                                results[name] = result
+                        release(node)
+                    submit_ready(executor)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        results["failed"] = failed
+        results["skipped"] = skipped
+        logger.info(
+            f"Pipeline finished: {len(names) - len(failed) - len(skipped)} nodes ran, "
+            f"{len(failed)} failed, {len(skipped)} skipped"
+        )
+        return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a declarative ETL pipeline.")
+    parser.add_argument("config", nargs="?", default=DEFAULT_CONFIG, help="Pipeline spec (YAML)")
+    parser.add_argument("--only", nargs="+", help="Run only these nodes and their inputs")
+    args = parser.parse_args(argv)
+
+    results = PipelineRunner.from_yaml(args.config).run(only=args.only)
+    return 1 if results["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,25 @@
-from binance_api_call import OHLCVData
+from .binance_api_call import OHLCVData
+from .cleaning import clean_ohlcv
+from .dataset import PartitionedDatasetWriter
+from .file_writer import FileWriteDataReturnValue
+from .indicators import DEFAULT_EMA_PERIODS, EMAEngine
+from .masking import DataMasker
+from .observability import get_logger
+from .ohlcv import OHLCVBatch
 import pandas as pd
-from typing import List
+import pyarrow.parquet as pq
+from typing import List, Union
+
+logger = get_logger(__name__)
+
+OHLCVInput = Union[OHLCVBatch, List[OHLCVData]]
+
+
+def _as_batch(ohlcv_data: OHLCVInput) -> OHLCVBatch:
+    """Accept a list of OHLCVData records for backwards compatibility."""
+    if isinstance(ohlcv_data, OHLCVBatch):
+        return ohlcv_data
+    return OHLCVBatch.from_records(ohlcv_data)
 
 
 class DataTransformation:
@@ -8,79 +27,79 @@ class DataTransformation:
 
     @staticmethod
     def add_ema(
-        ohlcv_data: List[OHLCVData], periods=[20, 50, 100, 200]
-    ) -> List[OHLCVData]:
+        ohlcv_data: OHLCVInput,
+        periods=DEFAULT_EMA_PERIODS,
+        engine: EMAEngine = None,
+    ) -> OHLCVBatch:
         """
-        Add Exponential Moving Averages (EMAs) to a list of OHLCVData objects.
+        Add Exponential Moving Averages (EMAs) to an OHLCV batch.
 
-        :param ohlcv_data: List of OHLCVData objects
+        :param ohlcv_data: OHLCVBatch (or list of OHLCVData objects)
         :param periods: List of periods for EMAs
-        :return: List of OHLCVData objects with added EMA attributes
+        :param engine: Optional EMAEngine carrying state from earlier batches
+        :return: The batch with an EMA_<period> column per period
         """
-        df = pd.DataFrame([data.__dict__ for data in ohlcv_data])
-        for period in periods:
-            df[f"EMA_{period}"] = df["close"].ewm(span=period, adjust=False).mean()
-
-        # Update OHLCVData objects with the new EMA values
-        for i, data in enumerate(ohlcv_data):
-            for period in periods:
-                setattr(data, f"EMA_{period}", df[f"EMA_{period}"].iloc[i])
-
-        return ohlcv_data
+        batch = _as_batch(ohlcv_data)
+        engine = engine or EMAEngine(periods)
+        df = engine.apply(
+            pd.DataFrame(
+                {
+                    "symbol": batch.symbol_array(),
+                    "timestamp": batch.timestamp,
+                    "close": batch.close,
+                },
+                copy=False,
+            )
+        )
+        for period in engine.periods:
+            name = f"EMA_{period}"
+            batch.with_column(name, df[name].to_numpy())
+        return batch
 
     @staticmethod
-    def clean_data(ohlcv_data: List[OHLCVData]) -> List[OHLCVData]:
-        """Perform data cleaning steps on OHLCVData objects."""
-        cleaned_data = []
-        seen = set()
-
-        for data in ohlcv_data:
-            if (data.symbol, data.timestamp) not in seen:
-                # Apply cleaning conditions (e.g., positive values check)
-                if all(
-                    [
-                        x > 0
-                        for x in [
-                            data.open,
-                            data.high,
-                            data.low,
-                            data.close,
-                            data.volume,
-                        ]
-                    ]
-                ):
-                    seen.add((data.symbol, data.timestamp))
-                    cleaned_data.append(data)
-
-        return cleaned_data
+    def clean_data(ohlcv_data: OHLCVInput) -> OHLCVBatch:
+        """Perform data cleaning steps on an OHLCV batch."""
+        cleaned, report = clean_ohlcv(_as_batch(ohlcv_data).to_pandas())
+        logger.info(f"Cleaning {report}")
+        return OHLCVBatch.from_frame(cleaned)
 
     @staticmethod
-    def anonymize_data(ohlcv_data: List[OHLCVData]) -> List[OHLCVData]:
-        """Mask volume data to anonymize trade sizes."""
-        for data in ohlcv_data:
-            data.volume = round(data.volume, 2)
-            data.taker_buy_base = round(data.taker_buy_base, 2)
-            data.taker_buy_quote = round(data.taker_buy_quote, 2)
-        return ohlcv_data
+    def anonymize_data(ohlcv_data: OHLCVInput, masker: DataMasker = None) -> OHLCVBatch:
+        """Mask volume data to anonymize trade sizes, in place on the batch columns."""
+        batch = _as_batch(ohlcv_data)
+        masker = masker or DataMasker()
+        for rule in masker.rules:
+            if rule.column in batch.columns:
+                masker.mask_block(batch.columns[rule.column], rule)
+        return batch
 
 
 class DataSaver:
     """Handles saving data to Parquet format."""
 
     @staticmethod
-    def save_to_parquet(ohlcv_data: List[OHLCVData], filename: str):
-        """Save a list of OHLCVData to Parquet format."""
-        df = pd.DataFrame([data.__dict__ for data in ohlcv_data])
-        df.to_parquet(filename, index=False)
+    def save_to_parquet(ohlcv_data: OHLCVInput, filename: str) -> FileWriteDataReturnValue:
+        """Save an OHLCV batch to a single Parquet file."""
+        batch = _as_batch(ohlcv_data)
+        pq.write_table(batch.to_arrow(), filename)
         logger.info(f"Saved {filename}")
+        return FileWriteDataReturnValue(paths=[filename], rows_written=len(batch))
+
+    @staticmethod
+    def save_to_dataset(
+        ohlcv_data: OHLCVInput, root: str, interval: str
+    ) -> FileWriteDataReturnValue:
+        """Append an OHLCV batch to the partitioned Parquet dataset under `root`."""
+        result = PartitionedDatasetWriter(root, interval).write(_as_batch(ohlcv_data))
+        logger.info(f"Saved {result.rows_written} rows to {len(result.paths)} files")
+        return result
 
 
 class ReportGenerator:
     """Handles the generation of reports (e.g., CSV)."""
 
     @staticmethod
-    def generate_report(ohlcv_data: List[OHLCVData], filename: str):
+    def generate_report(ohlcv_data: OHLCVInput, filename: str):
         """Generate and save the report as a CSV file."""
-        df = pd.DataFrame([data.__dict__ for data in ohlcv_data])
-        df.to_csv(filename, index=False)
+        _as_batch(ohlcv_data).to_pandas().to_csv(filename, index=False)
         logger.info(f"Report saved to {filename}")
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = "data/cache/http"
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GiB
+
+
+def cache_key(endpoint: str, params: dict) -> str:
+    """Content address of a request: SHA-256 of the endpoint and its sorted parameters."""
+    query = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    return hashlib.sha256(f"{endpoint}?{query}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Size-bounded on-disk LRU cache of compressed response bodies.
+
+    Entries live at <directory>/<key[:2]>/<key>.z; a hit refreshes the file's
+    mtime, and once the total size exceeds `max_bytes` the least recently used
+    entries are deleted. Only put responses that can never change.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        compress_level: int = 6,
+    ):
+        """
+        :param directory: Cache directory, shared by every process using it.
+        :param max_bytes: Upper bound on the compressed size of all entries.
+        :param compress_level: zlib compression level.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, int]] = {}  # path -> (last use, size)
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(".z"):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    self._entries[path] = (stat.st_mtime, stat.st_size)
+                    self._total += stat.st_size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.z")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached body for `key`, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                body = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        now = time.time()
+        os.utime(path, (now, now))
+        with self._lock:
+            self.hits += 1
+            if path in self._entries:
+                self._entries[path] = (now, self._entries[path][1])
+        return body
+
+    def put(self, key: str, body: bytes):
+        """Store `body` under `key` and evict least recently used entries if over budget."""
+        path = self._path(key)
+        data = zlib.compress(body, self.compress_level)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            previous = self._entries.get(path)
+            if previous is not None:
+                self._total -= previous[1]
+            self._entries[path] = (time.time(), len(data))
+            self._total += len(data)
+            if self._total <= self.max_bytes:
+                return
+            evicted = 0
+            for old_path, (_, size) in sorted(self._entries.items(), key=lambda e: e[1][0]):
+                if self._total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass  # Already evicted by another process
+                del self._entries[old_path]
+                self._total -= size
+                evicted += 1
+        logger.info(f"Evicted {evicted} cached responses from {self.directory}")
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Process-wide cache in DEFAULT_CACHE_DIR."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
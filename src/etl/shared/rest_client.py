@@ -0,0 +1,265 @@
+import math
+import os
+import random
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .json_codec import loads
+from .observability import counter, gauge, get_logger, histogram
+
+logger = get_logger(__name__)
+
+# Point at a local mock server with e.g. BINANCE_REST_URL=http://127.0.0.1:8080
+DEFAULT_BASE_URL = os.environ.get("BINANCE_REST_URL", "https://api.binance.com")
+
+KLINES_PATH = "/api/v3/klines"
+TRADES_PATH = "/api/v3/trades"
+HISTORICAL_TRADES_PATH = "/api/v3/historicalTrades"
+AGG_TRADES_PATH = "/api/v3/aggTrades"
+
+MAX_WEIGHT_PER_MINUTE = 6000  # Binance spot REQUEST_WEIGHT limit per IP
+ENDPOINT_WEIGHTS = {
+    KLINES_PATH: 2,
+    TRADES_PATH: 25,
+    HISTORICAL_TRADES_PATH: 25,
+    AGG_TRADES_PATH: 4,
+}
+USED_WEIGHT_HEADER = "X-MBX-USED-WEIGHT-1M"
+RETRY_STATUSES = {418, 429, 500, 502, 503, 504}
+
+REQUESTS_HELP = "REST requests by endpoint and HTTP status (or error)"
+USED_WEIGHT_HELP = "Request weight the server reports as used in the current minute"
+
+
+class Backoff:
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0, factor: float = 2.0):
+        """
+        :param initial: Upper bound of the first delay in seconds.
+        :param maximum: Cap on the delay in seconds.
+        :param factor: Growth factor of the upper bound per failed attempt.
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """Delay before the next attempt, drawn uniformly below the current bound."""
+        bound = min(self.maximum, self.initial * self.factor**self.attempts)
+        self.attempts += 1
+        return random.uniform(0, bound)
+
+    def reset(self):
+        self.attempts = 0
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait according to a Retry-After header.
+
+    :param value: Header value, either delay-seconds or an HTTP-date.
+    :return: The delay (0 for a date in the past), or None if the header is
+        missing or unparsable.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)  # HTTP-dates are GMT
+        seconds = retry_at.timestamp() - time.time()
+    return max(seconds, 0.0) if math.isfinite(seconds) else None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously up to `capacity` per `period`."""
+
+    def __init__(self, capacity: float = MAX_WEIGHT_PER_MINUTE, period: float = 60.0):
+        """
+        :param capacity: Bucket size, i.e. the weight allowed per period.
+        :param period: Seconds needed to refill an empty bucket.
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, weight: float = 1):
+        """Block until `weight` tokens are available (and any pause is over), then take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= min(weight, self.capacity):
+                    self.tokens -= weight
+                    return
+                wait = max(
+                    self.paused_until - now,
+                    (min(weight, self.capacity) - self.tokens) / self.rate,
+                )
+            time.sleep(wait)
+
+    def observe_used(self, used: float):
+        """Align with the weight the server reports as used in the current minute."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, self.capacity - used)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for `seconds`, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class BinanceRestClient:
+    """
+    Shared Binance REST client.
+
+    One keep-alive connection pool per client, request weight accounted per
+    host with a token bucket that follows the X-MBX-USED-WEIGHT-1M header,
+    and retries with jittered exponential backoff on 429/418 (honouring
+    Retry-After), 5xx and connection errors.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        max_weight_per_minute: int = MAX_WEIGHT_PER_MINUTE,
+        pool_size: int = 16,
+        timeout: float = 10.0,
+        max_retries: int = 5,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 30.0,
+        api_key: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+    ):
+        """
+        :param base_url: Scheme and host the request paths are joined to.
+        :param max_weight_per_minute: Request-weight budget per host.
+        :param pool_size: Keep-alive connections kept per host.
+        :param timeout: Connect and read timeout in seconds.
+        :param max_retries: Retries of one request before its error is raised.
+        :param backoff_initial: Upper bound of the first retry delay in seconds.
+        :param backoff_max: Cap on the retry delay in seconds.
+        :param api_key: Binance API key, sent as X-MBX-APIKEY.
+        :param session: Optional requests session to reuse; one is created otherwise.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_weight_per_minute = max_weight_per_minute
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        if api_key is not None:
+            session.headers["X-MBX-APIKEY"] = api_key
+        self.session = session
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.max_weight_per_minute)
+            return self.buckets[host]
+
+    def get(
+        self, path: str, params: Optional[dict] = None, weight: Optional[int] = None
+    ) -> requests.Response:
+        """
+        GET `path` (relative to base_url, or an absolute URL) within the weight budget.
+
+        :param path: Endpoint path, e.g. KLINES_PATH.
+        :param params: Query parameters.
+        :param weight: Request weight; looked up in ENDPOINT_WEIGHTS by default.
+        :return: The successful response.
+        :raises requests.RequestException: Once the retries are exhausted, or
+            at once on a non-retryable error status.
+        """
+        url = path if "://" in path else f"{self.base_url}{path}"
+        host, endpoint = urlsplit(url)[1:3]
+        weight = weight or ENDPOINT_WEIGHTS.get(endpoint, 1)
+        bucket = self.bucket(host)
+        backoff = Backoff(self.backoff_initial, self.backoff_max)
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire(weight)
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                counter(
+                    "rest_requests_total", REQUESTS_HELP, endpoint=endpoint, status="error"
+                ).inc()
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff.next_delay()
+                logger.warning(f"GET {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            histogram(
+                "rest_request_seconds", "REST request latency", endpoint=endpoint
+            ).observe(time.perf_counter() - started)
+            counter(
+                "rest_requests_total", REQUESTS_HELP, endpoint=endpoint, status=response.status_code
+            ).inc()
+            used = response.headers.get(USED_WEIGHT_HEADER)
+            if used is not None:
+                bucket.observe_used(float(used))
+                gauge("rest_used_weight", USED_WEIGHT_HELP, host=host).set(float(used))
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                response.raise_for_status()
+                return response
+
+            delay = retry_after_seconds(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = backoff.next_delay()
+            if response.status_code in (418, 429):
+                bucket.pause(delay)  # Every caller on this host backs off, not just this one
+            logger.warning(
+                f"GET {url} returned {response.status_code}, retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+    def get_json(self, path: str, params: Optional[dict] = None, weight: Optional[int] = None):
+        return loads(self.get(path, params, weight).content)
+
+
+_default_client: Optional[BinanceRestClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> BinanceRestClient:
+    """Process-wide client, so every module shares one pool and one weight budget."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = BinanceRestClient()
+        return _default_client
@@ -0,0 +1,149 @@
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .backfill import interval_to_ms
+from .dataset import PartitionedDatasetWriter, dataset_watermark, read_ohlcv
+from .file_writer import FileWriteDataReturnValue
+from .observability import get_logger
+from .ohlcv import OHLCVBatch
+
+logger = get_logger(__name__)
+
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60 * 1000  # Binance weeks open on Monday; the epoch is a Thursday
+SUM_FIELDS = ("volume", "trades", "taker_buy_base", "taker_buy_quote")
+
+
+def bucket_open_times(timestamps: np.ndarray, interval: str) -> np.ndarray:
+    """Open time (epoch ms) of the `interval` candle containing each timestamp."""
+    step = interval_to_ms(interval)
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    return (timestamps - offset) // step * step + offset
+
+
+def rollup(
+    candles: Union[OHLCVBatch, pd.DataFrame],
+    interval: str,
+    base_interval: Optional[str] = None,
+    start: Optional[int] = None,
+) -> OHLCVBatch:
+    """
+    Build coarser candles from finer ones in one vectorized pass.
+
+    Open is the first, high the max, low the min and close the last fine
+    candle of each bucket; volume, trades and the taker columns are summed.
+
+    :param candles: Fine candles of one or more symbols.
+    :param interval: Target interval, e.g. "1h".
+    :param base_interval: Interval of the input; when given, the first bucket of a
+        symbol is dropped if the input starts inside of it, and the last one if the
+        input ends before it is over (e.g. the still open one). Buckets in between
+        are kept even when fine candles are missing from them (exchange outages).
+    :param start: Epoch ms the input is complete from; the first bucket is only
+        dropped if it opens before this. Defaults to each symbol's first candle.
+    :return: OHLCVBatch of the rolled-up candles, grouped by symbol and time.
+    """
+    batch = candles if isinstance(candles, OHLCVBatch) else OHLCVBatch.from_frame(candles)
+    if not len(batch):
+        return batch
+
+    times = batch.columns["timestamp"]
+    order = np.lexsort((times, batch.symbol_codes))
+    codes = batch.symbol_codes[order]
+    times = times[order]
+    buckets = bucket_open_times(times, interval)
+    starts = np.flatnonzero(
+        np.r_[True, (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])]
+    )
+    ends = np.r_[starts[1:], len(order)]
+
+    columns = {"timestamp": buckets[starts]}
+    fields = [name for name in batch.columns if name != "timestamp"]
+    for name in fields:
+        values = batch.columns[name][order]
+        if name == "open":
+            columns[name] = values[starts]
+        elif name == "close":
+            columns[name] = values[ends - 1]
+        elif name == "high":
+            columns[name] = np.maximum.reduceat(values, starts)
+        elif name == "low":
+            columns[name] = np.minimum.reduceat(values, starts)
+        elif name in SUM_FIELDS:
+            columns[name] = np.add.reduceat(values, starts)
+    result = OHLCVBatch(columns, codes[starts], batch.symbols)
+
+    if base_interval is not None:
+        step = interval_to_ms(interval)
+        base_ms = interval_to_ms(base_interval)
+        first = np.r_[True, codes[starts][1:] != codes[starts][:-1]]
+        last = np.r_[first[1:], True]
+        begin = times[starts] if start is None else start
+        partial = (first & (buckets[starts] < begin)) | (
+            last & (buckets[starts] + step > times[ends - 1] + base_ms)
+        )
+        gaps = int((~partial & (ends - starts < step // base_ms)).sum())
+        if gaps:
+            logger.warning(f"{gaps} {interval} candles are missing some {base_interval} candles")
+        result = result.take(~partial)
+    return result
+
+
+class RollupCache:
+    """
+    Materializes coarser intervals next to the base candles of a dataset.
+
+    Rollups are stored as their own interval partitions (e.g. interval=1h
+    beside interval=1m) and only ever appended: a refresh reads the fine
+    candles after the newest stored bucket and writes the buckets completed
+    since, so the still-open bucket is left for a later refresh. Buckets with
+    fine candles missing before the newest one are written as they are, so a
+    gap never holds back or gets skipped by the next refresh.
+    """
+
+    def __init__(self, root: str = "data/ohlcv", base_interval: str = "1m"):
+        """
+        :param root: Dataset root directory holding the base candles.
+        :param base_interval: Interval the rollups are derived from.
+        """
+        self.root = root
+        self.base_interval = base_interval
+
+    def refresh(self, symbols: List[str], intervals: List[str]) -> FileWriteDataReturnValue:
+        """
+        Bring the rollups of `symbols` at `intervals` up to date.
+
+        :param symbols: List of trading pairs (e.g., ["BTCUSDT", "ETHUSDT"]).
+        :param intervals: Target intervals, each a multiple of the base interval.
+        :return: FileWriteDataReturnValue of the rollup files appended.
+        """
+        base_ms = interval_to_ms(self.base_interval)
+        paths = []
+        rows_written = 0
+        for interval in intervals:
+            if interval_to_ms(interval) % base_ms:
+                raise ValueError(f"{interval} is not a multiple of {self.base_interval}")
+            writer = PartitionedDatasetWriter(self.root, interval)
+            for symbol in symbols:
+                newest = dataset_watermark(self.root, symbol, interval)
+                start = None if newest is None else newest + interval_to_ms(interval)
+                fine = read_ohlcv(
+                    [symbol], start=start, root=self.root, interval=self.base_interval
+                )
+                if fine.empty:
+                    continue
+                fine = fine.drop(columns=["interval", "date"], errors="ignore")
+                result = writer.write(rollup(fine, interval, self.base_interval, start))
+                paths.extend(result.paths)
+                rows_written += result.rows_written
+                if result.rows_written:
+                    logger.info(
+                        f"Rolled up {result.rows_written} {interval} candles for {symbol}"
+                    )
+        return FileWriteDataReturnValue(paths=paths, rows_written=rows_written)
+
+    def read(self, symbols: List[str], interval: str, **kwargs) -> pd.DataFrame:
+        """Refresh and read the `interval` rollups (see read_ohlcv for kwargs)."""
+        self.refresh(symbols, [interval])
+        return read_ohlcv(symbols, root=self.root, interval=interval, **kwargs)
@@ -0,0 +1,352 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .candles import CandleStateTable
+from .file_writer import FileWriteDataReturnValue, KlineRingBuffer, RollingParquetWriter, kline_row
+from .json_codec import decode_stream_message
+from .observability import counter, get_logger, histogram
+from .rest_client import Backoff
+from .stream_manager import COMBINED_STREAM_URL, KlineGapFiller, StreamManager, shard_streams
+
+logger = get_logger(__name__)
+
+WORKER_KINDS = ("process", "thread")
+STOP = None  # Queue sentinel: the producer is done
+RECONNECTED = "reconnected"  # Queue marker: the receiver reconnected, fill the gap
+WRITE_ATTEMPTS = 5  # Tries per batch after stop() before it is spilled to disk
+WRITE_BACKOFF = (0.5, 10.0)  # Initial and maximum seconds between two tries
+
+BACKPRESSURE_WAITS = counter(
+    "runtime_backpressure_waits_total", "Receiver waits on a full decode queue"
+)
+FLUSH_SECONDS = histogram("runtime_flush_seconds", "Time to write one decoded batch")
+ROWS_WRITTEN = counter("runtime_rows_written_total", "Kline rows written by the runtime")
+ROWS_SPILLED = counter(
+    "runtime_rows_spilled_total", "Kline rows the writer failed on, saved to spill files"
+)
+
+
+async def _put(inbox, item):
+    """Blocking put run off the loop, in short waits so a cancelled receiver never hangs."""
+    while True:
+        try:
+            return await asyncio.to_thread(inbox.put, item, True, 0.5)
+        except queue.Full:
+            continue
+
+
+class _QueueingStreamManager(StreamManager):
+    """Receiver: hands raw messages to a decoder queue instead of decoding them on the loop."""
+
+    def __init__(self, streams: List[str], inbox, **kwargs):
+        super().__init__(streams, gap_filler=_ReconnectNotifier(inbox), **kwargs)
+        self.inbox = inbox
+
+    async def dispatch(self, message):
+        try:
+            self.inbox.put_nowait(message)
+        except queue.Full:
+            # Stop reading the socket until the decoder catches up
+            BACKPRESSURE_WAITS.inc()
+            await _put(self.inbox, message)
+
+
+class _ReconnectNotifier:
+    """Gap filler of a receiver: the decoder owns the candle state, so it fills the gap."""
+
+    def __init__(self, inbox):
+        self.inbox = inbox
+
+    async def fill(self, streams: List[str], deliver):
+        await _put(self.inbox, (RECONNECTED, streams))
+
+
+def _decode_worker(inbox, outbox, batch_rows: int, batch_seconds: float, fill_gaps: bool):
+    """
+    Decoder loop: parse raw messages, keep closed candles and ship them as record batches.
+
+    Runs in its own thread or process until it takes STOP from `inbox`; the
+    candles still buffered are then shipped and STOP is passed on to `outbox`,
+    also when the worker fails, so the writer never waits for it forever.
+    """
+    candles = CandleStateTable()
+    gap_filler = KlineGapFiller(candles) if fill_gaps else None
+    buffer = KlineRingBuffer(2 * batch_rows)
+    deadline = time.monotonic() + batch_seconds
+
+    async def deliver(stream: str, data: dict):
+        handle(data)
+
+    def handle(data: dict):
+        kline = data.get("k")
+        if kline and candles.update(kline) is not None:
+            if len(buffer) == buffer.capacity:
+                ship()  # A gap fill can deliver more than a batch; this thread drains itself
+            buffer.append(*kline_row(data.get("s", "UNKNOWN"), kline), timeout=0)
+
+    def ship():
+        batch = buffer.drain()
+        if batch is not None:
+            outbox.put(batch)
+
+    try:
+        while True:
+            try:
+                message = inbox.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                message = ()
+            if message is STOP:
+                return
+            if isinstance(message, tuple) and message and message[0] == RECONNECTED:
+                if gap_filler is not None:
+                    asyncio.run(gap_filler.fill(message[1], deliver))
+            elif message:
+                try:
+                    handle(decode_stream_message(message).get("data", {}))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    logger.error(f"Dropped undecodable message: {e!r}")
+
+            if len(buffer) >= batch_rows or time.monotonic() >= deadline:
+                ship()
+                deadline = time.monotonic() + batch_seconds
+    except Exception as e:
+        logger.error(f"Decoder stopped unexpectedly: {e!r}")
+        raise
+    finally:
+        try:
+            ship()
+        except Exception as e:
+            logger.error(f"Lost {len(buffer)} decoded candles: {e!r}")
+        outbox.put(STOP)
+
+
+class IngestionRuntime:
+    """
+    Kline stream ingestion with receive, decode and write in separate workers.
+
+    Receivers (the websocket connections, on one asyncio thread) only enqueue
+    raw messages; decoders parse them, keep closed candles and hand columnar
+    batches to a single writer thread. Stages are connected by bounded queues:
+    a slow writer blocks the decoders, which fill their queues until the
+    receivers stop reading the socket, instead of buffering without bound.
+
+    Streams are split between the decoders, each owning the candle state of
+    its symbols, so decoding scales with the number of (process) workers.
+    stop() drains every stage in order, so buffered candles are written. A
+    batch that fails to write is retried, backing up the queues meanwhile; once
+    stopping, one that still fails is saved to a spill file instead of lost.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        interval: str = "1m",
+        directory: str = "data/stream",
+        decoders: Optional[int] = None,
+        workers: str = "process",
+        queue_size: int = 10_000,
+        batch_rows: int = 10_000,
+        batch_seconds: float = 1.0,
+        streams_per_connection: int = 200,
+        base_url: str = COMBINED_STREAM_URL,
+        fill_gaps: bool = True,
+        writer: Optional[RollingParquetWriter] = None,
+        spill_directory: Optional[str] = None,
+    ):
+        """
+        :param symbols: List of trading pairs (e.g., ["BTCUSDT", "ETHUSDT"]).
+        :param interval: Kline interval of the streams.
+        :param directory: Directory of the Parquet files, unless `writer` is given.
+        :param decoders: Number of decoder workers; one per spare core by default.
+        :param workers: "process" (decoding scales with cores) or "thread".
+        :param queue_size: Capacity of each queue, in messages or batches.
+        :param batch_rows: Rows a decoder collects before shipping a batch.
+        :param batch_seconds: Longest a decoded candle waits before it is shipped.
+        :param streams_per_connection: Streams multiplexed over one connection.
+        :param base_url: Combined-stream endpoint.
+        :param fill_gaps: Backfill candles missed while a connection was down.
+        :param writer: Destination of the batches; a RollingParquetWriter by default.
+        :param spill_directory: Where batches the writer still fails on at stop() are
+            saved; "spill" inside the writer's directory by default.
+        """
+        if workers not in WORKER_KINDS:
+            raise ValueError(f"Unknown worker kind {workers!r}, expected one of {WORKER_KINDS}")
+        streams = [f"{symbol.lower()}@kline_{interval}" for symbol in symbols]
+        decoders = decoders or max((os.cpu_count() or 2) - 1, 1)
+        groups = shard_streams(streams, -(-len(streams) // decoders)) if streams else []
+
+        if workers == "process":
+            context = multiprocessing.get_context("spawn")  # Children set up their own logging
+            make_queue, make_worker = context.Queue, context.Process
+        else:
+            make_queue, make_worker = queue.Queue, threading.Thread
+        self.write_queue = make_queue(queue_size)
+        self.inboxes = [make_queue(queue_size) for _ in groups]
+        self.receivers = [
+            _QueueingStreamManager(
+                group, inbox, streams_per_connection=streams_per_connection, base_url=base_url
+            )
+            for group, inbox in zip(groups, self.inboxes)
+        ]
+        self.decoders = [
+            make_worker(
+                target=_decode_worker,
+                args=(inbox, self.write_queue, batch_rows, batch_seconds, fill_gaps),
+                name=f"kline-decoder-{i}",
+                daemon=True,
+            )
+            for i, inbox in enumerate(self.inboxes)
+        ]
+        self.writer = writer or RollingParquetWriter(directory)
+        self.spill_directory = spill_directory or os.path.join(self.writer.directory, "spill")
+        self.spilled: List[str] = []
+        self.result: Optional[FileWriteDataReturnValue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._started = threading.Event()
+        self._stopped = threading.Event()
+        self._receive_thread = threading.Thread(
+            target=self._receive, name="kline-receiver", daemon=True
+        )
+        self._write_thread = threading.Thread(target=self._write, name="kline-writer", daemon=True)
+
+    def _receive(self):
+        async def main():
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.current_task()
+            self._started.set()
+            # return_exceptions: on stop, wait until every receiver closed its connections
+            results = await asyncio.gather(
+                *(receiver.run() for receiver in self.receivers), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Receiver stopped unexpectedly: {result!r}")
+
+        try:
+            asyncio.run(main())
+        except asyncio.CancelledError:
+            pass  # Stopped
+        except Exception as e:
+            logger.error(f"Receivers stopped unexpectedly: {e!r}")
+        finally:
+            self._started.set()
+
+    def _write_batch(self, batch: pa.RecordBatch):
+        """
+        Write one batch, retrying with backoff until it succeeds.
+
+        While the runtime runs the writer keeps retrying, so the queues fill up and
+        the receivers stop reading instead of candles being dropped. After stop(),
+        a batch that failed WRITE_ATTEMPTS times is spilled to disk.
+        """
+        backoff = Backoff(*WRITE_BACKOFF)
+        attempt = 0
+        while True:
+            try:
+                with FLUSH_SECONDS.time():
+                    self.writer.write_batch(batch)
+                ROWS_WRITTEN.inc(batch.num_rows)
+                return
+            except Exception as e:
+                attempt += 1
+                if self._stopped.is_set() and attempt >= WRITE_ATTEMPTS:
+                    self._spill(batch, e)
+                    return
+                delay = backoff.next_delay()
+                logger.warning(
+                    f"Failed to write {batch.num_rows} candles ({e}), retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    def _spill(self, batch: pa.RecordBatch, error: Exception):
+        """Save a batch the writer keeps failing on to its own file in spill_directory."""
+        path = os.path.join(
+            self.spill_directory,
+            f"spill-{time.strftime('%Y%m%dT%H%M%S')}-{len(self.spilled):05d}.parquet",
+        )
+        try:
+            os.makedirs(self.spill_directory, exist_ok=True)
+            pq.write_table(pa.Table.from_batches([batch]), path)
+        except Exception as e:
+            logger.error(
+                f"Lost {batch.num_rows} candles: write failed ({error}), spill failed ({e})"
+            )
+            return
+        self.spilled.append(path)
+        ROWS_SPILLED.inc(batch.num_rows)
+        logger.error(f"Spilled {batch.num_rows} candles to {path} after failed writes: {error}")
+
+    def _write(self):
+        remaining = len(self.decoders)
+        while remaining:
+            batch = self.write_queue.get()
+            if batch is STOP:
+                remaining -= 1
+                continue
+            self._write_batch(batch)
+        self.result = self.writer.close()
+
+    def start(self):
+        """Start the writer, the decoders and then the receivers."""
+        self._write_thread.start()
+        for decoder in self.decoders:
+            decoder.start()
+        self._receive_thread.start()
+        self._started.wait()
+        logger.info(
+            f"Runtime started with {len(self.decoders)} decoders for "
+            f"{sum(len(r.streams) for r in self.receivers)} streams"
+        )
+        return self
+
+    def stop(self) -> FileWriteDataReturnValue:
+        """
+        Stop receiving and drain: every message already received is decoded,
+        every decoded candle written, then the writer is closed.
+
+        :return: FileWriteDataReturnValue of everything written.
+        """
+        if self._stopped.is_set():
+            return self.result
+        self._stopped.set()
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        self._receive_thread.join()
+        for inbox, decoder in zip(self.inboxes, self.decoders):
+            while decoder.is_alive():  # A failed decoder no longer empties its queue
+                try:
+                    inbox.put(STOP, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+        for decoder in self.decoders:
+            decoder.join()
+        self._write_thread.join()
+        logger.info(f"Runtime stopped, {self.result}")
+        return self.result
+
+    def run(self) -> FileWriteDataReturnValue:
+        """Run until SIGINT or SIGTERM, then drain and return what was written."""
+        stop_requested = threading.Event()
+        previous = {
+            signum: signal.signal(signum, lambda *_: stop_requested.set())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            self.start()
+            while not stop_requested.wait(0.5):
+                pass
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        return self.stop()
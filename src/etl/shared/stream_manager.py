@@ -0,0 +1,257 @@
+import asyncio
+import inspect
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import websockets
+
+from .backfill import KlineBackfill, interval_to_ms
+from .candles import CandleStateTable
+from .json_codec import decode_stream_message
+from .observability import counter, get_logger, histogram
+from .rest_client import Backoff
+
+logger = get_logger(__name__)
+
+MESSAGES = counter("stream_messages_total", "Combined-stream messages received")
+DECODE_SECONDS = histogram("stream_decode_seconds", "Time to decode one combined-stream message")
+HANDLER_ERRORS = counter("stream_handler_errors_total", "Messages whose handler raised")
+RECONNECTS = counter("stream_reconnects_total", "Combined-stream connections lost")
+BACKFILLED = counter("stream_backfilled_klines_total", "Candles replayed after reconnects")
+
+COMBINED_STREAM_URL = "wss://stream.binance.com:9443/stream"
+MAX_STREAMS_PER_CONNECTION = 1024  # Binance limit for one combined-stream connection
+
+# Called with the stream name (e.g. "btcusdt@kline_1m") and the event payload
+StreamHandler = Callable[[str, dict], object]
+StreamDeliver = Callable[[str, dict], Awaitable[None]]
+
+
+def shard_streams(streams: List[str], streams_per_connection: int) -> List[List[str]]:
+    """
+    Split stream names into shards of at most `streams_per_connection` each.
+
+    :param streams: Stream names to subscribe to.
+    :param streams_per_connection: Maximum number of streams per shard.
+    :return: List of shards, each a list of stream names.
+    """
+    if not 0 < streams_per_connection <= MAX_STREAMS_PER_CONNECTION:
+        raise ValueError(
+            f"streams_per_connection must be between 1 and {MAX_STREAMS_PER_CONNECTION}"
+        )
+    return [
+        streams[i : i + streams_per_connection]
+        for i in range(0, len(streams), streams_per_connection)
+    ]
+
+
+class KlineGapFiller:
+    """Backfills closed candles missed while a kline stream was disconnected."""
+
+    def __init__(self, candles: CandleStateTable, max_workers: int = 4):
+        """
+        :param candles: State table of the stream handler; its last closed candle
+            per symbol and interval marks where the gap starts.
+        :param max_workers: Number of windows fetched concurrently per gap.
+        """
+        self.candles = candles
+        self.max_workers = max_workers
+        self._backfills: Dict[str, KlineBackfill] = {}  # interval -> fetcher
+
+    def _missing_klines(
+        self, backfill: KlineBackfill, symbol: str, start_time: int
+    ) -> List[dict]:
+        """Fetch closed candles from `start_time` onwards as kline event payloads."""
+        now = int(time.time() * 1000)
+        interval = backfill.interval
+        columns = backfill.fetch([symbol], start_time, now).get(symbol)
+        if columns is None:
+            return []
+
+        closed = columns["close_time"] < now
+        return [
+            {
+                "e": "kline",
+                "s": symbol,
+                "k": {
+                    "t": open_time,
+                    "T": close_time,
+                    "s": symbol,
+                    "i": interval,
+                    "o": open_,
+                    "h": high,
+                    "l": low,
+                    "c": close,
+                    "v": volume,
+                    "n": trades,
+                    "x": True,
+                    "q": quote_volume,
+                    "V": taker_buy_base,
+                    "Q": taker_buy_quote,
+                },
+            }
+            for (
+                open_time,
+                close_time,
+                open_,
+                high,
+                low,
+                close,
+                volume,
+                trades,
+                quote_volume,
+                taker_buy_base,
+                taker_buy_quote,
+            ) in zip(
+                *(
+                    columns[name][closed].tolist()
+                    for name in (
+                        "timestamp",
+                        "close_time",
+                        "open",
+                        "high",
+                        "low",
+                        "close",
+                        "volume",
+                        "trades",
+                        "quote_asset_volume",
+                        "taker_buy_base",
+                        "taker_buy_quote",
+                    )
+                )
+            )
+        ]
+
+    async def fill(self, streams: List[str], deliver: StreamDeliver):
+        """
+        Replay every candle closed since the last one seen on each kline stream.
+
+        :param streams: Stream names of the reconnected shard.
+        :param deliver: Coroutine routing one event payload like a live message.
+        """
+        for stream in streams:
+            name, _, kind = stream.partition("@kline_")
+            symbol = name.upper()
+            last_closed = self.candles.last_closed.get((symbol, kind))
+            if not kind or last_closed is None:
+                continue  # Not a kline stream, or nothing streamed yet
+
+            if kind not in self._backfills:
+                self._backfills[kind] = KlineBackfill(kind, max_workers=self.max_workers)
+            start_time = last_closed + interval_to_ms(kind)
+            events = await asyncio.to_thread(
+                self._missing_klines, self._backfills[kind], symbol, start_time
+            )
+            for event in events:
+                await deliver(stream, event)
+            if events:
+                BACKFILLED.inc(len(events))
+                logger.info(f"Backfilled {len(events)} missed candles for {stream}")
+
+
+class StreamManager:
+    """Runs many Binance streams over a bounded number of combined-stream connections."""
+
+    def __init__(
+        self,
+        streams: List[str],
+        handler: Optional[StreamHandler] = None,
+        streams_per_connection: int = 200,
+        base_url: str = COMBINED_STREAM_URL,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0,
+        gap_filler: Optional[KlineGapFiller] = None,
+    ):
+        """
+        :param streams: Stream names (e.g. ["btcusdt@kline_1m", "ethusdt@kline_1m"]).
+        :param handler: Default handler for messages without a dedicated route.
+        :param streams_per_connection: Streams multiplexed over one connection.
+        :param base_url: Combined-stream endpoint.
+        :param backoff_initial: Upper bound of the first reconnect delay in seconds.
+        :param backoff_max: Cap on the reconnect delay in seconds.
+        :param gap_filler: Optional backfill of candles missed while disconnected.
+        """
+        self.streams = list(dict.fromkeys(streams))
+        self.handler = handler
+        self.routes: Dict[str, StreamHandler] = {}
+        self.base_url = base_url
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.gap_filler = gap_filler
+        self.shards = shard_streams(self.streams, streams_per_connection)
+
+    def route(self, stream: str, handler: StreamHandler):
+        """Send messages of `stream` to `handler` instead of the default handler."""
+        self.routes[stream] = handler
+
+    def shard_url(self, streams: List[str]) -> str:
+        """Combined-stream URL subscribing to `streams`."""
+        return f"{self.base_url}?streams={'/'.join(streams)}"
+
+    async def dispatch(self, message):
+        """Decode one combined-stream message and route it by its `stream` field."""
+        started = time.perf_counter()
+        envelope = decode_stream_message(message)
+        DECODE_SECONDS.observe(time.perf_counter() - started)
+        MESSAGES.inc()
+        await self.deliver(envelope.get("stream"), envelope.get("data", {}))
+
+    async def deliver(self, stream: str, data: dict):
+        """Route one event payload to the handler of `stream`."""
+        handler = self.routes.get(stream, self.handler)
+        if handler is None:
+            return
+        try:
+            result = handler(stream, data)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            HANDLER_ERRORS.inc()
+            logger.error(f"Handler failed for {stream}: {e}")
+
+    async def run_shard(self, shard_id: int, streams: List[str]):
+        """
+        Keep one combined-stream connection open.
+
+        Reconnects in a loop with jittered exponential backoff, and fills the gap
+        left by the outage before resuming live messages. Every failure, including
+        a rejected handshake (e.g. HTTP 429/503), only restarts this shard; the
+        loop ends when its task is cancelled.
+        """
+        url = self.shard_url(streams)
+        backoff = Backoff(self.backoff_initial, self.backoff_max)
+        connected_before = False
+        while True:
+            try:
+                async with websockets.connect(url) as websocket:
+                    logger.info(f"Shard {shard_id} connected with {len(streams)} streams")
+                    backoff.reset()
+                    if connected_before and self.gap_filler is not None:
+                        await self.gap_filler.fill(streams, self.deliver)
+                    connected_before = True
+                    async for message in websocket:
+                        await self.dispatch(message)
+            except (
+                websockets.exceptions.WebSocketException,
+                OSError,
+                asyncio.TimeoutError,
+            ) as e:
+                RECONNECTS.inc()
+                logger.warning(f"Shard {shard_id} disconnected ({e!r})")
+            except Exception as e:
+                RECONNECTS.inc()
+                logger.error(f"Shard {shard_id} failed ({e!r})")
+            delay = backoff.next_delay()
+            logger.info(f"Shard {shard_id} reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def run(self):
+        """Run every shard as its own asyncio task."""
+        logger.info(
+            f"Starting {len(self.shards)} connections for {len(self.streams)} streams"
+        )
+        # return_exceptions: once cancelled, wait for every shard to close its connection
+        await asyncio.gather(
+            *(self.run_shard(i, streams) for i, streams in enumerate(self.shards)),
+            return_exceptions=True,
+        )
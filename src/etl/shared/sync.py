@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .backfill import KlineBackfill, interval_to_ms
+from .dataset import PartitionedDatasetWriter, dataset_watermark
+from .file_writer import FileWriteDataReturnValue
+from .klines import klines_to_frame
+from .observability import get_logger
+from .rollup import RollupCache
+
+logger = get_logger(__name__)
+
+DEFAULT_STATE_PATH = "data/state/watermarks.json"
+SYNC_COLUMNS = [
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "trades",
+    "taker_buy_base",
+    "taker_buy_quote",
+]
+
+
+class WatermarkStore:
+    """Open time (epoch ms) of the newest stored closed candle per (symbol, interval)."""
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        """
+        :param path: JSON state file; created on the first save.
+        """
+        self.path = path
+        self.marks: Dict[str, int] = {}
+        self._lock = threading.Lock()  # One store may be shared by concurrent syncs
+        if os.path.exists(path):
+            with open(path) as f:
+                self.marks = json.load(f)
+
+    @staticmethod
+    def key(symbol: str, interval: str) -> str:
+        return f"{symbol}/{interval}"
+
+    def get(self, symbol: str, interval: str) -> Optional[int]:
+        return self.marks.get(self.key(symbol, interval))
+
+    def set(self, symbol: str, interval: str, open_time: int):
+        with self._lock:
+            self.marks[self.key(symbol, interval)] = int(open_time)
+
+    def save(self):
+        """Persist the marks, replacing the state file atomically."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.marks, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class IncrementalSync:
+    """Appends only the candles closed since the last run to the partitioned dataset."""
+
+    def __init__(
+        self,
+        root: str = "data/ohlcv",
+        interval: str = "1h",
+        store: Optional[WatermarkStore] = None,
+        backfill: Optional[KlineBackfill] = None,
+        default_days: int = 30,
+    ):
+        """
+        :param root: Dataset root directory.
+        :param interval: Timeframe for candles (e.g., "1m", "1h", "1d").
+        :param store: Watermark state; defaults to DEFAULT_STATE_PATH.
+        :param backfill: Kline fetcher; one is created for `interval` otherwise.
+        :param default_days: History fetched for a symbol seen for the first time.
+        """
+        self.root = root
+        self.interval = interval
+        self.store = store or WatermarkStore()
+        self.backfill = backfill or KlineBackfill(interval)
+        self.default_days = default_days
+        self.writer = PartitionedDatasetWriter(root, interval)
+
+    def start_time(self, symbol: str, now: int) -> int:
+        """First open time to fetch: after the watermark, else after the stored data."""
+        mark = self.store.get(symbol, self.interval)
+        if mark is None:
+            mark = dataset_watermark(self.root, symbol, self.interval)
+        if mark is None:
+            return now - self.default_days * 24 * 60 * 60 * 1000
+        return mark + interval_to_ms(self.interval)
+
+    def sync(self, symbols: List[str]) -> FileWriteDataReturnValue:
+        """
+        Fetch and append every candle closed after each symbol's watermark.
+
+        The candle still in progress is skipped so it is picked up once closed.
+        A watermark only advances after its rows are written, so a failed run is
+        simply retried from the same point.
+
+        :param symbols: List of trading pairs (e.g., ["BTCUSDT", "ETHUSDT"]).
+        :return: FileWriteDataReturnValue of the files appended.
+        """
+        now = int(time.time() * 1000)
+        by_start = defaultdict(list)
+        for symbol in symbols:
+            by_start[self.start_time(symbol, now)].append(symbol)
+
+        paths = []
+        rows_written = 0
+        for start_time, group in by_start.items():
+            if start_time >= now:
+                continue
+            for symbol, columns in self.backfill.fetch(group, start_time, now).items():
+                closed = columns["close_time"] < now
+                if not closed.any():
+                    continue
+                columns = {name: values[closed] for name, values in columns.items()}
+                result = self.writer.write(
+                    klines_to_frame(columns, symbol, keep=SYNC_COLUMNS, utc=True)
+                )
+                self.store.set(symbol, self.interval, np.max(columns["timestamp"]))
+                self.store.save()
+                paths.extend(result.paths)
+                rows_written += result.rows_written
+                logger.info(
+                    f"Synced {result.rows_written} new {self.interval} candles for {symbol}"
+                )
+
+        return FileWriteDataReturnValue(paths=paths, rows_written=rows_written)
+
+
+def sync_ohlcv(
+    symbols: List[str],
+    interval: str = "1h",
+    root: str = "data/ohlcv",
+    state_path: str = DEFAULT_STATE_PATH,
+    default_days: int = 30,
+    rollups: Optional[List[str]] = None,
+) -> FileWriteDataReturnValue:
+    """
+    Run one IncrementalSync pass, e.g. from an hourly cron job.
+
+    :param rollups: Coarser intervals to refresh from the synced candles
+        afterwards (e.g. ["1h", "1d"] on top of "1m"), see RollupCache.
+    """
+    result = IncrementalSync(
+        root, interval, WatermarkStore(state_path), default_days=default_days
+    ).sync(symbols)
+    if rollups:
+        RollupCache(root, interval).refresh(symbols, rollups)
+    return result
@@ -0,0 +1,234 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import requests
+
+from .dataset import PartitionedDatasetWriter
+from .file_writer import FileWriteDataReturnValue
+from .json_codec import decode_trade_page
+from .observability import get_logger
+from .rest_client import BinanceRestClient, get_client
+
+logger = get_logger(__name__)
+
+MAX_TRADES_PER_REQUEST = 1000
+MAX_AGG_TRADES_WINDOW_MS = 60 * 60 * 1000  # aggTrades rejects startTime/endTime spans above 1h
+
+TRADE_COLUMNS = ["trade_id", "timestamp", "price", "qty", "quote_qty", "is_buyer_maker"]
+
+TradeColumns = Dict[str, np.ndarray]
+
+
+def decode_trades(rows: list, kind: str = "aggTrades") -> TradeColumns:
+    """
+    Decode a trades or aggTrades response into typed columns.
+
+    Prices and quantities arrive as strings and are parsed straight into
+    float64 arrays. aggTrades rows also keep the first/last trade id they cover.
+
+    :param rows: Parsed JSON list of trade objects.
+    :param kind: "aggTrades", "trades" or "historicalTrades".
+    :return: Mapping of column name to NumPy array.
+    """
+    n = len(rows)
+    if kind == "aggTrades":
+        columns = {
+            "trade_id": np.fromiter((r["a"] for r in rows), np.int64, n),
+            "timestamp": np.fromiter((r["T"] for r in rows), np.int64, n),
+            "price": np.fromiter((r["p"] for r in rows), np.float64, n),
+            "qty": np.fromiter((r["q"] for r in rows), np.float64, n),
+            "is_buyer_maker": np.fromiter((r["m"] for r in rows), np.bool_, n),
+            "first_trade_id": np.fromiter((r["f"] for r in rows), np.int64, n),
+            "last_trade_id": np.fromiter((r["l"] for r in rows), np.int64, n),
+        }
+        columns["quote_qty"] = columns["price"] * columns["qty"]
+        return columns
+    return {
+        "trade_id": np.fromiter((r["id"] for r in rows), np.int64, n),
+        "timestamp": np.fromiter((r["time"] for r in rows), np.int64, n),
+        "price": np.fromiter((r["price"] for r in rows), np.float64, n),
+        "qty": np.fromiter((r["qty"] for r in rows), np.float64, n),
+        "quote_qty": np.fromiter((r["quoteQty"] for r in rows), np.float64, n),
+        "is_buyer_maker": np.fromiter((r["isBuyerMaker"] for r in rows), np.bool_, n),
+    }
+
+
+def trades_to_table(columns: List[TradeColumns], symbol: str) -> pa.Table:
+    """
+    Concatenate decoded trade pages into one pyarrow Table.
+
+    :param columns: Decoded pages of one symbol.
+    :param symbol: Added as a dictionary encoded "symbol" column.
+    :return: Table with TRADE_COLUMNS plus "symbol"; "timestamp" is ms UTC.
+    """
+    merged = {name: np.concatenate([page[name] for page in columns]) for name in TRADE_COLUMNS}
+    arrays = {
+        name: pa.array(values, type=pa.timestamp("ms", tz="UTC"))
+        if name == "timestamp"
+        else pa.array(values)
+        for name, values in merged.items()
+    }
+    arrays["symbol"] = pa.DictionaryArray.from_arrays(
+        pa.array(np.zeros(len(merged["trade_id"]), dtype=np.int32)), pa.array([symbol])
+    )
+    return pa.table(arrays)
+
+
+class TradeBackfill:
+    """
+    Pages through historical trades and streams them into a partitioned dataset.
+
+    The time range is cut into slices of at most one hour. Each slice locates
+    its first trade with one time-bounded aggTrades call and then pages forward
+    by fromId, so slices of all symbols are fetched concurrently while memory
+    stays bounded by `flush_rows` per worker.
+    """
+
+    def __init__(
+        self,
+        writer: Optional[PartitionedDatasetWriter] = None,
+        kind: str = "aggTrades",
+        max_workers: int = 4,
+        flush_rows: int = 200_000,
+        slice_ms: int = MAX_AGG_TRADES_WINDOW_MS,
+        client: Optional[BinanceRestClient] = None,
+    ):
+        """
+        :param writer: Destination dataset; defaults to "data/trades/<kind>".
+        :param kind: "aggTrades" (no key needed) or "historicalTrades" (every
+            individual trade, needs an API key).
+        :param max_workers: Number of slices fetched concurrently.
+        :param flush_rows: Buffered rows per slice before they are written out.
+        :param slice_ms: Length of one time slice, at most one hour.
+        :param client: REST client whose pool and weight budget are used; the
+            process-wide client by default. historicalTrades needs one created
+            with an api_key.
+        """
+        if kind not in ("aggTrades", "historicalTrades"):
+            raise ValueError(f"Unsupported trades endpoint: {kind}")
+        self.client = client or get_client()
+        if kind == "historicalTrades" and "X-MBX-APIKEY" not in self.client.session.headers:
+            raise ValueError("historicalTrades requires a client with an API key")
+        if not 0 < slice_ms <= MAX_AGG_TRADES_WINDOW_MS:
+            raise ValueError(f"slice_ms must be between 1 and {MAX_AGG_TRADES_WINDOW_MS}")
+
+        self.writer = writer or PartitionedDatasetWriter(f"data/trades/{kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.flush_rows = flush_rows
+        self.slice_ms = slice_ms
+
+    def _get(self, kind: str, symbol: str, **params) -> TradeColumns:
+        """Fetch and decode one page of at most 1000 trades."""
+        response = self.client.get(
+            f"/api/v3/{kind}", {"symbol": symbol, "limit": MAX_TRADES_PER_REQUEST, **params}
+        )
+        return decode_trades(decode_trade_page(response.content, kind), kind)
+
+    def pages(self, symbol: str, start_time: int, end_time: int) -> Iterator[TradeColumns]:
+        """
+        Yield decoded pages of every trade in [start_time, end_time].
+
+        :param symbol: Trading pair (e.g., "BTCUSDT").
+        :param start_time: Start of the slice in ms, inclusive.
+        :param end_time: End of the slice in ms, inclusive; at most one hour later.
+        """
+        page = self._get("aggTrades", symbol, startTime=start_time, endTime=end_time)
+        if not len(page["trade_id"]):
+            return
+        if self.kind == "aggTrades":
+            yield page
+            if len(page["trade_id"]) < MAX_TRADES_PER_REQUEST:
+                return
+            from_id = int(page["trade_id"][-1]) + 1
+        else:
+            from_id = int(page["first_trade_id"][0])
+
+        while True:
+            page = self._get(self.kind, symbol, fromId=from_id)
+            if not len(page["trade_id"]):
+                return
+            within = page["timestamp"] <= end_time
+            if within.all():
+                yield page
+            else:
+                yield {name: values[within] for name, values in page.items()}
+                return
+            if len(page["trade_id"]) < MAX_TRADES_PER_REQUEST:
+                return
+            from_id = int(page["trade_id"][-1]) + 1
+
+    def _backfill_slice(
+        self, symbol: str, start_time: int, end_time: int
+    ) -> FileWriteDataReturnValue:
+        """Stream one slice into the writer, flushing every `flush_rows` rows."""
+        paths = []
+        rows_written = 0
+        buffered = []
+        buffered_rows = 0
+        for page in self.pages(symbol, start_time, end_time):
+            buffered.append(page)
+            buffered_rows += len(page["trade_id"])
+            if buffered_rows >= self.flush_rows:
+                result = self.writer.write(trades_to_table(buffered, symbol))
+                paths.extend(result.paths)
+                rows_written += result.rows_written
+                buffered = []
+                buffered_rows = 0
+        if buffered_rows:
+            result = self.writer.write(trades_to_table(buffered, symbol))
+            paths.extend(result.paths)
+            rows_written += result.rows_written
+        return FileWriteDataReturnValue(paths=paths, rows_written=rows_written)
+
+    def backfill(
+        self, symbols: List[str], start_time: int, end_time: int
+    ) -> FileWriteDataReturnValue:
+        """
+        Fetch every trade in [start_time, end_time] for each symbol into the dataset.
+
+        A failed slice is logged and skipped; the others are still written.
+
+        :param symbols: List of trading pairs (e.g., ["BTCUSDT", "ETHUSDT"]).
+        :param start_time: Start of the range in ms.
+        :param end_time: End of the range in ms.
+        :return: FileWriteDataReturnValue of every file written.
+        """
+        slices = [
+            (symbol, start, min(start + self.slice_ms - 1, end_time))
+            for symbol in symbols
+            for start in range(start_time, end_time + 1, self.slice_ms)
+        ]
+        paths = []
+        rows_written = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._backfill_slice, *job): job for job in slices}
+            for future in as_completed(futures):
+                symbol, start, end = futures[future]
+                try:
+                    result = future.result()
+                except requests.exceptions.RequestException as e:
+                    logger.error(
+                        f"Error fetching {self.kind} for {symbol} [{start}, {end}]: {e}"
+                    )
+                    continue
+                paths.extend(result.paths)
+                rows_written += result.rows_written
+
+        logger.info(f"Backfilled {rows_written} {self.kind} rows for {len(symbols)} symbols")
+        return FileWriteDataReturnValue(paths=paths, rows_written=rows_written)
+
+
+def fetch_trades(
+    symbols: List[str],
+    start_time: int,
+    end_time: int,
+    root: str = "data/trades/aggTrades",
+    **kwargs,
+) -> FileWriteDataReturnValue:
+    """Backfill aggregated trades of `symbols` into the dataset under `root`."""
+    return TradeBackfill(PartitionedDatasetWriter(root), **kwargs).backfill(
+        symbols, start_time, end_time
+    )
@@ -1,12 +1,28 @@
 import os
+import uuid
 from typing import List
 import pandas as pd
-from observability import get_logger
-from src.etl.shared.file_writer import FileWriteDataReturnValue
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .observability import get_logger
+from .file_writer import FileWriteDataReturnValue
 
 logger = get_logger(__name__)
 
 
+def _dataset_directory(destination_path: str, mode: str):
+    """Turn a single file at `destination_path` (the old layout) into a dataset directory."""
+    if not os.path.isfile(destination_path):
+        return
+    if mode == "overwrite":
+        os.remove(destination_path)
+        return
+    legacy_path = f"{destination_path}.{uuid.uuid4().hex[:12]}.tmp"
+    os.replace(destination_path, legacy_path)
+    os.makedirs(destination_path)
+    os.replace(legacy_path, os.path.join(destination_path, "part-legacy-0.parquet"))
+
+
 def write_parquet(
     df: pd.DataFrame,
     destination_path: str,
@@ -14,30 +30,37 @@ def write_parquet(
     mode: str = "overwrite",
 ) -> FileWriteDataReturnValue:
     """
-    Writes a DataFrame to a Parquet file and returns metadata.
+    Writes a DataFrame to a Parquet dataset and returns metadata.
+
+    `destination_path` is always a dataset directory, readable as a whole with
+    pd.read_parquet. Parquet files cannot be extended in place, so "append"
+    adds a new file, next to the existing files of each partition with
+    partition_cols. "overwrite" replaces the dataset, or only the partitions
+    being written.
 
     :param df: Pandas DataFrame to write.
-    :param destination_path: Path where the Parquet file should be saved.
+    :param destination_path: Directory of the Parquet dataset.
     :param partition_cols: Optional list of columns to partition data.
     :param mode: "overwrite" (default) or "append".
-    :return: FileWriteDataReturnValue object.
+    :return: FileWriteDataReturnValue object listing the files written.
     """
+    if mode not in ("overwrite", "append"):
+        raise ValueError(f"Unknown write mode {mode!r}")
 
-    os.makedirs(
-        os.path.dirname(destination_path), exist_ok=True
-    )  # Ensure directory exists
-
-    if partition_cols:
-        df.to_parquet(
-            destination_path,
-            partition_cols=partition_cols,
-            engine="pyarrow",
-            index=False,
-        )
-    else:
-        df.to_parquet(destination_path, engine="pyarrow", index=False)
-
-    return FileWriteDataReturnValue(paths=[destination_path], rows_written=len(df))
+    _dataset_directory(destination_path, mode)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    paths = []
+    pq.write_to_dataset(
+        table,
+        destination_path,
+        partition_cols=partition_cols,
+        basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+        existing_data_behavior=(
+            "overwrite_or_ignore" if mode == "append" else "delete_matching"
+        ),
+        file_visitor=lambda written: paths.append(written.path),
+    )
+    return FileWriteDataReturnValue(paths=paths, rows_written=len(df))
 
 
 # def write_json_to_df():
@@ -0,0 +1,152 @@
+"""
+Benchmark harness for the pipeline stages.
+
+Every benchmark is parametrized over the synthetic dataset scales given by
+the environment and records wall time, throughput and peak memory per
+stage. Memory is measured with tracemalloc, which sees Python and NumPy
+allocations but not Arrow's own memory pool. The defaults are tiny so the
+suite doubles as a smoke test in the regular test run; scale it up with e.g.
+
+    BENCH_ROWS=1000,1000000,10000000 BENCH_SYMBOLS=1,1000 BENCH_REPEAT=3 \
+        BENCH_RESULTS=bench_results.json python -m pytest src/tests/bench --no-cov
+
+BENCH_ROWS    comma separated row counts (default 1000)
+BENCH_SYMBOLS comma separated symbol counts (default 1)
+BENCH_REPEAT  timed runs per stage, the best one is reported (default 1)
+BENCH_RESULTS optional path of a JSON file the results are written to
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, List, Optional, Tuple
+
+import pytest
+
+
+def _env_ints(name: str, default: str) -> List[int]:
+    return [int(value) for value in os.environ.get(name, default).split(",") if value]
+
+
+BENCH_ROWS = _env_ints("BENCH_ROWS", "1000")
+BENCH_SYMBOLS = _env_ints("BENCH_SYMBOLS", "1")
+BENCH_REPEAT = int(os.environ.get("BENCH_REPEAT", "1"))
+BENCH_RESULTS = os.environ.get("BENCH_RESULTS")
+
+
+@dataclass
+class Scale:
+    """Size of one synthetic dataset."""
+
+    rows: int
+    symbols: int
+
+
+@dataclass
+class StageResult:
+    """Measurements of one stage at one scale."""
+
+    stage: str
+    rows: int
+    symbols: int
+    seconds: float
+    rows_per_second: float
+    peak_bytes: int
+
+
+RESULTS: List[StageResult] = []
+
+
+class Bench:
+    """Times a stage and records its throughput and peak memory."""
+
+    def __init__(self, scale: Scale, repeat: int = BENCH_REPEAT):
+        self.scale = scale
+        self.repeat = repeat
+
+    def run(
+        self,
+        stage: str,
+        func: Callable,
+        setup: Optional[Callable[[], Tuple]] = None,
+        rows: Optional[int] = None,
+    ):
+        """
+        Benchmark `func`.
+
+        The best of `repeat` timed runs is reported. Peak memory is measured in
+        one extra run under tracemalloc, so tracing does not skew the timings.
+
+        :param stage: Stage name the result is recorded under.
+        :param func: Callable running the stage once.
+        :param setup: Optional callable returning the arguments of one run; it
+            is not timed and its allocations are not counted.
+        :param rows: Rows processed per run, the scale's row count by default.
+        :return: Return value of the last run.
+        """
+        rows = self.scale.rows if rows is None else rows
+        best = float("inf")
+        for _ in range(self.repeat):
+            args = setup() if setup else ()
+            started = time.perf_counter()
+            result = func(*args)
+            best = min(best, time.perf_counter() - started)
+
+        args = setup() if setup else ()
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            result = func(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        RESULTS.append(
+            StageResult(
+                stage=stage,
+                rows=rows,
+                symbols=self.scale.symbols,
+                seconds=best,
+                rows_per_second=rows / best if best > 0 else float("inf"),
+                peak_bytes=peak,
+            )
+        )
+        return result
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = [
+            Scale(rows, symbols)
+            for rows in BENCH_ROWS
+            for symbols in BENCH_SYMBOLS
+            if symbols <= rows
+        ]
+        metafunc.parametrize(
+            "scale", scales, ids=[f"{s.rows}rows-{s.symbols}symbols" for s in scales]
+        )
+
+
+@pytest.fixture
+def bench(scale: Scale) -> Bench:
+    return Bench(scale)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not RESULTS:
+        return
+    terminalreporter.section("pipeline benchmarks")
+    terminalreporter.write_line(
+        f"{'stage':<22}{'rows':>12}{'symbols':>9}{'seconds':>12}{'rows/s':>14}{'peak MiB':>11}"
+    )
+    for r in RESULTS:
+        terminalreporter.write_line(
+            f"{r.stage:<22}{r.rows:>12}{r.symbols:>9}{r.seconds:>12.4f}"
+            f"{r.rows_per_second:>14,.0f}{r.peak_bytes / 2**20:>11.1f}"
+        )
+    if BENCH_RESULTS:
+        with open(BENCH_RESULTS, "w") as f:
+            json.dump([asdict(r) for r in RESULTS], f, indent=2)
+        terminalreporter.write_line(f"Results written to {BENCH_RESULTS}")
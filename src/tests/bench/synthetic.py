@@ -0,0 +1,233 @@
+"""Synthetic Binance payloads and local fake servers for the benchmarks."""
+
+import functools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import websockets
+
+from src.etl.shared.backfill import interval_to_ms
+from src.etl.shared.ohlcv import OHLCVBatch
+
+START_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+
+
+def symbol_names(count: int) -> List[str]:
+    """`count` distinct symbol names, e.g. ["S0000USDT", "S0001USDT"]."""
+    return [f"S{i:04d}USDT" for i in range(count)]
+
+
+def kline_columns(
+    rows: int, symbols: int = 1, interval: str = "1m", seed: int = 0
+) -> Dict[str, np.ndarray]:
+    """
+    Random-walk candles of `symbols` symbols, interleaved in time order.
+
+    :param rows: Total number of candles.
+    :param symbols: Number of symbols the candles are spread over.
+    :param interval: Candle interval.
+    :param seed: Random seed.
+    :return: Kline columns plus a "symbol_code" column.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.arange(rows) % symbols
+    step = interval_to_ms(interval)
+    timestamps = START_MS + (np.arange(rows) // symbols) * step
+    base = rng.uniform(1, 50_000, symbols)
+    close = base[codes] * np.exp(np.cumsum(rng.normal(0, 1e-3, rows)))
+    open_ = close * (1 + rng.normal(0, 1e-3, rows))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 1e-3, rows)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 1e-3, rows)))
+    volume = rng.gamma(2.0, 50.0, rows)
+    taker_buy_base = volume * rng.uniform(0, 1, rows)
+    return {
+        "symbol_code": codes.astype(np.int32),
+        "timestamp": timestamps.astype(np.int64),
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+        "close_time": (timestamps + step - 1).astype(np.int64),
+        "quote_asset_volume": volume * close,
+        "trades": rng.integers(1, 5_000, rows),
+        "taker_buy_base": taker_buy_base,
+        "taker_buy_quote": taker_buy_base * close,
+    }
+
+
+def ohlcv_batch(rows: int, symbols: int = 1, missing: float = 0.001, seed: int = 0) -> OHLCVBatch:
+    """
+    OHLCVBatch of synthetic candles with a fraction of missing closes for the cleaner.
+
+    :param rows: Total number of candles.
+    :param symbols: Number of symbols.
+    :param missing: Fraction of closes set to NaN.
+    :param seed: Random seed.
+    """
+    columns = kline_columns(rows, symbols, seed=seed)
+    codes = columns.pop("symbol_code")
+    del columns["close_time"], columns["quote_asset_volume"]
+    rng = np.random.default_rng(seed + 1)
+    columns["close"][rng.uniform(size=rows) < missing] = np.nan
+    return OHLCVBatch(columns, codes, symbol_names(symbols))
+
+
+def klines_payload(rows: int, seed: int = 0) -> bytes:
+    """A /api/v3/klines response body of `rows` candles of one symbol."""
+    c = kline_columns(rows, 1, seed=seed)
+    return json.dumps(
+        [
+            [
+                int(c["timestamp"][i]),
+                f"{c['open'][i]:.8f}",
+                f"{c['high'][i]:.8f}",
+                f"{c['low'][i]:.8f}",
+                f"{c['close'][i]:.8f}",
+                f"{c['volume'][i]:.8f}",
+                int(c["close_time"][i]),
+                f"{c['quote_asset_volume'][i]:.8f}",
+                int(c["trades"][i]),
+                f"{c['taker_buy_base'][i]:.8f}",
+                f"{c['taker_buy_quote'][i]:.8f}",
+                "0",
+            ]
+            for i in range(rows)
+        ],
+        separators=(",", ":"),
+    ).encode()
+
+
+def agg_trades_payload(rows: int, seed: int = 0) -> bytes:
+    """A /api/v3/aggTrades response body of `rows` trades of one symbol."""
+    rng = np.random.default_rng(seed)
+    timestamps = START_MS + np.cumsum(rng.integers(0, 50, rows))
+    prices = 40_000 * np.exp(np.cumsum(rng.normal(0, 1e-5, rows)))
+    qtys = rng.gamma(1.0, 0.05, rows)
+    makers = rng.uniform(size=rows) < 0.5
+    return json.dumps(
+        [
+            {
+                "a": i,
+                "p": f"{prices[i]:.8f}",
+                "q": f"{qtys[i]:.8f}",
+                "f": 3 * i,
+                "l": 3 * i + 2,
+                "T": int(timestamps[i]),
+                "m": bool(makers[i]),
+                "M": True,
+            }
+            for i in range(rows)
+        ],
+        separators=(",", ":"),
+    ).encode()
+
+
+def kline_events(
+    rows: int, symbols: int = 1, interval: str = "1m", seed: int = 0
+) -> List[Tuple[str, str]]:
+    """Combined-stream messages of `rows` closed candles, as (stream, message) pairs."""
+    c = kline_columns(rows, symbols, interval, seed)
+    names = symbol_names(symbols)
+    messages = []
+    for i in range(rows):
+        symbol = names[c["symbol_code"][i]]
+        kline = {
+            "t": int(c["timestamp"][i]),
+            "T": int(c["close_time"][i]),
+            "s": symbol,
+            "i": interval,
+            "o": f"{c['open'][i]:.8f}",
+            "c": f"{c['close'][i]:.8f}",
+            "h": f"{c['high'][i]:.8f}",
+            "l": f"{c['low'][i]:.8f}",
+            "v": f"{c['volume'][i]:.8f}",
+            "n": int(c["trades"][i]),
+            "x": True,
+            "q": f"{c['quote_asset_volume'][i]:.8f}",
+            "V": f"{c['taker_buy_base'][i]:.8f}",
+            "Q": f"{c['taker_buy_quote'][i]:.8f}",
+        }
+        data = {"e": "kline", "E": kline["T"] + 1, "s": symbol, "k": kline}
+        stream = f"{symbol.lower()}@kline_{interval}"
+        messages.append(
+            (stream, json.dumps({"stream": stream, "data": data}, separators=(",", ":")))
+        )
+    return messages
+
+
+class FakeRestServer:
+    """
+    Local HTTP server answering /api/v3/klines with synthetic candles.
+
+    The number of candles returned follows startTime, endTime and limit like
+    the real endpoint; bodies are generated once per size and then reused.
+    """
+
+    def __init__(self):
+        handler = self._handler()
+        self.requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.requests += 1
+                query = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+                step = interval_to_ms(query.get("interval", "1m"))
+                rows = (int(query["endTime"]) - int(query["startTime"])) // step + 1
+                body = _cached_klines_payload(min(rows, int(query.get("limit", 500))))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep the benchmark output clean
+
+        return Handler
+
+    def __enter__(self) -> "FakeRestServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_klines_payload(rows: int) -> bytes:
+    return klines_payload(rows)
+
+
+async def serve_messages(messages: List[Tuple[str, str]]):
+    """
+    Start a local combined-stream server.
+
+    Every connection is sent, in order, the messages of the streams listed in
+    its ?streams= query, like the real endpoint.
+
+    :param messages: (stream, message) pairs, e.g. from kline_events.
+    :return: The running server; its URL is ws://127.0.0.1:<port>/stream.
+    """
+
+    async def handler(connection):
+        query = parse_qs(urlsplit(connection.request.path).query)
+        streams = set(query.get("streams", [""])[0].split("/"))
+        for stream, message in messages:
+            if stream in streams:
+                await connection.send(message)
+        await connection.wait_closed()
+
+    return await websockets.serve(handler, "127.0.0.1", 0)
@@ -0,0 +1,68 @@
+"""Benchmarks of the in-memory pipeline stages and the Parquet writers."""
+
+from src.etl.shared.json_codec import decode_stream_message, decode_trade_page
+from src.etl.shared.klines import decode_klines
+from src.etl.shared.processor import DataSaver, DataTransformation
+from src.etl.shared.trades import decode_trades
+from src.etl.shared.utils import write_parquet
+
+from .synthetic import agg_trades_payload, kline_events, klines_payload, ohlcv_batch
+
+
+def test_decode_klines(bench, scale):
+    payload = klines_payload(scale.rows)
+    columns = bench.run("decode_klines", decode_klines, lambda: (payload,))
+    assert len(columns["timestamp"]) == scale.rows
+
+
+def test_decode_trades(bench, scale):
+    payload = agg_trades_payload(scale.rows)
+    columns = bench.run(
+        "decode_trades", lambda body: decode_trades(decode_trade_page(body)), lambda: (payload,)
+    )
+    assert len(columns["timestamp"]) == scale.rows
+
+
+def test_decode_stream_messages(bench, scale):
+    messages = [message for _, message in kline_events(scale.rows, scale.symbols)]
+    envelopes = bench.run(
+        "decode_stream_messages",
+        lambda: [decode_stream_message(message) for message in messages],
+    )
+    assert envelopes[-1].get("data").get("k").get("x")
+
+
+def test_clean_data(bench, scale):
+    batch = ohlcv_batch(scale.rows, scale.symbols)
+    cleaned = bench.run("clean_data", DataTransformation.clean_data, lambda: (batch,))
+    assert 0 < len(cleaned) <= scale.rows
+
+
+def test_add_ema(bench, scale):
+    batch = ohlcv_batch(scale.rows, scale.symbols, missing=0)
+    result = bench.run("add_ema", DataTransformation.add_ema, lambda: (batch,))
+    assert len(result.columns["EMA_20"]) == scale.rows
+
+
+def test_anonymize_data(bench, scale):
+    batch = ohlcv_batch(scale.rows, scale.symbols, missing=0)
+    result = bench.run("anonymize_data", DataTransformation.anonymize_data, lambda: (batch,))
+    assert len(result) == scale.rows
+
+
+def test_write_parquet(bench, scale, tmp_path):
+    df = ohlcv_batch(scale.rows, scale.symbols, missing=0).to_pandas()
+    result = bench.run(
+        "write_parquet",
+        lambda: write_parquet(df, str(tmp_path / "flat"), partition_cols=["symbol"], mode="append"),
+    )
+    assert result.rows_written == scale.rows
+
+
+def test_save_to_dataset(bench, scale, tmp_path):
+    batch = ohlcv_batch(scale.rows, scale.symbols, missing=0)
+    result = bench.run(
+        "save_to_dataset",
+        lambda: DataSaver.save_to_dataset(batch, str(tmp_path / "dataset"), "1m"),
+    )
+    assert result.rows_written == scale.rows
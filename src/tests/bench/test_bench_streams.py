@@ -0,0 +1,72 @@
+"""Benchmarks of the network ingestion paths against local fake servers."""
+
+import asyncio
+
+from src.etl.shared.backfill import KlineBackfill
+from src.etl.shared.file_writer import BinanceWebSocketClient, MicroBatchSink, RollingParquetWriter
+from src.etl.shared.rest_client import BinanceRestClient
+
+from .synthetic import START_MS, FakeRestServer, kline_events, serve_messages, symbol_names
+
+
+async def _stream(client: BinanceWebSocketClient, messages, rows: int):
+    """Run `client` against a fake server until `rows` candles went through on_message."""
+    server = await serve_messages(messages)
+    port = server.sockets[0].getsockname()[1]
+    client.streams.base_url = f"ws://127.0.0.1:{port}/stream"
+
+    received = 0
+    done = asyncio.Event()
+
+    async def on_message(stream, data):
+        nonlocal received
+        await client.on_message(stream, data)
+        received += 1
+        if received == rows:
+            done.set()
+
+    client.streams.handler = on_message
+    client.sink.start()
+    task = asyncio.create_task(client.streams.run())
+    try:
+        await done.wait()
+    finally:
+        task.cancel()
+        server.close()
+        await server.wait_closed()
+    return client.sink.close()
+
+
+def test_websocket_on_message(bench, scale, tmp_path):
+    messages = kline_events(scale.rows, scale.symbols)
+    symbols = symbol_names(scale.symbols)
+
+    def setup():
+        writer = RollingParquetWriter(str(tmp_path / "stream"))
+        return (BinanceWebSocketClient(symbols, "1m", sink=MicroBatchSink(writer)),)
+
+    result = bench.run(
+        "websocket_on_message",
+        lambda client: asyncio.run(_stream(client, messages, scale.rows)),
+        setup,
+    )
+    assert result.rows_written == scale.rows
+
+
+def test_rest_backfill(bench, scale):
+    per_symbol = scale.rows // scale.symbols
+    symbols = symbol_names(scale.symbols)
+    end = START_MS + (per_symbol - 1) * 60_000
+
+    with FakeRestServer() as server:
+        client = BinanceRestClient(server.url, max_weight_per_minute=10**9)
+        backfill = KlineBackfill("1m", client=client)
+        result = bench.run(
+            "rest_backfill",
+            backfill.fetch,
+            lambda: (symbols, START_MS, end),
+            rows=per_symbol * scale.symbols,
+        )
+    assert sum(len(columns["timestamp"]) for columns in result.values()) == (
+        per_symbol * scale.symbols
+    )
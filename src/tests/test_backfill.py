@@ -0,0 +1,54 @@
+import pytest
+import requests
+
+from src.etl.shared.backfill import KlineBackfill, interval_to_ms, split_windows
+
+from .bench.synthetic import START_MS, klines_payload
+
+
+def test_interval_to_ms():
+    assert interval_to_ms("1m") == 60_000
+    assert interval_to_ms("1d") == 86_400_000
+    with pytest.raises(ValueError):
+        interval_to_ms("7m")
+
+
+def test_split_windows_sits_on_a_fixed_grid():
+    step = 60_000 * 1000
+    start = START_MS + 30 * 60_000
+    end = START_MS + 2500 * 60_000
+    windows = split_windows(start, end, "1m")
+    assert windows[0][0] == start and windows[-1][1] == end
+    for (_, window_end), (next_start, _) in zip(windows, windows[1:]):
+        assert next_start == window_end + 1
+        assert next_start % step == 0
+    assert all(window_end - window_start < step for window_start, window_end in windows)
+    assert split_windows(start, end, "1m") == windows
+    assert split_windows(end, start, "1m") == []
+
+
+class StubClient:
+    """Answers every window with two candles; fails the windows of `failing` symbols."""
+
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.requests = []
+
+    def get(self, path, params):
+        self.requests.append(params)
+        if params["symbol"] in self.failing:
+            raise requests.exceptions.ConnectionError("reset")
+        return type("Response", (), {"content": klines_payload(2)})()
+
+
+def test_backfill_fetches_every_window_and_drops_failed_symbols():
+    client = StubClient(failing=("ETHUSDT",))
+    end = START_MS + 1500 * 60_000
+    result = KlineBackfill("1m", max_workers=2, client=client).fetch(
+        ["BTCUSDT", "ETHUSDT"], START_MS, end
+    )
+    windows = split_windows(START_MS, end, "1m")
+    assert list(result) == ["BTCUSDT"]
+    assert len(result["BTCUSDT"]["timestamp"]) == 2 * len(windows)
+    btc = [(p["startTime"], p["endTime"]) for p in client.requests if p["symbol"] == "BTCUSDT"]
+    assert sorted(btc) == windows
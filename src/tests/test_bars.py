@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl.shared.bars import BarBuilder, bar_interval_ms, build_bars
+from src.etl.shared.ohlcv import OHLCVBatch
+
+from .bench.synthetic import START_MS
+
+
+def trades(timestamps, price, qty, is_buyer_maker=None):
+    columns = {
+        "timestamp": np.asarray(timestamps, dtype=np.int64),
+        "price": np.asarray(price, dtype=np.float64),
+        "qty": np.asarray(qty, dtype=np.float64),
+    }
+    if is_buyer_maker is not None:
+        columns["is_buyer_maker"] = np.asarray(is_buyer_maker, dtype=bool)
+    return columns
+
+
+def test_bar_interval_ms():
+    assert bar_interval_ms("250ms") == 250
+    assert bar_interval_ms("90m") == 90 * 60_000
+    assert bar_interval_ms(1500) == 1500
+    for interval in ("0s", "5y", "m"):
+        with pytest.raises(ValueError):
+            bar_interval_ms(interval)
+
+
+def test_time_bars_open_on_the_interval_grid():
+    offsets = [0, 30_000, 59_999, 60_000, 125_000]
+    batch = trades([START_MS + o for o in offsets], [1, 3, 2, 4, 5], [1, 1, 1, 1, 1])
+    builder = BarBuilder("time", "1m")
+    bars = OHLCVBatch.concat([builder.update(batch), builder.flush()])
+
+    assert bars.timestamp.tolist() == [START_MS, START_MS + 60_000, START_MS + 120_000]
+    assert bars.trades.tolist() == [3, 1, 1]
+    assert bars.open.tolist() == [1, 4, 5]
+    assert bars.high.tolist() == [3, 4, 5]
+    assert bars.low.tolist() == [1, 4, 5]
+    assert bars.close.tolist() == [2, 4, 5]
+
+
+def test_volume_bar_keeps_the_crossing_trade():
+    # Running volume before each trade: 0, .5, .75, 1.25, 1.75, 2
+    batch = trades(START_MS + np.arange(6), np.arange(1.0, 7.0), [0.5, 0.25, 0.5, 0.5, 0.25, 1.0])
+    builder = BarBuilder("volume", 1.0)
+    completed = builder.update(batch)
+    assert completed.trades.tolist() == [3, 2]
+    assert completed.volume.tolist() == [1.25, 0.75]
+    last = builder.flush()
+    assert last.trades.tolist() == [1] and last.open.tolist() == [6.0]
+    assert len(builder.flush()) == 0
+
+
+def test_dollar_and_tick_bars():
+    batch = trades(START_MS + np.arange(5), [10.0] * 5, [5, 5, 1, 9, 1])
+    dollar = BarBuilder("dollar", 100.0)
+    bars = OHLCVBatch.concat([dollar.update(batch), dollar.flush()])
+    assert bars.trades.tolist() == [2, 2, 1]
+
+    tick = BarBuilder("tick", 2)
+    bars = OHLCVBatch.concat([tick.update(batch), tick.flush()])
+    assert bars.trades.tolist() == [2, 2, 1]
+    assert bars.volume.tolist() == [10, 10, 1]
+
+
+@pytest.mark.parametrize("kind, size", [("time", "2ms"), ("volume", 1.0), ("tick", 3)])
+def test_partial_bar_carries_over_between_batches(kind, size):
+    qty = [0.5, 0.25, 0.5, 0.5, 0.25, 1.0, 0.75]
+    everything = trades(START_MS + np.arange(7), np.arange(1.0, 8.0), qty, [0, 1] * 3 + [0])
+    whole = BarBuilder(kind, size)
+    expected = OHLCVBatch.concat([whole.update(everything), whole.flush()])
+
+    builder = BarBuilder(kind, size)
+    parts = []
+    for begin, end in ((0, 4), (4, 5), (5, 7)):
+        parts.append(builder.update({name: v[begin:end] for name, v in everything.items()}))
+    parts.append(builder.flush())
+    result = OHLCVBatch.concat(parts)
+
+    assert sum(result.trades) == 7
+    for name in ("timestamp", "open", "high", "low", "close", "volume", "trades"):
+        np.testing.assert_array_equal(result.columns[name], expected.columns[name], name)
+    np.testing.assert_allclose(result.taker_buy_base, expected.taker_buy_base)
+
+
+def test_build_bars_per_symbol():
+    df = pd.DataFrame(
+        {
+            "symbol": ["ETHUSDT", "BTCUSDT", "ETHUSDT", "BTCUSDT"],
+            "timestamp": pd.to_datetime(
+                [START_MS + 1, START_MS, START_MS, START_MS + 2], unit="ms"
+            ),
+            "price": [2.0, 10.0, 1.0, 11.0],
+            "qty": [1.0, 1.0, 1.0, 1.0],
+        }
+    )
+    bars = build_bars(df, "tick", 10)
+    assert list(bars.symbols) == ["ETHUSDT", "BTCUSDT"]
+    assert bars.open.tolist() == [1.0, 10.0]
+    assert bars.close.tolist() == [2.0, 11.0]
@@ -0,0 +1,71 @@
+import asyncio
+
+import numpy as np
+
+from src.etl.shared.candles import CandleStateTable
+from src.etl.shared.klines import FLOAT_COLUMNS
+from src.etl.shared.stream_manager import KlineGapFiller
+
+MINUTE_MS = 60_000
+HOUR_MS = 60 * MINUTE_MS
+
+
+def kline(open_time: int, interval: str = "1m", closed: bool = True, symbol: str = "BTCUSDT"):
+    return {"s": symbol, "i": interval, "t": open_time, "c": "1.0", "x": closed}
+
+
+def test_emits_each_candle_once_when_closed():
+    candles = CandleStateTable()
+    assert candles.update(kline(0, closed=False)) is None
+    assert candles.update(kline(0))["t"] == 0
+    assert candles.update(kline(0)) is None  # Replayed close
+    assert candles.update(kline(MINUTE_MS))["t"] == MINUTE_MS
+    assert candles.open_candles[("BTCUSDT", "1m")] == {}
+
+
+def test_intervals_of_one_symbol_are_independent():
+    candles = CandleStateTable()
+    assert candles.update(kline(HOUR_MS - MINUTE_MS, "1m")) is not None
+    assert candles.update(kline(0, "1h")) is not None  # Opened before the 1m close
+    assert candles.update(kline(HOUR_MS, "1m")) is not None
+    assert candles.last_closed == {("BTCUSDT", "1m"): HOUR_MS, ("BTCUSDT", "1h"): 0}
+
+
+def test_partials_are_throttled():
+    candles = CandleStateTable(emit_partials=True, partial_interval=60.0)
+    assert candles.update(kline(0, closed=False)) is not None
+    assert candles.update(kline(0, closed=False)) is None
+    assert candles.update(kline(0, "1h", closed=False)) is not None
+
+
+class FakeBackfill:
+    def __init__(self, interval: str, step: int):
+        self.interval = interval
+        self.step = step
+        self.starts = []
+
+    def fetch(self, symbols, start_time, end_time):
+        self.starts.append(start_time)
+        times = np.array([start_time])
+        columns = {name: np.ones(1) for name in FLOAT_COLUMNS}
+        columns.update(
+            timestamp=times, close_time=times + self.step - 1, trades=np.ones(1, dtype=np.int64)
+        )
+        return {symbols[0]: columns}
+
+
+def test_gap_filler_starts_after_each_interval_last_close():
+    candles = CandleStateTable()
+    candles.update(kline(10 * MINUTE_MS, "1m"))
+    candles.update(kline(0, "1h"))
+    filler = KlineGapFiller(candles)
+    filler._backfills = {"1m": FakeBackfill("1m", MINUTE_MS), "1h": FakeBackfill("1h", HOUR_MS)}
+    delivered = []
+
+    async def deliver(stream, data):
+        delivered.append((stream, data["k"]["t"]))
+
+    asyncio.run(filler.fill(["btcusdt@kline_1m", "btcusdt@kline_1h"], deliver))
+    assert filler._backfills["1m"].starts == [11 * MINUTE_MS]
+    assert filler._backfills["1h"].starts == [HOUR_MS]
+    assert delivered == [("btcusdt@kline_1m", 11 * MINUTE_MS), ("btcusdt@kline_1h", HOUR_MS)]
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from src.etl.shared.cleaning import CLEANING_RULES, clean_ohlcv
+
+START_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+MINUTE_MS = 60_000
+
+
+def candles(symbol: str, minutes: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "symbol": symbol,
+            "timestamp": pd.to_datetime(START_MS + np.arange(minutes) * MINUTE_MS, unit="ms"),
+            "open": 10.0,
+            "high": 12.0,
+            "low": 9.0,
+            "close": 11.0 + np.arange(minutes) / 100,
+            "volume": 5.0,
+        }
+    )
+
+
+def dirty_frame() -> pd.DataFrame:
+    btc = candles("BTCUSDT", 6)
+    eth = candles("ETHUSDT", 4)
+    btc.loc[2, "close"] = np.nan  # Forward-filled, kept
+    btc.loc[4, "volume"] = 0.0  # non_positive
+    btc.loc[5, "low"] = -1.0  # non_positive
+    eth.loc[0, "open"] = np.nan  # Nothing to fill from: missing
+    eth.loc[3, "high"] = 8.0  # ohlc_inconsistent
+    duplicate = btc.iloc[[1]].assign(close=11.5)  # Replaces row 1, the last one is kept
+    return pd.concat([btc, eth, duplicate], ignore_index=True)
+
+
+def test_report_counts_every_rule():
+    cleaned, report = clean_ohlcv(dirty_frame())
+    assert report.rows_in == 11
+    assert report.dropped == {
+        "missing": 1,
+        "duplicate": 1,
+        "non_positive": 2,
+        "ohlc_inconsistent": 1,
+    }
+    assert list(report.dropped) == CLEANING_RULES
+    assert report.rows_out == len(cleaned) == 6
+    assert str(report).startswith("kept 6/11 rows")
+
+
+def test_cleaned_rows_are_grouped_sorted_and_filled():
+    df = dirty_frame()
+    cleaned, _ = clean_ohlcv(df)
+    # The NaN close is filled from the duplicate that replaced the minute before it
+    assert cleaned["symbol"].tolist() == ["BTCUSDT"] * 4 + ["ETHUSDT"] * 2
+    assert cleaned["close"].tolist() == [11.0, 11.5, 11.5, 11.03, 11.01, 11.02]
+    assert cleaned.index.tolist() == [0, 10, 2, 3, 7, 8]
+    assert np.isnan(df.loc[2, "close"])  # The input is left untouched
+
+
+def test_unparsable_values_and_missing_symbols_are_missing():
+    df = candles("BTCUSDT", 3).astype({"volume": object})
+    df.loc[1, "volume"] = "n/a"  # Coerced to NaN, then forward-filled
+    df.loc[2, "symbol"] = None
+    cleaned, report = clean_ohlcv(df)
+    assert cleaned["volume"].tolist() == [5.0, 5.0]
+    assert report.dropped["missing"] == 1
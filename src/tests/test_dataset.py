@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.etl.shared.dataset import (
+    TIME_TYPE,
+    PartitionedDatasetWriter,
+    compact_partition,
+    partition_files,
+    read_ohlcv,
+)
+from src.etl.shared.ohlcv import OHLCVBatch
+
+START_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+
+
+def candles(rows: int, start: int = START_MS) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "symbol": "BTCUSDT",
+            "timestamp": pd.to_datetime(start + np.arange(rows) * 60_000, unit="ms", utc=True),
+            "open": 1.0,
+            "high": 2.0,
+            "low": 0.5,
+            "close": np.arange(rows, dtype=float),
+            "volume": 10.0,
+            "trades": 3,
+        }
+    )
+
+
+def test_writer_partitions_and_sorts(tmp_path):
+    df = candles(4).iloc[::-1]
+    result = PartitionedDatasetWriter(str(tmp_path), "1m").write(df)
+    assert result.rows_written == 4
+    assert [p.split(str(tmp_path))[1].split("/part")[0] for p in result.paths] == [
+        "/symbol=BTCUSDT/interval=1m/date=2024-01-01"
+    ]
+    table = pq.read_table(result.paths[0])
+    assert table.schema.field("timestamp").type == TIME_TYPE
+    assert table.column("close").to_pylist() == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_compact_partition_merges_mixed_writers(tmp_path):
+    """pandas (ns, own column order) and OHLCVBatch (ms) files of one partition."""
+    root = str(tmp_path)
+    writer = PartitionedDatasetWriter(root, "1m")
+    writer.write(candles(3))
+    writer.write(OHLCVBatch.from_frame(candles(3, start=START_MS + 3 * 60_000)))
+    directory = tmp_path / "symbol=BTCUSDT" / "interval=1m" / "date=2024-01-01"
+    legacy = candles(2, start=START_MS + 6 * 60_000)[["close", "timestamp", "volume"]]
+    pq.write_table(
+        pa.Table.from_pandas(legacy, preserve_index=False), str(directory / "part-legacy.parquet")
+    )
+
+    result = compact_partition(str(directory))
+    assert result.rows_written == 8
+    assert len(partition_files(str(directory))) == 1
+
+    df = read_ohlcv(["BTCUSDT"], root=root, interval="1m")
+    assert df["close"].tolist() == [0.0, 1.0, 2.0, 0.0, 1.0, 2.0, 0.0, 1.0]
+    assert df["timestamp"].is_monotonic_increasing
+    assert df["trades"].isna().sum() == 2
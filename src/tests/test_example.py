@@ -1,2 +0,0 @@
-def test_example_function():
-    assert True  # Replace this with your actual test logic
@@ -0,0 +1,95 @@
+import asyncio
+import queue
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.etl.shared.file_writer import KlineRingBuffer, MicroBatchSink, RollingParquetWriter
+
+START_MS = 1_704_067_200_000
+
+
+def row(i: int, symbol: str = "BTCUSDT") -> tuple:
+    return (symbol, START_MS + i * 60_000, 1.0, 2.0, 0.5, float(i), 10.0, 3, 5.0, 50.0)
+
+
+def test_ring_buffer_drains_in_order_across_wraparound():
+    buffer = KlineRingBuffer(capacity=4)
+    for i in range(3):
+        buffer.append(*row(i))
+    assert buffer.drain().column("close").to_pylist() == [0.0, 1.0, 2.0]
+    for i in range(3, 7):
+        buffer.append(*row(i, "ETHUSDT" if i % 2 else "BTCUSDT"))
+    batch = buffer.drain()
+    assert batch.column("close").to_pylist() == [3.0, 4.0, 5.0, 6.0]
+    assert batch.column("symbol").to_pylist() == ["ETHUSDT", "BTCUSDT", "ETHUSDT", "BTCUSDT"]
+    assert buffer.drain() is None
+
+
+def test_ring_buffer_append_times_out_when_full():
+    buffer = KlineRingBuffer(capacity=2)
+    buffer.append(*row(0))
+    buffer.append(*row(1))
+    with pytest.raises(queue.Full):
+        buffer.append(*row(2), timeout=0)
+    with pytest.raises(queue.Full):
+        buffer.append(*row(2), timeout=0.01)
+    buffer.drain()
+    assert buffer.append(*row(2), timeout=0) == 1
+
+
+def test_put_async_waits_for_the_flusher_without_blocking_the_loop(tmp_path):
+    # The flusher is not started, so the buffer only drains on flush()
+    sink = MicroBatchSink(RollingParquetWriter(str(tmp_path)), max_batch_rows=2, capacity=2)
+
+    async def main():
+        await sink.put_async(*row(0))
+        await sink.put_async(*row(1))
+        waiting = asyncio.create_task(sink.put_async(*row(2)))
+        await asyncio.sleep(0.05)  # Returns only if the loop is not blocked
+        assert not waiting.done()
+        sink.flush()
+        await asyncio.wait_for(waiting, 2)
+
+    asyncio.run(main())
+    assert sink.close().rows_written == 3
+
+
+class FlakyWriter(RollingParquetWriter):
+    """Fails the first `failures` writes, like a transient disk error."""
+
+    def __init__(self, directory: str, failures: int):
+        super().__init__(directory)
+        self.failures = failures
+
+    def write_batch(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().write_batch(batch)
+
+
+def test_micro_batch_sink_keeps_batches_until_written(tmp_path):
+    sink = MicroBatchSink(FlakyWriter(str(tmp_path), failures=1))
+    sink.put(*row(0))
+    with pytest.raises(OSError):
+        sink.flush()
+    sink.put(*row(1))
+    result = sink.close()
+
+    assert result.rows_written == 2
+    closes = [
+        value for path in result.paths for value in pq.read_table(path).column("close").to_pylist()
+    ]
+    assert closes == [0.0, 1.0]
+
+
+def test_rolling_writer_rolls_by_rows(tmp_path):
+    writer = RollingParquetWriter(str(tmp_path), max_rows_per_file=2)
+    buffer = KlineRingBuffer()
+    for i in range(3):
+        buffer.append(*row(i))
+        writer.write_batch(buffer.drain())
+    result = writer.close()
+    assert result.rows_written == 3
+    assert [pq.read_metadata(path).num_rows for path in result.paths] == [2, 1]
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl.shared.indicators import add_indicators, segment_starts, segmented_ewm, segmented_sma
+
+
+@pytest.fixture
+def mixed_scale():
+    """BTC-like prices (~6e4) sorted before SHIB-like prices (~1e-5)."""
+    rng = np.random.default_rng(0)
+    rows = 3000
+    prices = {
+        symbol: level * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+        for symbol, level in (("BTCUSDT", 6e4), ("SHIBUSDT", 1e-5))
+    }
+    return pd.DataFrame(
+        {
+            "symbol": np.repeat(list(prices), rows),
+            "timestamp": np.tile(np.arange(rows) * 60_000, len(prices)),
+            "close": np.concatenate(list(prices.values())),
+        }
+    )
+
+
+def test_segment_starts():
+    keys = np.array(["a", "a", "b", "c", "c"])
+    assert segment_starts(keys).tolist() == [0, 2, 3]
+    assert segment_starts(keys[:0]).tolist() == []
+
+
+def test_segmented_sma_matches_pandas_per_symbol(mixed_scale):
+    starts = segment_starts(mixed_scale["symbol"].to_numpy())
+    result = segmented_sma(mixed_scale["close"].to_numpy(), starts, 20)
+    expected = mixed_scale.groupby("symbol")["close"].transform(lambda s: s.rolling(20).mean())
+    np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+
+def test_segmented_ewm_matches_pandas_per_symbol(mixed_scale):
+    starts = segment_starts(mixed_scale["symbol"].to_numpy())
+    result = segmented_ewm(mixed_scale["close"].to_numpy(), starts, 2.0 / 21)
+    expected = mixed_scale.groupby("symbol")["close"].transform(
+        lambda s: s.ewm(span=20, adjust=False).mean()
+    )
+    np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+
+def test_segmented_ewm_continues_from_seeds():
+    values = np.array([1.0, 2.0, 3.0, 10.0, 20.0])
+    starts = np.array([0, 3])
+    seeds = np.array([np.nan, 5.0])
+    result = segmented_ewm(values, starts, 0.5, seeds)
+    np.testing.assert_allclose(result, [1.0, 1.5, 2.25, 7.5, 13.75])
+
+
+def test_add_indicators_vwap_per_symbol(mixed_scale):
+    df = mixed_scale.assign(
+        high=mixed_scale["close"] * 1.01, low=mixed_scale["close"] * 0.99, volume=1e9
+    )
+    result = add_indicators(df, ema_periods=[], sma_periods=[], atr_period=None)
+    shib = result[result["symbol"] == "SHIBUSDT"]
+    typical = (shib["high"] + shib["low"] + shib["close"]) / 3
+    expected = (typical * shib["volume"]).cumsum() / shib["volume"].cumsum()
+    np.testing.assert_allclose(shib["VWAP"], expected, rtol=1e-9)
+
+
+def test_nan_in_one_symbol_does_not_reach_the_next():
+    close = np.array([1.0, np.nan, 3.0, 4.0, 5.0, 10.0, 11.0, 12.0, 13.0, 14.0])
+    df = pd.DataFrame(
+        {
+            "symbol": ["A"] * 5 + ["B"] * 5,
+            "timestamp": np.tile(np.arange(5) * 60_000, 2),
+            "close": close,
+            "high": close + 1,
+            "low": close - 1,
+            "volume": [1.0, 2.0, np.nan, 4.0, 5.0] + [1.0] * 5,
+        }
+    )
+    result = add_indicators(df, ema_periods=[3], sma_periods=[2], atr_period=3, rsi_period=3)
+    grouped = df.groupby("symbol")
+    typical = (df["high"] + df["low"] + df["close"]) / 3
+    expected = {
+        "EMA_3": grouped["close"].transform(
+            lambda s: s.ewm(span=3, adjust=False, ignore_na=True).mean()
+        ),
+        "SMA_2": grouped["close"].transform(lambda s: s.rolling(2).mean()),
+        "VWAP": (typical * df["volume"]).groupby(df["symbol"]).cumsum()
+        / grouped["volume"].cumsum(),
+    }
+    for column, values in expected.items():
+        np.testing.assert_allclose(result[column], values, rtol=1e-12, err_msg=column)
+    b = result[result["symbol"] == "B"]
+    np.testing.assert_allclose(b["EMA_3"], [10, 10.5, 11.25, 12.125, 13.0625])
+    assert not b[["ATR_3", "RSI_3"]].isna().to_numpy()[1:].any()
+
+
+def test_segmented_ewm_starts_at_the_first_value():
+    values = np.array([np.nan, np.nan, 2.0, 4.0, np.nan])
+    result = segmented_ewm(values, np.array([0]), 0.5)
+    np.testing.assert_allclose(result, [np.nan, np.nan, 2.0, 3.0, 3.0])
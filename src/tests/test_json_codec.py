@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.etl.shared import json_codec
+from src.etl.shared.file_writer import kline_row
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+KLINE = {
+    "t": 1_704_067_200_000,
+    "T": 1_704_067_259_999,
+    "s": "BTCUSDT",
+    "i": "1m",
+    "f": 1,
+    "L": 2,
+    "o": "42000.5",
+    "c": "42010.0",
+    "h": "42020.0",
+    "l": "41990.0",
+    "v": "12.5",
+    "n": 7,
+    "x": True,
+    "q": "525000.0",
+    "V": "6.25",
+    "Q": "262500.0",
+    "B": "0",
+}
+MESSAGE = json.dumps(
+    {
+        "stream": "btcusdt@kline_1m",
+        "data": {"e": "kline", "E": 1_704_067_260_000, "s": "BTCUSDT", "k": KLINE},
+    }
+)
+EXPECTED_ROW = (
+    "BTCUSDT",
+    1_704_067_200_000,
+    42000.5,
+    42020.0,
+    41990.0,
+    42010.0,
+    12.5,
+    7,
+    6.25,
+    262500.0,
+)
+
+
+@pytest.fixture(params=list(json_codec.BACKENDS))
+def backend(request):
+    previous = json_codec.get_backend()
+    json_codec.set_backend(request.param)
+    yield request.param
+    json_codec.set_backend(previous)
+
+
+def test_decode_stream_message(backend):
+    envelope = json_codec.decode_stream_message(MESSAGE)
+    assert envelope.get("stream") == "btcusdt@kline_1m"
+    kline = envelope.get("data").get("k")
+    assert kline["s"] == "BTCUSDT" and kline.get("x") is True
+    assert kline.get("missing") is None
+    assert kline_row("BTCUSDT", kline) == EXPECTED_ROW
+
+
+def test_decode_non_kline_messages(backend):
+    assert json_codec.decode_stream_message(b'{"result":null,"id":1}') == {
+        "result": None,
+        "id": 1,
+    }
+
+
+def test_decode_trade_page(backend):
+    body = b'[{"a":1,"p":"1.5","q":"2","f":3,"l":4,"T":5,"m":true,"M":true}]'
+    (row,) = json_codec.decode_trade_page(body, "aggTrades")
+    assert (row["a"], row["T"], row["m"]) == (1, 5, True)
+    assert float(row["p"]) == 1.5
+
+
+def test_msgspec_decodes_typed_values():
+    pytest.importorskip("msgspec")
+    previous = json_codec.get_backend()
+    json_codec.set_backend("msgspec")
+    try:
+        kline = json_codec.decode_stream_message(MESSAGE).get("data").get("k")
+        assert isinstance(kline, json_codec.Kline)
+        assert kline["o"] == 42000.5 and isinstance(kline["v"], float)
+        (trade,) = json_codec.decode_trade_page(
+            b'[{"id":1,"price":"1.5","qty":"2","quoteQty":"3","time":5,"isBuyerMaker":false}]',
+            "trades",
+        )
+        assert trade["price"] == 1.5 and trade.get("time") == 5
+    finally:
+        json_codec.set_backend(previous)
+
+
+def test_unknown_backend_in_environment_falls_back():
+    code = "from src.etl.shared import json_codec; print(json_codec.get_backend())"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "ETL_JSON_BACKEND": "nope"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() in json_codec.BACKENDS
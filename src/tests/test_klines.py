@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.etl.shared.klines import (
+    FLOAT_COLUMNS,
+    INT_COLUMNS,
+    concat_klines,
+    decode_klines,
+    empty_klines,
+)
+
+from .bench.synthetic import klines_payload
+
+
+def test_decode_klines_from_bytes_str_and_rows_agree():
+    payload = klines_payload(4)
+    from_bytes = decode_klines(payload)
+    from_str = decode_klines(payload.decode())
+    from_rows = decode_klines(json.loads(payload))
+
+    rows = json.loads(payload)
+    assert from_bytes["timestamp"].tolist() == [row[0] for row in rows]
+    assert from_bytes["close"].tolist() == [float(row[4]) for row in rows]
+    assert "ignore" not in from_bytes
+    for name in INT_COLUMNS:
+        assert from_bytes[name].dtype == np.int64
+    for name in FLOAT_COLUMNS:
+        assert from_bytes[name].dtype == np.float64
+    for other in (from_str, from_rows):
+        assert other.keys() == from_bytes.keys()
+        for name, values in from_bytes.items():
+            np.testing.assert_array_equal(other[name], values)
+
+
+def test_decode_klines_ignores_whitespace():
+    payload = klines_payload(3)
+    pretty = json.dumps(json.loads(payload), indent=2).encode()
+    for name, values in decode_klines(payload).items():
+        np.testing.assert_array_equal(decode_klines(pretty)[name], values)
+
+
+@pytest.mark.parametrize("payload", [b"[]", "[ ]", b"[\n]", []])
+def test_decode_klines_empty(payload):
+    assert decode_klines(payload)["timestamp"].size == 0
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b'{"code":-1121,"msg":"Invalid symbol."}',
+        '{"code":-1003,"msg":"Too many requests."}',
+        {"code": -1121, "msg": "Invalid symbol."},
+        b"",
+        b'[[1,"2.0","3.0"],[4,"5.0"]]',
+        b'[[1,"2.0","3.0"],[4,"5.0",6,7,"8.0","9.0"]]',  # Ragged, but 9 values fill 3 rows
+        b'[[1,"2.0","x"]]',
+        [[1, "2.0", "3.0"], [4, "5.0"]],
+        [1, 2, 3],
+    ],
+)
+def test_decode_klines_rejects_malformed_payloads(payload):
+    with pytest.raises(ValueError, match="Malformed klines payload"):
+        decode_klines(payload)
+
+
+def test_concat_klines_skips_empty_batches():
+    first, second = decode_klines(klines_payload(2)), decode_klines(klines_payload(3, seed=1))
+    joined = concat_klines([empty_klines(), first, second])
+    assert joined["timestamp"].tolist() == (
+        first["timestamp"].tolist() + second["timestamp"].tolist()
+    )
+    assert concat_klines([empty_klines()])["close"].size == 0
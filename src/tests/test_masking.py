@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.etl.shared.masking import DataMasker, MaskRule
+
+
+def frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "symbol": ["BTCUSDT", "BTCUSDT", "ETHUSDT"],
+            "close": [100.5, 101.25, 3.125],
+            "volume": [12.3456, 7.891, 250.0],
+            "taker_buy_base": [1.005, 2.5, 149.99],
+            "trades": [10, 20, 30],
+        }
+    )
+
+
+def test_round_masks_in_place_and_leaves_other_columns():
+    df = frame()
+    close = df["close"].to_numpy()
+    assert DataMasker().apply(df) is df
+    assert df["volume"].tolist() == [12.35, 7.89, 250.0]
+    assert df["taker_buy_base"].tolist() == [1.0, 2.5, 149.99]
+    assert np.shares_memory(df["close"].to_numpy(), close)  # Unmasked columns are not copied
+
+
+def test_bucket_floors_to_multiples():
+    rules = [MaskRule("volume", kind="bucket", bucket_size=5.0), MaskRule("trades", "bucket")]
+    df = DataMasker(rules).apply(frame())
+    assert df["volume"].tolist() == [10.0, 5.0, 250.0]
+    assert df["trades"].tolist() == [10.0, 20.0, 30.0]
+
+
+def test_seeded_noise_is_reproducible():
+    rules = [MaskRule("volume", "noise"), MaskRule("close", "noise", noise_scale=0.001)]
+    first = DataMasker(rules, seed=7).apply(frame())
+    second = DataMasker(rules, seed=7).apply(frame())
+    other = DataMasker(rules, seed=8).apply(frame())
+    pd.testing.assert_frame_equal(first, second)
+    assert not np.array_equal(first["volume"], other["volume"])
+
+    relative = first["volume"] / frame()["volume"] - 1
+    assert (relative.abs() < 0.1).all() and (relative != 0).all()
+    table = DataMasker(rules, seed=7).apply(pa.Table.from_pandas(frame()))
+    assert table.column("volume").to_pylist() == first["volume"].tolist()
+    assert table.column("close").to_pylist() == first["close"].tolist()
+
+
+def test_tables_share_untouched_columns():
+    table = pa.Table.from_pandas(frame(), preserve_index=False)
+    masked = DataMasker().apply(table)
+    assert masked.column("volume").to_pylist() == [12.35, 7.89, 250.0]
+    assert masked.column("close").chunk(0).buffers()[1].address == (
+        table.column("close").chunk(0).buffers()[1].address
+    )
+    assert table.column("volume").to_pylist() == frame()["volume"].tolist()
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError, match="shuffle"):
+        DataMasker([MaskRule("volume", "shuffle")])
@@ -0,0 +1,89 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.etl.shared.observability import (
+    DroppingQueueHandler,
+    StreamLogger,
+    configure_stream_logger,
+    get_logger,
+    get_stream_logger,
+)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_get_logger_uses_queue_handler_and_propagates():
+    root = logging.getLogger()
+    handler = ListHandler()
+    root.addHandler(handler)
+    try:
+        logger = get_logger("tests.observability")
+        assert [type(h) for h in logger.handlers] == [DroppingQueueHandler]
+        assert get_logger("tests.observability").handlers == logger.handlers
+        logger.info("to the queue and the root")
+        assert handler.messages == ["to the queue and the root"]
+
+        logging.getLogger("tests").propagate = False  # The package-wide opt-out
+        logger.info("to the queue only")
+        assert handler.messages == ["to the queue and the root"]
+    finally:
+        logging.getLogger("tests").propagate = True
+        root.removeHandler(handler)
+
+
+def test_caplog_sees_module_loggers(caplog):
+    logger = get_logger("src.etl.shared.tests")
+    with caplog.at_level(logging.INFO):
+        logger.info("captured")
+    assert caplog.messages == ["captured"]
+
+
+def test_modules_do_not_configure_the_root_logger():
+    code = (
+        "import logging\n"
+        "import src.etl.shared.historical_data, src.etl.shared.processor\n"
+        "assert not logging.getLogger().handlers, logging.getLogger().handlers\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_configure_stream_logger_validates_like_init():
+    stream_logger = get_stream_logger("tests.stream_logger", interval=0, summary_interval=0)
+    handler = ListHandler()
+    stream_logger.logger = logging.getLogger("tests.stream_logger.list")
+    stream_logger.logger.addHandler(handler)
+    stream_logger.logger.setLevel(logging.INFO)
+
+    configure_stream_logger("tests.stream_logger", every=0)
+    assert stream_logger.every == 1
+    stream_logger.log("BTCUSDT", "candle %d", 1)
+    assert handler.messages == ["candle 1"]
+
+    with pytest.raises(TypeError):
+        configure_stream_logger("tests.stream_logger", evry=2)
+    assert StreamLogger(stream_logger.logger, every=-3).every == 1
+
+
+def test_stream_logger_summary_names_the_keys():
+    logger = logging.getLogger("tests.stream_logger.summary")
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    stream_logger = StreamLogger(logger, every=10, noun="trades", key_noun="accounts")
+    for key in ("a", "b", "a"):
+        stream_logger.log(key, "trade")
+    stream_logger.flush()
+    assert handler.messages[-1].startswith("3 trades for 2 accounts in last")
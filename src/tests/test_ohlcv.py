@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl.shared.indicators import EMAEngine
+from src.etl.shared.ohlcv import OHLCVBatch, epoch_ms
+
+START_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+
+
+def frame(timestamps) -> pd.DataFrame:
+    rows = len(timestamps)
+    return pd.DataFrame(
+        {
+            "symbol": ["BTCUSDT"] * rows,
+            "timestamp": timestamps,
+            "open": 1.0,
+            "high": 2.0,
+            "low": 0.5,
+            "close": np.arange(1.0, rows + 1),
+            "volume": 10.0,
+            "trades": 3,
+        }
+    )
+
+
+def test_epoch_ms_reads_integers_as_milliseconds():
+    expected = [START_MS, START_MS + 60_000]
+    assert epoch_ms(np.array(expected)).tolist() == expected
+    assert epoch_ms(pd.to_datetime(expected, unit="ms")).tolist() == expected
+    assert epoch_ms(pd.to_datetime(expected, unit="ms", utc=True)).tolist() == expected
+
+
+def test_from_frame_keeps_epoch_ms():
+    timestamps = [START_MS, START_MS + 60_000]
+    from_ints = OHLCVBatch.from_frame(frame(timestamps))
+    from_datetimes = OHLCVBatch.from_frame(frame(pd.to_datetime(timestamps, unit="ms")))
+    assert from_ints.timestamp.tolist() == timestamps
+    assert from_datetimes.timestamp.tolist() == timestamps
+
+
+def test_getitem_rejects_out_of_range_rows():
+    batch = OHLCVBatch.from_frame(frame([START_MS, START_MS + 60_000, START_MS + 120_000]))
+    assert batch[0].close == 1.0
+    assert batch[-1].close == 3.0
+    assert batch[-3].close == 1.0
+    for index in (3, -4):
+        with pytest.raises(IndexError):
+            batch[index]
+    assert [row.close for row in batch] == [1.0, 2.0, 3.0]
+
+
+def test_ema_engine_watermark_from_epoch_ms():
+    engine = EMAEngine([3])
+    engine.apply(frame([START_MS, START_MS + 60_000]))
+    assert engine.last_timestamp["BTCUSDT"] == START_MS + 60_000
+    state = engine.state[("BTCUSDT", 3)]
+    engine.update("BTCUSDT", 100.0, START_MS + 60_000)  # Replayed candle
+    assert engine.state[("BTCUSDT", 3)] == state
+
+
+def test_ema_engine_apply_skips_consumed_candles():
+    engine = EMAEngine([3])
+    engine.apply(frame([START_MS, START_MS + 60_000]))
+    state = engine.state[("BTCUSDT", 3)]
+
+    overlap = engine.apply(frame([START_MS + 60_000, START_MS + 120_000]))
+    assert np.isnan(overlap["EMA_3"].iloc[0])
+    assert overlap["EMA_3"].iloc[1] == state + 0.5 * (2.0 - state)
+    assert engine.last_timestamp["BTCUSDT"] == START_MS + 120_000
+
+    replay = engine.apply(frame([START_MS + 60_000, START_MS + 120_000]))
+    assert replay["EMA_3"].isna().all()
+    assert engine.state[("BTCUSDT", 3)] == overlap["EMA_3"].iloc[1]
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def test_every_module_imports_through_the_package():
+    """The modules import each other relatively, without touching sys.path."""
+    code = (
+        "import importlib, pkgutil, sys\n"
+        "path = list(sys.path)\n"
+        "import src.etl.shared as shared\n"
+        "for module in pkgutil.iter_modules(shared.__path__):\n"
+        "    importlib.import_module(f'src.etl.shared.{module.name}')\n"
+        "from src.etl.shared import data_ingestion, rest_client\n"
+        "assert data_ingestion.BinanceRestClient is rest_client.BinanceRestClient\n"
+        "assert 'rest_client' not in sys.modules\n"
+        "assert sys.path == path\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
@@ -0,0 +1,80 @@
+import json
+
+import pandas as pd
+
+from src.etl.shared import parquet
+from src.etl.shared.ohlcv import OHLCVBatch
+from src.etl.shared.processor import DataSaver
+
+from .bench.synthetic import START_MS, klines_payload
+
+
+class StubClient:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.requests = []
+
+    def get(self, path, params):
+        self.requests.append((path, params))
+        return type("Response", (), {"content": self.body})()
+
+
+def test_fetch_and_store_binance_data(tmp_path, monkeypatch):
+    client = StubClient(klines_payload(5))
+    monkeypatch.setattr(parquet, "get_client", lambda: client)
+
+    path = str(tmp_path / "ohlcv")
+    result = parquet.fetch_and_store_binance_data("BTCUSDT", "1m", path, limit=5)
+    assert result.rows_written == 5
+    assert client.requests == [
+        ("/api/v3/klines", {"symbol": "BTCUSDT", "interval": "1m", "limit": 5})
+    ]
+    df = pd.read_parquet(path)
+    assert list(df.columns) == parquet.OHLCV_COLUMNS + ["symbol"]
+
+
+def test_fetch_historical_trades_keeps_the_time_column(monkeypatch):
+    body = json.dumps(
+        [
+            {
+                "id": 7,
+                "price": "42000.5",
+                "qty": "0.25",
+                "quoteQty": "10500.125",
+                "time": START_MS,
+                "isBuyerMaker": True,
+            }
+        ]
+    ).encode()
+    monkeypatch.setattr(parquet, "get_client", lambda: StubClient(body))
+
+    df = parquet.fetch_historical_trades("BTCUSDT", limit=1)
+    assert list(df.columns) == ["time", "price", "qty", "symbol"]
+    assert df["time"].tolist() == [pd.Timestamp(START_MS, unit="ms")]
+    assert df["price"].tolist() == [42000.5]
+
+
+def test_save_to_parquet_still_writes_one_file(tmp_path, monkeypatch):
+    df = pd.DataFrame(
+        {
+            "symbol": ["BTCUSDT", "ETHUSDT"],
+            "timestamp": pd.to_datetime([START_MS, START_MS], unit="ms", utc=True),
+            "open": 1.0,
+            "high": 2.0,
+            "low": 0.5,
+            "close": 1.5,
+            "volume": 10.0,
+            "trades": 3,
+        }
+    )
+    monkeypatch.chdir(tmp_path)
+    parquet.save_to_parquet(df)  # Positional callers and the default filename keep working
+    pd.testing.assert_frame_equal(pd.read_parquet("binance_data.parquet"), df)
+
+    result = DataSaver.save_to_parquet(OHLCVBatch.from_frame(df), "ohlcv.parquet")
+    assert result.paths == ["ohlcv.parquet"] and result.rows_written == 2
+    assert pd.read_parquet("ohlcv.parquet")["symbol"].tolist() == ["BTCUSDT", "ETHUSDT"]
+
+    result = DataSaver.save_to_dataset(OHLCVBatch.from_frame(df), "dataset", "1h")
+    assert len(result.paths) == 2  # One partition per symbol
+    assert len(parquet.save_to_dataset(df, "dataset", "1h").paths) == 2
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl.shared import pipeline
+from src.etl.shared.dataset import read_ohlcv
+from src.etl.shared.ohlcv import OHLCVBatch
+from src.etl.shared.pipeline import PipelineContext, PipelineRunner
+
+START_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+HOUR_MS = 60 * 60 * 1000
+
+
+def fake_klines(context, params):
+    frames = []
+    for symbol in params["symbols"]:
+        rows = params.get("rows", 5)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "symbol": symbol,
+                    "timestamp": START_MS + np.arange(rows) * HOUR_MS,
+                    "open": 1.0,
+                    "high": 2.0,
+                    "low": 0.5,
+                    "close": 1.0 + np.arange(rows) / 10,
+                    "volume": 10.0,
+                    "trades": 3,
+                }
+            )
+        )
+    return OHLCVBatch.from_frame(pd.concat(frames, ignore_index=True))
+
+
+def failing_klines(context, params):
+    raise RuntimeError("Binance is down")
+
+
+@pytest.fixture(autouse=True)
+def offline_sources(monkeypatch):
+    monkeypatch.setitem(pipeline.NODE_TYPES["sources"], "klines", fake_klines)
+    monkeypatch.setitem(pipeline.NODE_TYPES["sources"], "broken", failing_klines)
+
+
+def make_spec(tmp_path) -> dict:
+    # Transforms and sinks are listed before the nodes they read on purpose
+    return {
+        "max_workers": 2,
+        "sources": {
+            "prices": {"type": "klines", "symbols": ["BTCUSDT", "ETHUSDT"]},
+            "unused": {"type": "klines", "symbols": ["BNBUSDT"], "enabled": False},
+        },
+        "transforms": {
+            "prices_ema": {"type": "ema", "input": "prices_clean", "periods": [2]},
+            "prices_clean": {"type": "clean", "input": "prices"},
+        },
+        "sinks": {
+            "report": {"type": "csv", "input": "prices_ema", "path": str(tmp_path / "r.csv")},
+            "dataset": {
+                "type": "parquet",
+                "input": "prices_clean",
+                "root": str(tmp_path / "ohlcv"),
+                "interval": "1h",
+            },
+        },
+    }
+
+
+def run(runner: PipelineRunner, **kwargs) -> dict:
+    return runner.run(context=PipelineContext(client=None), **kwargs)
+
+
+def test_nodes_run_after_their_inputs(tmp_path):
+    runner = PipelineRunner(make_spec(tmp_path))
+    order = runner.order
+    assert "unused" not in order
+    assert order.index("prices") < order.index("prices_clean") < order.index("prices_ema")
+    assert order.index("prices_ema") < order.index("report")
+    assert order.index("prices_clean") < order.index("dataset")
+    assert runner.upstream(["report"]) == ["prices", "prices_clean", "prices_ema", "report"]
+
+
+@pytest.mark.parametrize(
+    "section, spec, message",
+    [
+        ("transforms", {"type": "smooth", "input": "prices"}, "Unknown transform type 'smooth'"),
+        ("sinks", {"type": "csv"}, "needs exactly one input"),
+        ("sinks", {"type": "csv", "input": "unused", "path": "x.csv"}, "unknown or disabled"),
+    ],
+)
+def test_invalid_nodes_are_rejected(tmp_path, section, spec, message):
+    config = make_spec(tmp_path)
+    config[section]["bad"] = spec
+    with pytest.raises(ValueError, match=message):
+        PipelineRunner(config)
+
+
+def test_cycles_are_rejected(tmp_path):
+    config = make_spec(tmp_path)
+    config["transforms"]["prices_clean"]["input"] = "prices_ema"
+    with pytest.raises(ValueError, match="cycle"):
+        PipelineRunner(config)
+
+
+def test_sinks_receive_the_transformed_batch(tmp_path):
+    results = run(PipelineRunner(make_spec(tmp_path)))
+    assert results["failed"] == [] and results["skipped"] == []
+    assert set(results) == {"report", "dataset", "failed", "skipped"}
+
+    report = pd.read_csv(results["report"])
+    assert len(report) == 10
+    assert report.groupby("symbol")["EMA_2"].first().tolist() == pytest.approx([1.0, 1.0])
+    assert results["dataset"].rows_written == 10
+    stored = read_ohlcv(root=str(tmp_path / "ohlcv"))
+    assert "EMA_2" not in stored.columns  # The EMA node got its own copy of the clean batch
+    assert sorted(stored["symbol"].unique()) == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_only_runs_the_selected_branch(tmp_path):
+    results = run(PipelineRunner(make_spec(tmp_path)), only=["dataset"])
+    assert set(results) == {"dataset", "failed", "skipped"}
+    assert not (tmp_path / "r.csv").exists()
+
+
+def test_nodes_downstream_of_a_failure_are_skipped(tmp_path):
+    config = make_spec(tmp_path)
+    config["sources"]["prices"]["type"] = "broken"
+    results = run(PipelineRunner(config))
+    assert results["failed"] == ["prices"]
+    assert sorted(results["skipped"]) == ["dataset", "prices_clean", "prices_ema", "report"]
+
+
+def test_shipped_config_builds():
+    runner = PipelineRunner.from_yaml(pipeline.DEFAULT_CONFIG)
+    assert "live_klines" not in runner.order  # Disabled
+    assert runner.upstream(["majors_dataset"])[0] == "majors_daily"
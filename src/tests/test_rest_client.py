@@ -0,0 +1,68 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from src.etl.shared import rest_client
+from src.etl.shared.rest_client import KLINES_PATH, BinanceRestClient, retry_after_seconds
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2", 2.0),
+        ("0.5", 0.5),
+        ("-3", 0.0),
+        (formatdate(0, usegmt=True), 0.0),  # In the past
+        (None, None),
+        ("", None),
+        ("soon", None),
+        ("inf", None),
+    ],
+)
+def test_retry_after_seconds(value, expected):
+    assert retry_after_seconds(value) == expected
+
+
+def test_retry_after_http_date():
+    value = formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= retry_after_seconds(value) <= 30
+    naive = value.replace("GMT", "-0000")  # RFC 2822 for "timezone unknown"
+    assert 28 <= retry_after_seconds(naive) <= 30
+
+
+class StubSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        status, headers = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = b"[]"
+        response.url = url
+        return response
+
+
+@pytest.mark.parametrize("retry_after", ["http-date", "tomorrow", None])
+def test_429_retries_with_any_retry_after(monkeypatch, retry_after):
+    delays, pauses = [], []
+    monkeypatch.setattr(rest_client.time, "sleep", delays.append)
+    monkeypatch.setattr(rest_client.TokenBucket, "pause", lambda bucket, s: pauses.append(s))
+    if retry_after == "http-date":
+        retry_after = formatdate(time.time() + 5, usegmt=True)
+    headers = {"Retry-After": retry_after} if retry_after else {}
+    session = StubSession([(429, headers), (200, {})])
+    client = BinanceRestClient(session=session, backoff_initial=0.5)
+
+    assert client.get(KLINES_PATH).status_code == 200
+    assert session.calls == 2
+    assert pauses == delays  # Every caller on the host waits as long
+    if retry_after in ("tomorrow", None):
+        assert 0 <= delays[0] <= 0.5  # Backoff instead
+    else:
+        assert 3 <= delays[0] <= 5
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from src.etl.shared.dataset import PartitionedDatasetWriter
+from src.etl.shared.rollup import RollupCache, rollup
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+START_MS = 1_704_067_200_000 + 17 * HOUR_MS  # 2024-01-01T17:00:00Z, mid-day
+
+
+def hourly(hours: int, start: int = START_MS) -> pd.DataFrame:
+    timestamps = start + np.arange(hours) * HOUR_MS
+    return pd.DataFrame(
+        {
+            "symbol": "BTCUSDT",
+            "timestamp": pd.to_datetime(timestamps, unit="ms", utc=True),
+            "open": np.arange(hours, dtype=float),
+            "high": np.arange(hours) + 1.0,
+            "low": np.arange(hours) - 1.0,
+            "close": np.arange(hours) + 0.5,
+            "volume": 60.0,
+            "trades": 1,
+        }
+    )
+
+
+def test_rollup_aggregates_buckets():
+    result = rollup(hourly(48, start=START_MS - 17 * HOUR_MS), "1d")
+    assert result.timestamp.tolist() == [START_MS - 17 * HOUR_MS, START_MS + 7 * HOUR_MS]
+    assert result.open.tolist() == [0.0, 24.0]
+    assert result.close.tolist() == [23.5, 47.5]
+    assert result.high.tolist() == [24.0, 48.0]
+    assert result.low.tolist() == [-1.0, 23.0]
+    assert result.volume.tolist() == [1440.0, 1440.0]
+
+
+def test_rollup_drops_partial_buckets_at_both_ends():
+    # 17:00 on day one to 11:00 on day four: days two and three are complete
+    result = rollup(hourly(67), "1d", base_interval="1h")
+    assert result.timestamp.tolist() == [START_MS + 7 * HOUR_MS, START_MS + 31 * HOUR_MS]
+    assert result.volume.tolist() == [1440.0, 1440.0]
+
+
+def test_rollup_cache_never_persists_a_partial_leading_bucket(tmp_path):
+    root = str(tmp_path)
+    writer = PartitionedDatasetWriter(root, "1h")
+    writer.write(hourly(40))
+    cache = RollupCache(root, "1h")
+    cache.refresh(["BTCUSDT"], ["1d"])
+    writer.write(hourly(24, start=START_MS + 40 * HOUR_MS))
+    cache.refresh(["BTCUSDT"], ["1d"])
+
+    days = cache.read(["BTCUSDT"], "1d")
+    assert days["volume"].tolist() == [1440.0, 1440.0]
+
+
+def test_rollup_keeps_buckets_with_a_gap_inside_the_range():
+    # Four hours missing from day two, which the input covers on both sides
+    days = hourly(72, start=START_MS - 17 * HOUR_MS)
+    days = days.drop(index=range(30, 34))
+    result = rollup(days, "1d", base_interval="1h")
+    assert result.timestamp.tolist() == [START_MS - 17 * HOUR_MS + i * DAY_MS for i in range(3)]
+    assert result.volume.tolist() == [1440.0, 1200.0, 1440.0]
+    assert result.open.tolist() == [0.0, 24.0, 48.0]
+
+
+def test_rollup_keeps_a_leading_gap_after_a_known_start():
+    day_two = hourly(48, start=START_MS + 7 * HOUR_MS).iloc[1:]  # 00:00 missing
+    assert len(rollup(day_two, "1d", base_interval="1h")) == 1
+    result = rollup(day_two, "1d", base_interval="1h", start=START_MS + 7 * HOUR_MS)
+    assert result.volume.tolist() == [1380.0, 1440.0]
+
+
+def test_rollup_cache_does_not_skip_gap_buckets(tmp_path):
+    root = str(tmp_path)
+    writer = PartitionedDatasetWriter(root, "1h")
+    writer.write(hourly(55).drop(index=[10, 11]))  # Day two misses 03:00 and 04:00
+    cache = RollupCache(root, "1h")
+    cache.refresh(["BTCUSDT"], ["1d"])
+    # Day four misses 00:00, right after the newest stored bucket
+    writer.write(hourly(30, start=START_MS + 56 * HOUR_MS))
+    cache.refresh(["BTCUSDT"], ["1d"])
+
+    days = cache.read(["BTCUSDT"], "1d")
+    assert days["volume"].tolist() == [1320.0, 1440.0, 1380.0]
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import queue
+import time
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.etl.shared import runtime as runtime_module
+from src.etl.shared.file_writer import RollingParquetWriter
+from src.etl.shared.runtime import WRITE_ATTEMPTS, IngestionRuntime
+
+from .bench.synthetic import kline_events, serve_messages, symbol_names
+from .test_file_writer import FlakyWriter
+
+
+async def _ingest(runtime: IngestionRuntime, messages, until):
+    """Run `runtime` against a fake server until `until()` holds, then stop it."""
+    server = await serve_messages(messages)
+    port = server.sockets[0].getsockname()[1]
+    for receiver in runtime.receivers:
+        receiver.base_url = f"ws://127.0.0.1:{port}/stream"
+    try:
+        await asyncio.to_thread(runtime.start)
+        deadline = time.monotonic() + 10
+        while not until() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        assert until()
+        return await asyncio.wait_for(asyncio.to_thread(runtime.stop), 20)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def make_runtime(writer, **kwargs) -> IngestionRuntime:
+    settings = dict(decoders=2, workers="thread", batch_rows=50, batch_seconds=0.05)
+    settings.update(kwargs)
+    return IngestionRuntime(symbol_names(4), fill_gaps=False, writer=writer, **settings)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(runtime_module, "WRITE_BACKOFF", (0.001, 0.001))
+
+
+def test_runtime_retries_failed_writes_until_written(tmp_path):
+    writer = FlakyWriter(str(tmp_path), failures=WRITE_ATTEMPTS + 2)
+    runtime = make_runtime(writer)
+    result = asyncio.run(
+        _ingest(runtime, kline_events(200, symbols=4), lambda: writer.rows_written == 200)
+    )
+
+    assert writer.failures == 0
+    assert result.rows_written == 200
+    assert sum(pq.read_metadata(path).num_rows for path in result.paths) == 200
+    assert runtime.spilled == []
+
+
+class BrokenWriter(RollingParquetWriter):
+    """Fails every write, like a disk that went away."""
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.attempted_rows = 0
+
+    def write_batch(self, batch):
+        self.attempted_rows = batch.num_rows
+        raise OSError("disk gone")
+
+
+def test_runtime_spills_batches_it_cannot_write_on_stop(tmp_path):
+    writer = BrokenWriter(str(tmp_path / "stream"))
+    runtime = make_runtime(
+        writer, decoders=1, batch_rows=200, batch_seconds=60, spill_directory=str(tmp_path / "s")
+    )
+    result = asyncio.run(
+        _ingest(runtime, kline_events(200, symbols=4), lambda: writer.attempted_rows == 200)
+    )
+
+    assert result.rows_written == 0
+    assert len(runtime.spilled) == 1
+    assert pq.read_table(runtime.spilled[0]).num_rows == 200
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_stop_returns_after_a_decoder_failed(tmp_path, monkeypatch):
+    def fail(message):
+        raise MemoryError()
+
+    monkeypatch.setattr(runtime_module, "decode_stream_message", fail)
+    runtime = make_runtime(RollingParquetWriter(str(tmp_path)))
+    result = asyncio.run(
+        _ingest(
+            runtime,
+            kline_events(200, symbols=4),
+            lambda: not any(decoder.is_alive() for decoder in runtime.decoders),
+        )
+    )
+    assert result.rows_written == 0
+
+
+def test_decoder_ships_gap_fills_larger_than_its_buffer(monkeypatch):
+    events = [json.loads(message)["data"] for _, message in kline_events(25, 1)]
+
+    class FakeGapFiller:
+        def __init__(self, candles):
+            pass
+
+        async def fill(self, streams, deliver):
+            for data in events:
+                await deliver("btcusdt@kline_1m", data)
+
+    monkeypatch.setattr(runtime_module, "KlineGapFiller", FakeGapFiller)
+    inbox, outbox = queue.Queue(), queue.Queue()
+    inbox.put((runtime_module.RECONNECTED, ["btcusdt@kline_1m"]))
+    inbox.put(runtime_module.STOP)
+    runtime_module._decode_worker(inbox, outbox, 2, 60.0, True)  # Buffer of 4 rows
+
+    batches = []
+    while (batch := outbox.get_nowait()) is not runtime_module.STOP:
+        batches.append(batch)
+    assert sum(batch.num_rows for batch in batches) == 25
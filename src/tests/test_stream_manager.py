@@ -0,0 +1,81 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+import websockets
+
+from src.etl.shared.stream_manager import StreamManager, shard_streams
+
+
+def test_shard_streams():
+    streams = [f"s{i}@kline_1m" for i in range(5)]
+    assert shard_streams(streams, 2) == [streams[0:2], streams[2:4], streams[4:]]
+    with pytest.raises(ValueError):
+        shard_streams(streams, 0)
+
+
+def test_run_shard_survives_rejected_handshakes():
+    """A 503 on the handshake restarts the shard instead of ending every shard."""
+    rejected = []
+    received = []
+
+    def process_request(connection, request):
+        if len(rejected) < 2:
+            rejected.append(request.path)
+            return connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, "busy\n")
+
+    async def handler(connection):
+        stream = "btcusdt@kline_1m"
+        await connection.send(json.dumps({"stream": stream, "data": {"s": "BTCUSDT"}}))
+        await connection.wait_closed()
+
+    async def main():
+        async with websockets.serve(
+            handler, "127.0.0.1", 0, process_request=process_request
+        ) as server:
+            port = server.sockets[0].getsockname()[1]
+            manager = StreamManager(
+                ["btcusdt@kline_1m"],
+                lambda stream, data: received.append((stream, data)),
+                base_url=f"ws://127.0.0.1:{port}/stream",
+                backoff_initial=0.01,
+                backoff_max=0.01,
+            )
+            task = asyncio.create_task(manager.run())
+            for _ in range(500):
+                if received:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(main())
+    assert len(rejected) == 2
+    assert received == [("btcusdt@kline_1m", {"s": "BTCUSDT"})]
+
+
+def test_cancelled_run_waits_for_every_shard():
+    """Cancelling run() returns once every shard closed its connection, not after the first."""
+    stopped = []
+
+    class SlowToClose(StreamManager):
+        async def run_shard(self, shard_id, streams):
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                await asyncio.sleep(0.01 * shard_id)  # Closing handshake
+                stopped.append(shard_id)
+                raise
+
+    async def main():
+        manager = SlowToClose([f"s{i}@kline_1m" for i in range(3)], streams_per_connection=1)
+        task = asyncio.create_task(manager.run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert sorted(stopped) == [0, 1, 2]
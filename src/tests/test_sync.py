@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.etl.shared.dataset import read_ohlcv
+from src.etl.shared.klines import FLOAT_COLUMNS
+from src.etl.shared.sync import IncrementalSync, WatermarkStore
+
+HOUR_MS = 60 * 60 * 1000
+
+
+class FakeBackfill:
+    """Serves hourly candles for [start_time, end_time], including the one still open."""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, symbols, start_time, end_time):
+        self.calls.append((list(symbols), start_time))
+        first = -(-start_time // HOUR_MS) * HOUR_MS
+        times = np.arange(first, end_time + 1, HOUR_MS, dtype=np.int64)
+        result = {}
+        for symbol in symbols:
+            columns = {name: np.ones(len(times)) for name in FLOAT_COLUMNS}
+            columns.update(
+                timestamp=times,
+                close_time=times + HOUR_MS - 1,
+                trades=np.ones(len(times), dtype=np.int64),
+            )
+            result[symbol] = columns
+        return result
+
+
+def make_sync(tmp_path, backfill):
+    store = WatermarkStore(str(tmp_path / "state" / "watermarks.json"))
+    return IncrementalSync(str(tmp_path / "ohlcv"), "1h", store, backfill, default_days=1)
+
+
+def stored_times(tmp_path, symbol):
+    frame = read_ohlcv([symbol], columns=["timestamp"], root=str(tmp_path / "ohlcv"))
+    return frame["timestamp"].dt.as_unit("ms").astype("int64")
+
+
+def test_watermarks_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "watermarks.json")
+    store = WatermarkStore(path)
+    assert store.get("BTCUSDT", "1h") is None
+    store.set("BTCUSDT", "1h", np.int64(HOUR_MS))
+    store.save()
+
+    assert WatermarkStore(path).get("BTCUSDT", "1h") == HOUR_MS
+    assert WatermarkStore(path).get("BTCUSDT", "1m") is None
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_second_sync_only_fetches_after_the_watermark(tmp_path):
+    backfill = FakeBackfill()
+    sync = make_sync(tmp_path, backfill)
+    first = sync.sync(["BTCUSDT", "ETHUSDT"])
+    assert len(backfill.calls) == 1  # Both symbols share a start, so one fetch
+
+    mark = sync.store.get("BTCUSDT", "1h")
+    times = stored_times(tmp_path, "BTCUSDT")
+    assert first.rows_written == 2 * len(times)
+    assert times.max() == mark
+    assert mark + 2 * HOUR_MS > time.time() * 1000  # Only the open candle is left out
+
+    second = sync.sync(["BTCUSDT", "ETHUSDT"])
+    assert backfill.calls[1] == (["BTCUSDT", "ETHUSDT"], mark + HOUR_MS)
+    assert second.rows_written == 0
+    assert stored_times(tmp_path, "BTCUSDT").is_unique
+
+
+def test_sync_resumes_from_the_dataset_without_state(tmp_path):
+    backfill = FakeBackfill()
+    make_sync(tmp_path, backfill).sync(["BTCUSDT"])
+    newest = stored_times(tmp_path, "BTCUSDT").max()
+
+    os.remove(tmp_path / "state" / "watermarks.json")
+    make_sync(tmp_path, backfill).sync(["BTCUSDT"])
+    assert backfill.calls[1][1] == newest + HOUR_MS
+
+
+def test_failed_write_keeps_the_watermark(tmp_path, monkeypatch):
+    backfill = FakeBackfill()
+    sync = make_sync(tmp_path, backfill)
+    sync.sync(["BTCUSDT"])
+    mark = sync.store.get("BTCUSDT", "1h")
+    state = tmp_path / "state" / "watermarks.json"
+
+    # Pretend an hour has passed so there is a new closed candle to write
+    sync.store.set("BTCUSDT", "1h", mark - HOUR_MS)
+    sync.store.save()
+
+    def fail(frame):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sync.writer, "write", fail)
+    with pytest.raises(OSError):
+        sync.sync(["BTCUSDT"])
+    assert sync.store.get("BTCUSDT", "1h") == mark - HOUR_MS
+    assert json.loads(state.read_text()) == {"BTCUSDT/1h": mark - HOUR_MS}
+
+    monkeypatch.undo()
+    sync.sync(["BTCUSDT"])  # The retry starts from the same point
+    assert backfill.calls[-1][1] == mark
+    assert sync.store.get("BTCUSDT", "1h") == mark
@@ -0,0 +1,92 @@
+import json
+
+import numpy as np
+
+from src.etl.shared.file_writer import FileWriteDataReturnValue
+from src.etl.shared.trades import MAX_TRADES_PER_REQUEST, TradeBackfill
+
+from .bench.synthetic import START_MS
+
+HOUR_MS = 60 * 60 * 1000
+
+
+def agg_trade(trade_id: int, time_ms: int) -> dict:
+    return {
+        "a": trade_id,
+        "p": "100.0",
+        "q": "0.5",
+        "f": trade_id,
+        "l": trade_id,
+        "T": time_ms,
+        "m": False,
+    }
+
+
+class AggTradesClient:
+    """Answers aggTrades by time window or by fromId from a fixed list of trades."""
+
+    def __init__(self, trades):
+        self.trades = trades
+        self.requests = []
+
+    def get(self, path, params):
+        self.requests.append(params)
+        if "fromId" in params:
+            rows = [t for t in self.trades if t["a"] >= params["fromId"]]
+        else:
+            rows = [t for t in self.trades if params["startTime"] <= t["T"] <= params["endTime"]]
+        body = json.dumps(rows[: params["limit"]]).encode()
+        return type("Response", (), {"content": body})()
+
+
+class ListWriter:
+    """Keeps the written tables instead of writing files."""
+
+    def __init__(self):
+        self.tables = []
+
+    def write(self, table):
+        self.tables.append(table)
+        return FileWriteDataReturnValue(paths=[], rows_written=table.num_rows)
+
+
+def trades_fixture():
+    # 2500 trades in the first hour, one on its last millisecond, then the next hour
+    times = [START_MS + i * 1000 for i in range(2500)]
+    times += [START_MS + HOUR_MS - 1, START_MS + HOUR_MS, START_MS + HOUR_MS + 5]
+    return [agg_trade(100 + i, t) for i, t in enumerate(times)]
+
+
+def test_pages_continue_by_from_id_without_gaps():
+    client = AggTradesClient(trades_fixture())
+    backfill = TradeBackfill(ListWriter(), client=client)
+
+    pages = list(backfill.pages("BTCUSDT", START_MS, START_MS + HOUR_MS - 1))
+    ids = np.concatenate([page["trade_id"] for page in pages])
+    assert ids.tolist() == list(range(100, 100 + 2501))
+    assert [len(page["trade_id"]) for page in pages] == [MAX_TRADES_PER_REQUEST] * 2 + [501]
+    assert "startTime" in client.requests[0]
+    assert [r["fromId"] for r in client.requests[1:]] == [1100, 2100]
+
+
+def test_backfill_splits_hours_without_overlap():
+    trades = trades_fixture()
+    writer = ListWriter()
+    backfill = TradeBackfill(writer, client=AggTradesClient(trades), flush_rows=1500)
+
+    result = backfill.backfill(["BTCUSDT"], START_MS, START_MS + 2 * HOUR_MS - 1)
+    ids = sorted(i for table in writer.tables for i in table.column("trade_id").to_pylist())
+    assert ids == [t["a"] for t in trades]
+    assert result.rows_written == len(trades)
+    assert max(table.num_rows for table in writer.tables) <= 1500 + MAX_TRADES_PER_REQUEST
+
+
+def test_empty_slice_makes_one_request_and_writes_nothing():
+    client = AggTradesClient(trades_fixture())
+    writer = ListWriter()
+    result = TradeBackfill(writer, client=client).backfill(
+        ["BTCUSDT"], START_MS + 2 * HOUR_MS, START_MS + 3 * HOUR_MS - 1
+    )
+    assert result.rows_written == 0
+    assert writer.tables == []
+    assert len(client.requests) == 1
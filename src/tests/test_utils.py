@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from src.etl.shared.utils import write_parquet
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"symbol": ["BTCUSDT", "ETHUSDT"], "close": [1.0, 2.0]})
+
+
+def test_write_parquet_append_after_overwrite(tmp_path, df):
+    path = str(tmp_path / "out" / "x.parquet")
+    write_parquet(df, path)
+    result = write_parquet(df, path, mode="append")
+    assert result.rows_written == 2
+    assert len(pd.read_parquet(path)) == 4
+
+    write_parquet(df, path)
+    assert len(pd.read_parquet(path)) == 2
+
+
+def test_write_parquet_overwrites_only_written_partitions(tmp_path, df):
+    path = str(tmp_path / "dataset")
+    write_parquet(df, path, partition_cols=["symbol"])
+    write_parquet(df.iloc[:1], path, partition_cols=["symbol"], mode="append")
+    write_parquet(df.iloc[1:], path, partition_cols=["symbol"])
+    counts = pd.read_parquet(path)["symbol"].astype(str).value_counts()
+    assert counts.to_dict() == {"BTCUSDT": 2, "ETHUSDT": 1}
+
+
+def test_write_parquet_appends_to_a_single_file_dataset(tmp_path, df):
+    path = str(tmp_path / "legacy.parquet")
+    df.to_parquet(path, index=False)
+    write_parquet(df, path, mode="append")
+    assert len(pd.read_parquet(path)) == 4